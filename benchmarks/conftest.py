@@ -0,0 +1,108 @@
+"""
+Fixtures for the SSRM benchmark suite.
+
+Synthetic order tables mirror ``sample_data.SSRM_ROWS`` (regions, products,
+quarters, units, revenue) at the sizes listed in ``SSRM_BENCH_ROWS``
+(comma-separated, default ``1000000``; e.g. ``1000000,10000000,100000000``).
+Set ``SSRM_BENCH_DIR`` to keep the generated DuckDB files between runs.
+"""
+
+import itertools
+import json
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+duckdb = pytest.importorskip("duckdb")
+flask = pytest.importorskip("flask")
+
+from dash_aggrid_js import ssrm  # noqa: E402
+
+TRACES = json.loads((Path(__file__).with_name("traces.json")).read_text())
+ROW_COUNTS = [
+    int(value) for value in os.environ.get("SSRM_BENCH_ROWS", "1000000").split(",") if value.strip()
+]
+
+_GRID_IDS = itertools.count()
+
+_ORDERS_SQL = """
+CREATE TABLE orders AS
+SELECT
+    i AS order_id,
+    ['NA', 'EU', 'APAC', 'LATAM'][(hash(i) % 4)::INTEGER + 1] AS region,
+    ['Notebook Air', 'Notebook Pro', '4K Display', 'Ergo Keyboard', 'Precision Mouse'][
+        (hash(i * 7) % 5)::INTEGER + 1
+    ] AS product,
+    ['Laptops', 'Laptops', 'Monitors', 'Accessories', 'Accessories'][
+        (hash(i * 7) % 5)::INTEGER + 1
+    ] AS category,
+    (2020 + i % 4)::VARCHAR || ' Q' || (1 + (i // 4) % 4)::VARCHAR AS quarter,
+    20 + (hash(i * 13) % 101)::INTEGER AS units,
+    ((20 + (hash(i * 13) % 101)::INTEGER) * (129 + (hash(i * 7) % 5)::INTEGER * 330))::DOUBLE AS revenue
+FROM range({rows}) AS r(i)
+"""
+
+
+def pytest_generate_tests(metafunc):
+    # one case per recorded trace, for tests that take a ``trace`` name
+    if "trace" in metafunc.fixturenames:
+        metafunc.parametrize("trace", sorted(TRACES))
+
+
+@pytest.fixture(scope="session")
+def traces():
+    """Recorded AG Grid request traces from ``traces.json``, keyed by name."""
+    return TRACES
+
+
+@pytest.fixture(scope="session")
+def bench_dir(tmp_path_factory):
+    configured = os.environ.get("SSRM_BENCH_DIR")
+    if configured:
+        path = Path(configured)
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+    return tmp_path_factory.mktemp("ssrm-bench")
+
+
+@pytest.fixture(scope="session", params=ROW_COUNTS, ids=lambda rows: f"{rows:_}rows")
+def orders_db(request, bench_dir):
+    """Path of a DuckDB file holding ``orders`` with the parametrized row count."""
+    rows = request.param
+    path = bench_dir / f"orders_{rows}.duckdb"
+    if not path.exists():
+        partial = path.with_suffix(".partial")
+        partial.unlink(missing_ok=True)
+        with duckdb.connect(str(partial)) as con:
+            con.execute(_ORDERS_SQL.format(rows=rows))
+        partial.rename(path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def ssrm_app(orders_db):
+    """
+    Register an uncached grid over ``orders_db`` and return ``(client, grid_id)``.
+
+    Result, count, aggregate and distinct caches are disabled so every replay
+    measures the query path rather than cache hits.
+    """
+    grid_id = f"bench-grid-{next(_GRID_IDS)}"
+    endpoint = ssrm.register_duckdb_ssrm(
+        grid_id,
+        {
+            "duckdb_path": str(orders_db),
+            "table": "orders",
+            "count_cache_ttl": 0,
+            "aggregate_cache_ttl": 0,
+            "distinct_cache_ttl": 0,
+        },
+    )
+    app = SimpleNamespace(server=flask.Flask(__name__))
+    base = ssrm._normalise_route_base(endpoint)
+    ssrm._attach_routes_to_app(app, base, ssrm._views_for_base(base))
+    yield app.server.test_client(), grid_id
+    ssrm._SSRM_REGISTRY.pop(grid_id, None)
+    ssrm._APP_ROUTE_CACHE.pop(id(app), None)
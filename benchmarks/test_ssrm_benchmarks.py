@@ -0,0 +1,103 @@
+"""
+SSRM benchmarks: SQL generation and recorded request traces served through
+the Flask routes.
+
+Run with ``pytest benchmarks/`` (or ``make bench``).  Besides
+pytest-benchmark's own timings, every trace benchmark stores p50/p99
+per-request latency, mean response bytes and the peak Python memory allocated
+while serving the trace in ``extra_info`` so ``--benchmark-json`` output can
+be compared across releases.
+"""
+
+import time
+import tracemalloc
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from dash_aggrid_js import ssrm  # noqa: E402
+
+_ROUNDS = 5
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _peak_traced_mb(run):
+    """
+    Peak Python allocations of one untimed ``run()`` above what was live
+    before it, so table builds and earlier traces do not count.  Native
+    DuckDB buffers are not traced.
+    """
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return (peak - baseline) / (1024 * 1024)
+
+
+def _report(benchmark, latencies, sizes, peak_mb):
+    benchmark.extra_info.update(
+        {
+            "requests": len(latencies),
+            "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+            "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+            "bytes_per_response": round(sum(sizes) / len(sizes)) if sizes else 0,
+            "peak_traced_mb": round(peak_mb, 3),
+        }
+    )
+
+
+def _block_requests(steps):
+    return [step["body"] for step in steps if step["route"] == "block"]
+
+
+def test_sql_for(benchmark, traces, trace):
+    """SQL generation alone, independent of DuckDB."""
+    requests = _block_requests(traces[trace])
+    if not requests:
+        pytest.skip(f"trace {trace!r} has no block requests")
+    latencies = []
+
+    def generate():
+        for body in requests:
+            started = time.perf_counter()
+            ssrm.sql_for(body, "orders", row_count=True, parameterized=True)
+            latencies.append(time.perf_counter() - started)
+
+    benchmark(generate)
+    timed = latencies[:]
+    # measured on an extra, untimed pass: tracemalloc slows every allocation down
+    _report(benchmark, timed, [], _peak_traced_mb(generate))
+
+
+def test_serve_trace(benchmark, ssrm_app, traces, trace):
+    """Replay a recorded AG Grid trace through the SSRM routes."""
+    client, grid_id = ssrm_app
+    latencies = []
+    sizes = []
+
+    def replay():
+        for step in traces[trace]:
+            if step["route"] == "distinct":
+                url = f"/_aggrid/ssrm/distinct/{grid_id}/{step['column']}"
+            else:
+                url = f"/_aggrid/ssrm/{grid_id}"
+            started = time.perf_counter()
+            response = client.post(url, json=step["body"])
+            body = response.get_data()
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, body[:200]
+            sizes.append(len(body))
+
+    benchmark.pedantic(replay, rounds=_ROUNDS, iterations=1, warmup_rounds=1)
+    timed, timed_sizes = latencies[:], sizes[:]
+    _report(benchmark, timed, timed_sizes, _peak_traced_mb(replay))
@@ -41,9 +41,57 @@ try:
 except ImportError:  # dash-generate-components < 2.x
     __dash_components__ = [name for name in __all__ if name in globals()]
 
-from .ssrm import distinct_sql, quote_identifier, register_duckdb_ssrm, sql_for
+from .ssrm import (
+    DBAPIBackend,
+    DuckDBBackend,
+    DuckDBDialect,
+    InMemoryBackend,
+    SQLiteBackend,
+    SQLiteDialect,
+    SqlDialect,
+    SsrmBackend,
+    SsrmMetrics,
+    distinct_sql,
+    group_levels_sql,
+    invalidate_ssrm_cache,
+    pivot_keys_sql,
+    pivot_result_fields,
+    quote_identifier,
+    register_duckdb_ssrm,
+    set_ssrm_metrics_hook,
+    set_ssrm_result_cache_limit,
+    sql_for,
+    ssrm_cache_stats,
+    ssrm_executor_stats,
+    ssrm_slow_queries,
+    swap_ssrm_data,
+)
 
-for _extra in ("sql_for", "distinct_sql", "quote_identifier", "register_duckdb_ssrm"):
+for _extra in (
+    "sql_for",
+    "distinct_sql",
+    "pivot_keys_sql",
+    "group_levels_sql",
+    "pivot_result_fields",
+    "quote_identifier",
+    "register_duckdb_ssrm",
+    "ssrm_executor_stats",
+    "swap_ssrm_data",
+    "ssrm_cache_stats",
+    "invalidate_ssrm_cache",
+    "set_ssrm_result_cache_limit",
+    "set_ssrm_metrics_hook",
+    "ssrm_slow_queries",
+    "SsrmMetrics",
+    "SqlDialect",
+    "DuckDBDialect",
+    "SQLiteDialect",
+    "SsrmBackend",
+    "DuckDBBackend",
+    "InMemoryBackend",
+    "SQLiteBackend",
+    "DBAPIBackend",
+):
     if _extra not in __all__:
         __all__.append(_extra)
 if "set_default_props" not in __all__:
@@ -8,17 +8,34 @@ need to declare their DuckDB source in `configArgs`.
 
 from __future__ import annotations
 
+import abc
+import base64
 import datetime as _dt
+import functools
+import hashlib
+import io
+import itertools
+import json
+import os
+import queue
 import re
-import textwrap
-from collections.abc import Callable, Mapping
-from contextlib import contextmanager
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Callable, Mapping, Sequence
+from contextlib import ExitStack, contextmanager
+from decimal import Decimal
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator
 
 import dash
 from dash import hooks
-from flask import jsonify, request
+from flask import Response, jsonify, make_response, request
 
 try:  # pragma: no cover - handled at runtime
     import duckdb  # type: ignore
@@ -28,10 +45,52 @@ except ModuleNotFoundError as exc:  # pragma: no cover - surfaced in register
 else:
     _DUCKDB_IMPORT_ERROR = None
 
-__all__ = ["sql_for", "distinct_sql", "quote_identifier", "register_duckdb_ssrm"]
+try:  # pragma: no cover - optional, only needed for Arrow responses
+    import pyarrow  # type: ignore
+    import pyarrow.ipc  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover - Arrow requests fall back to columnar JSON
+    pyarrow = None  # type: ignore
+
+try:  # pragma: no cover - optional, faster JSON encoding
+    import orjson  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover - falls back to the stdlib encoder
+    orjson = None  # type: ignore
+
+__all__ = [
+    "sql_for",
+    "distinct_sql",
+    "pivot_keys_sql",
+    "pivot_result_fields",
+    "group_levels_sql",
+    "quote_identifier",
+    "register_duckdb_ssrm",
+    "ssrm_executor_stats",
+    "swap_ssrm_data",
+    "ssrm_cache_stats",
+    "invalidate_ssrm_cache",
+    "set_ssrm_result_cache_limit",
+    "set_ssrm_metrics_hook",
+    "ssrm_slow_queries",
+    "SsrmMetrics",
+    "SqlDialect",
+    "DuckDBDialect",
+    "SQLiteDialect",
+    "SsrmBackend",
+    "DuckDBBackend",
+    "InMemoryBackend",
+    "SQLiteBackend",
+    "DBAPIBackend",
+]
 
 
 _DEFAULT_BASE = "_aggrid/ssrm"
+# DuckDB type names (as reported by DESCRIBE) grouped by how values compare
+_INTEGER_TYPES = {
+    "TINYINT", "SMALLINT", "INTEGER", "BIGINT", "HUGEINT",
+    "UTINYINT", "USMALLINT", "UINTEGER", "UBIGINT", "UHUGEINT",
+}
+_FLOAT_TYPES = {"FLOAT", "REAL", "DOUBLE"}
+_TEXT_TYPES = {"VARCHAR", "TEXT", "STRING"}
 _NUMERIC_FUNCS = {
     "sum",
     "avg",
@@ -46,13 +105,116 @@ _NUMERIC_FUNCS = {
     "var_pop",
     "var_samp",
 }
+# aggFunc names accepted from requests; anything else is rejected before SQL is built
+_AGG_FUNCS = _NUMERIC_FUNCS | {"count", "first", "last"}
+# aggFunc spellings AG Grid accepts that DuckDB knows under another name
+_AGG_FUNC_ALIASES = {"average": "avg"}
 _IDENT_RX = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_ROW_COUNT_COLUMN = "__ssrm_row_count"
+# Per-group row count, read by the grid's getChildCount
+_CHILD_COUNT_COLUMN = "childCount"
+# Bookkeeping columns of group_levels_sql results
+_LEVEL_COLUMN = "__ssrm_level"
+_POSITION_COLUMN = "__ssrm_pos"
+# Beyond this many values DuckDB evaluates an inline IN-list faster than a bound list
+_MAX_BOUND_SET_SIZE = 256
+_COUNT_MODES = {"window", "query", "none"}
+_PAGINATION_MODES = {"offset", "keyset"}
+_JSON_ENCODERS = {"auto", "duckdb", "python"}
+_RESPONSE_FORMATS = {"rows", "columnar", "arrow"}
+_ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+_NDJSON_MIMETYPE = "application/x-ndjson"
+_ROW_COUNT_HEADER = "X-AgGrid-Row-Count"
+_DISTINCT_TRUNCATED_HEADER = "X-AgGrid-Distinct-Truncated"
+_EXPORT_ROWS_HEADER = "X-AgGrid-Export-Rows"
+_EXPORT_CAPPED_HEADER = "X-AgGrid-Export-Capped"
+# format -> (file extension, mimetype, DuckDB COPY options, leading bytes)
+_EXPORT_FORMATS = {
+    "csv": ("csv", "text/csv", "FORMAT CSV, HEADER", b""),
+    # a UTF-8 byte-order mark makes Excel decode non-ASCII text correctly
+    "excel": ("csv", "text/csv", "FORMAT CSV, HEADER", b"\xef\xbb\xbf"),
+    "parquet": ("parquet", "application/vnd.apache.parquet", "FORMAT PARQUET", b""),
+}
+_DEFAULT_EXPORT_MAX_ROWS = 1_000_000
+_DEFAULT_EXPORT_CONCURRENCY = 2
+_EXPORT_CHUNK_BYTES = 1 << 16
+_EXPORT_FILENAME_RX = re.compile(r"[^A-Za-z0-9._-]+")
+_PAGING_KEYS = frozenset({"startRow", "endRow", "knownRowCount"})
+# Request fields that describe the transport rather than the data requested
+_TRANSPORT_KEYS = frozenset({"gridId", "grid_id", "responseFormat", "ssrmClientId"})
+# Request fields that only select which leaf columns come back
+_PROJECTION_KEYS = frozenset({"visibleColumns"})
+_KEYSET_CACHE_IGNORED_KEYS = _PAGING_KEYS | _TRANSPORT_KEYS | _PROJECTION_KEYS
+_COUNT_CACHE_IGNORED_KEYS = _KEYSET_CACHE_IGNORED_KEYS | {"sortModel", "grandTotal"}
+# Requests differing only in these fields (e.g. sibling group expansions) do
+# not supersede each other in the query executor
+_GENERATION_IGNORED_KEYS = _KEYSET_CACHE_IGNORED_KEYS | {"groupKeys", "grandTotal", "openGroups"}
+
+_DEFAULT_POOL_SIZE = 8
+# Pooled cursors (and a file's attached parent) stay warm this long when idle;
+# pool_idle_timeout=0 releases a database file as soon as nothing reads it
+_DEFAULT_POOL_IDLE_TIMEOUT = 300.0
+# Catalog a pooled database file is attached under, whatever its file name
+_FILE_CATALOG = "__ssrm_db"
+# Seconds a request waits for a pooled connection before failing with 503
+_DEFAULT_POOL_TIMEOUT = 30.0
+_POOL_HEALTH_CHECK_AFTER = 30.0
+_DEFAULT_COUNT_CACHE_TTL = 300.0
+_COUNT_CACHE_SIZE = 4096
+_KEYSET_CACHE_TTL = 600.0
+_KEYSET_CACHE_SIZE = 8192
+_DEFAULT_MAX_CONCURRENCY = 4
+# Seconds a streamed response may hold its connection and query slot
+_DEFAULT_STREAM_TIMEOUT = 60.0
+_MAX_BATCH_SIZE = 64
+_MAX_PREFETCH_GROUPS = 256
+_DEFAULT_DISTINCT_CACHE_TTL = 300.0
+_DISTINCT_CACHE_SIZE = 512
+# View name an InMemoryBackend built from ``config['data']`` registers
+_DATA_SOURCE_NAME = "ssrm_data"
+_DEFAULT_RESULT_CACHE_TTL = 60.0
+_DEFAULT_RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_RESULT_CACHE_SIZE = 16384
+# Request fields that do not change the response body
+_RESULT_CACHE_IGNORED_KEYS = _TRANSPORT_KEYS | {"knownRowCount"}
+_DEFAULT_AGGREGATE_CACHE_TTL = 300.0
+_AGGREGATE_CACHE_SIZE = 2048
+_IDENTIFIER_CACHE_SIZE = 4096
+# Compiled sql_for clauses, keyed by request shape rather than grid
+_SQL_TEMPLATE_CACHE_SIZE = 1024
+# Pivot key domains, keyed by grid, data version, pivot columns and filters
+_DEFAULT_PIVOT_CACHE_TTL = 300.0
+_PIVOT_CACHE_SIZE = 512
+_MAX_PIVOT_KEYS = 1000
+# AG Grid's default serverSidePivotResultFieldSeparator
+_PIVOT_FIELD_SEPARATOR = "_"
+_PIVOT_EMPTY_COLUMN = "__ssrm_pivot_rows"
+# Aggregates a rollup table can answer from its pre-aggregated measures
+_ROLLUP_FUNCS = {"sum", "min", "max", "count", "avg", "average", "mean"}
+_ROLLUP_LEVEL_COLUMN = "__ssrm_level"
+_ROLLUP_ROWS_COLUMN = "__ssrm_rows"
 
 _SSRM_REGISTRY: dict[str, dict[str, Any]] = {}
 _REGISTERED_BASES: set[str] = set()
 _APP_ROUTE_CACHE: dict[int, set[str]] = {}
-
-
+_POOLS: dict[str, "_ConnectionPool"] = {}
+_POOLS_LOCK = threading.Lock()
+_EXECUTOR: "_QueryExecutor | None" = None
+_EXECUTOR_LOCK = threading.Lock()
+_METRICS_HOOK: Callable[[dict[str, Any]], Any] | None = None
+_SLOW_QUERY_LOG_SIZE = 100
+_SLOW_QUERIES: deque[dict[str, Any]] = deque(maxlen=_SLOW_QUERY_LOG_SIZE)
+# Slow queries are explained one at a time; beyond this backlog they are
+# logged without a plan, and the same SQL is explained at most once per interval
+_SLOW_QUERY_QUEUE_SIZE = 16
+_SLOW_QUERY_EXPLAIN_INTERVAL = 300.0
+_SLOW_QUERY_QUEUE: queue.Queue = queue.Queue(maxsize=_SLOW_QUERY_QUEUE_SIZE)
+_SLOW_QUERY_LOCK = threading.Lock()
+_SLOW_QUERY_PENDING: set[str] = set()
+_SLOW_QUERY_WORKER: threading.Thread | None = None
+
+
+@functools.lru_cache(maxsize=_IDENTIFIER_CACHE_SIZE)
 def quote_identifier(raw: str) -> str:
     """
     Quote a SQL identifier for use in generated statements.
@@ -77,13 +239,11 @@ def _sql_literal(val: Any) -> str:
     return str(val)
 
 
-def _date_literal(val: Any) -> str:
-    if isinstance(val, (_dt.date, _dt.datetime)):
-        return (
-            f"DATE '{val.date().isoformat()}'"
-            if isinstance(val, _dt.datetime)
-            else f"DATE '{val.isoformat()}'"
-        )
+def _parse_date(val: Any) -> _dt.date | None:
+    if isinstance(val, _dt.datetime):
+        return val.date()
+    if isinstance(val, _dt.date):
+        return val
 
     if isinstance(val, str):
         try:
@@ -92,16 +252,238 @@ def _date_literal(val: Any) -> str:
             try:
                 parsed = _dt.datetime.strptime(val, "%Y-%m-%d")
             except ValueError:
-                return _sql_literal(val)
-        return f"DATE '{parsed.date().isoformat()}'"
+                return None
+        return parsed.date()
+
+    return None
+
+
+def _date_literal(val: Any, dialect: "SqlDialect | None" = None) -> str:
+    parsed = _parse_date(val)
+    if parsed is None:
+        return _sql_literal(val)
+    return (dialect or _DUCKDB_DIALECT).date_literal(parsed)
+
+
+def _column_kind(column_type: str | None) -> str | None:
+    """
+    Classify a DESCRIBE type as ``"integer"``, ``"float"`` (incl. DECIMAL),
+    ``"text"``, ``"date"``, ``"timestamp"``, ``"boolean"`` or ``"other"``;
+    ``None`` when the type is unknown.
+    """
+    if not column_type:
+        return None
+    name = str(column_type).upper().split("(", 1)[0].strip()
+    if name in _INTEGER_TYPES:
+        return "integer"
+    if name in _FLOAT_TYPES or name in {"DECIMAL", "NUMERIC"}:
+        return "float"
+    if name in _TEXT_TYPES:
+        return "text"
+    if name == "DATE":
+        return "date"
+    if name.startswith("TIMESTAMP"):
+        return "timestamp"
+    if name == "BOOLEAN":
+        return "boolean"
+    return "other"
+
+
+def _native_value(kind: str | None, val: Any) -> Any:
+    """
+    Convert a filter value (often a string from the client) to the column's
+    native type, so comparisons bind without casting the column.  Values
+    that do not convert cleanly are returned unchanged.
+    """
+    if val is None or kind is None or isinstance(val, bool):
+        return val
+    try:
+        if kind == "integer":
+            if isinstance(val, float) and val.is_integer():
+                return int(val)
+            if isinstance(val, str) and re.fullmatch(r"\s*[-+]?\d+\s*", val):
+                return int(val)
+        elif kind == "float" and isinstance(val, str):
+            return float(val)
+        elif kind == "boolean" and isinstance(val, str) and val.lower() in {"true", "false"}:
+            return val.lower() == "true"
+        elif kind == "date" and isinstance(val, str):
+            return _parse_date(val) or val
+    except ValueError:
+        pass
+    return val
+
+
+class SqlDialect:
+    """
+    Engine-specific SQL rendering used by :func:`sql_for` and
+    :func:`distinct_sql`.
+
+    The base class emits portable ANSI SQL: double-quoted identifiers,
+    ``LOWER(...) LIKE LOWER(...)`` for case-insensitive matching and plain
+    ``CAST`` for numeric aggregates.  Subclass it and override the hooks below
+    for other engines; ``paramstyle`` may be ``"qmark"`` (``?``) or
+    ``"format"`` (``%s``).  Dialects with ``"format"`` placeholders are always
+    rendered parameterized so literal ``%`` signs can be escaped reliably.
+    """
+
+    name = "ansi"
+    grouping_sets = True
+    paramstyle = "qmark"
+    #: whether a Python list may be bound to one placeholder (``UNNEST(?)``)
+    array_params = False
+
+    @property
+    def placeholder(self) -> str:
+        return "%s" if self.paramstyle == "format" else "?"
+
+    @property
+    def wildcard(self) -> str:
+        return "'%%'" if self.paramstyle == "format" else "'%'"
+
+    def quote_identifier(self, raw: str) -> str:
+        return quote_identifier(raw)
+
+    def quote_alias(self, raw: str) -> str:
+        """Quote an arbitrary output column name, such as a pivot result field."""
+        quoted = '"' + str(raw).replace('"', '""') + '"'
+        return quoted.replace("%", "%%") if self.paramstyle == "format" else quoted
+
+    def ilike(self, col: str, pattern: str, *, negate: bool = False) -> str:
+        op = "NOT LIKE" if negate else "LIKE"
+        return f"LOWER({col}) {op} LOWER({pattern})"
+
+    def try_cast_double(self, expr: str) -> str:
+        return f"CAST({expr} AS DOUBLE PRECISION)"
+
+    def date_literal(self, day: _dt.date) -> str:
+        return f"DATE '{day.isoformat()}'"
+
+    def date_param(self, day: _dt.date) -> Any:
+        return day
+
+    def explain(self, sql: str) -> str:
+        """Statement returning the plan of ``sql`` for the slow-query log."""
+        return f"EXPLAIN {sql}"
+
+    def prefix_match(self, col: str, prefix: str, binder: "_Binder") -> str:
+        """Case-insensitive ``col`` starts with ``prefix`` (already lower-cased)."""
+        return (
+            f"SUBSTR(LOWER(CAST({col} AS VARCHAR)), 1, {len(prefix)}) = {binder.value(prefix)}"
+        )
+
+
+class DuckDBDialect(SqlDialect):
+    """DuckDB: ``ILIKE``, ``try_cast`` and list parameters."""
+
+    name = "duckdb"
+    array_params = True
+
+    def ilike(self, col: str, pattern: str, *, negate: bool = False) -> str:
+        return f"{col} {'NOT ILIKE' if negate else 'ILIKE'} {pattern}"
+
+    def try_cast_double(self, expr: str) -> str:
+        return f"try_cast({expr} AS DOUBLE)"
+
+    def prefix_match(self, col: str, prefix: str, binder: "_Binder") -> str:
+        return f"starts_with(lower(CAST({col} AS VARCHAR)), {binder.value(prefix)})"
+
+    def explain(self, sql: str) -> str:
+        return f"EXPLAIN ANALYZE {sql}"
+
+
+class SQLiteDialect(SqlDialect):
+    """
+    SQLite: ``LIKE`` is already case-insensitive for ASCII, numbers cast to
+    ``REAL`` and dates are compared as ISO-8601 text.
+    """
+
+    name = "sqlite"
+    grouping_sets = False
+
+    def ilike(self, col: str, pattern: str, *, negate: bool = False) -> str:
+        return f"{col} {'NOT LIKE' if negate else 'LIKE'} {pattern}"
+
+    def try_cast_double(self, expr: str) -> str:
+        return f"CAST({expr} AS REAL)"
+
+    def date_literal(self, day: _dt.date) -> str:
+        return f"'{day.isoformat()}'"
 
-    return _sql_literal(val)
+    def date_param(self, day: _dt.date) -> Any:
+        return day.isoformat()
 
+    def explain(self, sql: str) -> str:
+        return f"EXPLAIN QUERY PLAN {sql}"
 
-def _number_pred(col: str, node: Mapping[str, Any]) -> str:
+
+_DUCKDB_DIALECT = DuckDBDialect()
+
+
+class _Binder:
+    """
+    Render request values into SQL.
+
+    By default values are inlined as escaped literals.  In parameterized mode
+    each value becomes a placeholder (``?`` unless the dialect says
+    otherwise) and is appended to ``params`` in the order it appears in the
+    statement.  ``schema`` (column name to DESCRIBE type) lets predicates
+    bind values in the column's native type.
+    """
+
+    def __init__(
+        self,
+        parameterized: bool = False,
+        dialect: SqlDialect | None = None,
+        schema: Mapping[str, str] | None = None,
+    ) -> None:
+        self.dialect = dialect or _DUCKDB_DIALECT
+        self.parameterized = parameterized or self.dialect.paramstyle == "format"
+        self.schema = schema or {}
+        self.params: list[Any] = []
+
+    def kind(self, col_id: str) -> str | None:
+        """The :func:`_column_kind` of ``col_id``, when the schema is known."""
+        return _column_kind(self.schema.get(col_id)) if self.schema else None
+
+    def value(self, val: Any) -> str:
+        if not self.parameterized:
+            return _sql_literal(val)
+        self.params.append(val)
+        return self.dialect.placeholder
+
+    def date(self, val: Any) -> str:
+        if not self.parameterized:
+            return _date_literal(val, self.dialect)
+        parsed = _parse_date(val)
+        self.params.append(val if parsed is None else self.dialect.date_param(parsed))
+        return self.dialect.placeholder
+
+    def membership(self, col: str, values: list[Any]) -> str:
+        if not values:
+            return "1=0"
+        if self.parameterized and not self.dialect.array_params:
+            return f"{col} IN ({', '.join(self.value(v) for v in values)})"
+        if self.parameterized and len(values) <= _MAX_BOUND_SET_SIZE:
+            self.params.append(values)
+            return f"{col} IN (SELECT UNNEST({self.dialect.placeholder}))"
+        literals = ", ".join(_sql_literal(v) for v in values)
+        return f"{col} IN ({literals})"
+
+
+def _number_pred(
+    col: str,
+    node: Mapping[str, Any],
+    binder: _Binder | None = None,
+    kind: str | None = None,
+) -> str:
     """
     Convert a single number/date filter leaf into a SQL predicate.
+
+    ``kind`` (see :func:`_column_kind`) converts number-filter values to the
+    column's type first, e.g. ``5.0`` to ``5`` for integer columns.
     """
+    binder = binder or _Binder()
     op = node.get("type", "equals")
     val = node.get("filter")
     val2 = node.get("filterTo")
@@ -110,12 +492,18 @@ def _number_pred(col: str, node: Mapping[str, Any]) -> str:
         # AG Grid uses dateFrom/dateTo for date filters; fall back to filter/filterTo
         val = node.get("dateFrom", val)
         val2 = node.get("dateTo", val2)
-        literal = _date_literal
+        literal = binder.date
     else:
-        literal = _sql_literal
+        val = _native_value(kind, val)
+        val2 = _native_value(kind, val2)
+        literal = binder.value
+
+    if op in ("blank", "notBlank"):
+        return f"{col} IS NULL" if op == "blank" else f"{col} IS NOT NULL"
 
     lit = literal(val)
-    lit2 = literal(val2)
+    if op == "inRange":
+        return f"{col} BETWEEN {lit} AND {literal(val2)}"
 
     if op == "equals":
         return f"{col} = {lit}"
@@ -129,57 +517,56 @@ def _number_pred(col: str, node: Mapping[str, Any]) -> str:
         return f"{col} > {lit}"
     if op == "greaterThanOrEqual":
         return f"{col} >= {lit}"
-    if op == "inRange":
-        return f"{col} BETWEEN {lit} AND {lit2}"
-    if op == "blank":
-        return f"{col} IS NULL"
-    if op == "notBlank":
-        return f"{col} IS NOT NULL"
 
     raise ValueError(f"Unsupported number-filter op: {op}")
 
 
-def _text_pred(col: str, node: Mapping[str, Any]) -> str:
+def _text_pred(col: str, node: Mapping[str, Any], binder: _Binder | None = None) -> str:
     op = node.get("type", "contains")
-    lit = _sql_literal(node.get("filter", ""))
+    if op == "blank":
+        return f"({col} IS NULL OR {col} = '')"
+    if op == "notBlank":
+        return f"({col} IS NOT NULL AND {col} <> '')"
+
+    binder = binder or _Binder()
+    lit = binder.value(node.get("filter", ""))
+    dialect = binder.dialect
+    wildcard = dialect.wildcard
 
     if op == "contains":
-        return f"{col} ILIKE '%' || {lit} || '%'"
+        return dialect.ilike(col, f"{wildcard} || {lit} || {wildcard}")
     if op in ("notContains", "doesNotContain"):
-        return f"{col} NOT ILIKE '%' || {lit} || '%'"
+        return dialect.ilike(col, f"{wildcard} || {lit} || {wildcard}", negate=True)
     if op == "equals":
         return f"{col} = {lit}"
     if op == "notEqual":
         return f"{col} <> {lit}"
     if op in ("startsWith", "beginsWith"):
-        return f"{col} ILIKE {lit} || '%'"
+        return dialect.ilike(col, f"{lit} || {wildcard}")
     if op == "endsWith":
-        return f"{col} ILIKE '%' || {lit}"
-    if op == "blank":
-        return f"({col} IS NULL OR {col} = '')"
-    if op == "notBlank":
-        return f"({col} IS NOT NULL AND {col} <> '')"
+        return dialect.ilike(col, f"{wildcard} || {lit}")
 
     raise ValueError(f"Unsupported text-filter op: {op}")
 
 
-def _child_to_sql(col: str | None, node: Mapping[str, Any]) -> str:
+def _child_to_sql(col: str | None, node: Mapping[str, Any], binder: _Binder | None = None) -> str:
     """
     Recursively translate a filter tree (advanced filter or per-column node).
     """
+    binder = binder or _Binder()
     if not node:
         return "1=1"
 
     col_id = col or node.get("colId")
     if not col_id:
         raise ValueError("Filter node missing colId")
-    col_expr = quote_identifier(str(col_id))
+    col_expr = binder.dialect.quote_identifier(str(col_id))
 
     filter_type = node.get("filterType")
     if filter_type == "join":
         op = node.get("type", "AND").upper()
         parts = [
-            _child_to_sql(None, child)
+            _child_to_sql(None, child, binder)
             for child in node.get("conditions", [])
             if child
         ]
@@ -188,7 +575,7 @@ def _child_to_sql(col: str | None, node: Mapping[str, Any]) -> str:
     if filter_type == "multi":
         op = node.get("operator", "OR").upper()
         parts = [
-            _child_to_sql(col_id, child)
+            _child_to_sql(col_id, child, binder)
             for child in node.get("conditions", [])
             if child
         ]
@@ -200,63 +587,42 @@ def _child_to_sql(col: str | None, node: Mapping[str, Any]) -> str:
             node.get("condition1"),
             node.get("condition2"),
         ]
-        parts = [_child_to_sql(col_id, child) for child in conditions if child]
+        parts = [_child_to_sql(col_id, child, binder) for child in conditions if child]
         return "(" + f" {op} ".join(parts) + ")" if parts else "1=1"
 
+    kind = binder.kind(str(col_id))
     if filter_type in {"number", "date"}:
-        return _number_pred(col_expr, node)
+        return _number_pred(col_expr, node, binder, kind)
 
     if filter_type == "text":
-        return _text_pred(col_expr, node)
+        if kind not in (None, "text"):
+            # text matching on a typed column compares its string form
+            col_expr = f"CAST({col_expr} AS VARCHAR)"
+        return _text_pred(col_expr, node, binder)
 
     if filter_type == "set":
         values = node.get("values") or []
         if not isinstance(values, Iterable):
             raise ValueError("Set filter values must be iterable")
-        literals = ", ".join(_sql_literal(v) for v in values)
-        if not literals:
-            return "1=0"
-        return f"{col_expr} IN ({literals})"
+        return binder.membership(col_expr, [_native_value(kind, value) for value in values])
 
     raise ValueError(f"Unsupported filterType: {filter_type}")
 
 
-def _agg_expr(col: str, func: str) -> str:
-    func_norm = (func or "").lower()
-    if func_norm in _NUMERIC_FUNCS:
-        return f"{func_norm.upper()}(try_cast({col} AS DOUBLE)) AS {col}"
-    if func_norm == "count":
-        return f"COUNT({col}) AS {col}"
-    return f"{func_norm.upper()}({col}) AS {col}"
-
-
-def sql_for(request: Mapping[str, Any] | None, table: str | Any) -> str:
+def _grouping(req: Mapping[str, Any], dialect: SqlDialect | None = None) -> dict[str, Any]:
     """
-    Build an SQL query that reflects the passed AG Grid SSRM request.
+    Resolve the grouping state of an SSRM request.
 
-    Parameters
-    ----------
-    request:
-        The ``params.request`` payload emitted by AG Grid's datasource.
-    table:
-        Table name, schema-qualified table, sub-query, or any object exposing
-        ``sql()`` (e.g. DuckDB relations).
+    Row-group and value columns fall back to ``columnState`` when the request
+    does not list them explicitly.  ``depth`` is the number of open group keys
+    and ``at_leaf`` tells whether the request targets leaf rows.
+    ``pivot_cols`` holds the pivot columns when ``pivotMode`` is on.  ``quote``
+    is the dialect's identifier quoting, reused by :func:`_sort_keys`.
     """
-    req = dict(request or {})
-
-    if isinstance(table, str):
-        if not table.lstrip(" (").startswith(("SELECT", "(")):
-            table_sql = table
-        else:
-            table_sql = table
-    else:
-        if not hasattr(table, "sql"):
-            raise TypeError("table must be a string or expose a .sql() method")
-        table_sql = f"({table.sql()}) AS t"
-
+    quote = (dialect or _DUCKDB_DIALECT).quote_identifier
     column_state = req.get("columnState") or []
     column_state_lookup = {
-        col["colId"]: quote_identifier(str(col["colId"]))
+        col["colId"]: quote(str(col["colId"]))
         for col in column_state
         if col.get("colId")
     }
@@ -278,82 +644,272 @@ def sql_for(request: Mapping[str, Any] | None, table: str | Any) -> str:
         ]
 
     group_keys = req.get("groupKeys") or []
-
-    filters = []
-    filter_model = req.get("filterModel") or {}
-    if filter_model:
-        if isinstance(filter_model, Mapping) and "filterType" in filter_model:
-            filters.append(_child_to_sql(None, filter_model))
-        else:
-            for col, node in filter_model.items():
-                filters.append(_child_to_sql(col, node))
-
     group_cols = [
         {
             "field": entry["field"],
             "expr": column_state_lookup.get(
                 entry["field"],
-                quote_identifier(str(entry["field"])),
+                quote(str(entry["field"])),
             ),
         }
         for entry in row_group_cols
         if entry.get("field")
     ]
-    for group_meta, key_val in zip(group_cols, group_keys):
-        filters.append(f"{group_meta['expr']} = {_sql_literal(key_val)}")
+    depth = len(group_keys)
 
-    where_clause = (
-        "WHERE " + " AND ".join(filters) if filters else ""
-    )
+    pivot_cols = [
+        {
+            "field": entry["field"],
+            "expr": column_state_lookup.get(entry["field"], quote(str(entry["field"]))),
+        }
+        for entry in (req.get("pivotCols") or () if req.get("pivotMode") else ())
+        if entry.get("field")
+    ]
 
-    depth = len(group_keys)
-    at_leaf = depth >= len(group_cols)
+    return {
+        "column_state_lookup": column_state_lookup,
+        "group_cols": group_cols,
+        "value_cols": value_cols,
+        "group_keys": group_keys,
+        "depth": depth,
+        "at_leaf": depth >= len(group_cols),
+        "pivot_cols": pivot_cols,
+        "quote": quote,
+    }
 
-    if at_leaf:
-        select_cols = ["*"]
-        group_by_clause = ""
-    else:
-        next_group = group_cols[depth]["expr"]
-        select_cols = [next_group]
-        select_cols.extend(
-            _agg_expr(
-                column_state_lookup.get(
-                    v["field"],
-                    quote_identifier(str(v["field"])),
-                ),
-                v.get("aggFunc", "sum"),
-            )
-            for v in value_cols
-            if v.get("field")
-        )
-        group_by_clause = f"GROUP BY {next_group}"
 
+def _sort_keys(
+    req: Mapping[str, Any],
+    grouping: Mapping[str, Any],
+    keyset: str | None = None,
+    schema: Mapping[str, str] | None = None,
+    pivot_fields: Mapping[str, str] | None = None,
+) -> list[tuple[str, str]]:
+    """
+    Return the ``(expr, direction)`` pairs a request sorts by.
+
+    Leaf levels may sort by any column listed in ``columnState`` or in
+    ``schema``; group levels by the grouped column and the value columns, or
+    the pivot result columns (``pivot_fields``, field to quoted alias) when
+    pivoting.  With ``keyset`` the tie-breaker column is appended at leaf
+    level so the order is total.
+    """
+    column_state_lookup = grouping["column_state_lookup"]
+    quote = grouping["quote"]
     allowed_for_sort: set[str] = set()
-    if at_leaf:
+    if grouping["at_leaf"]:
         allowed_for_sort.update(column_state_lookup.values())
+        allowed_for_sort.update(quote(col) for col in schema or ())
+    elif pivot_fields is not None:
+        allowed_for_sort.add(grouping["group_cols"][grouping["depth"]]["expr"])
     else:
-        allowed_for_sort.add(group_cols[depth]["expr"])
+        allowed_for_sort.add(grouping["group_cols"][grouping["depth"]]["expr"])
         allowed_for_sort.update(
             column_state_lookup.get(
-                v["field"], quote_identifier(str(v["field"]))
+                v["field"], quote(str(v["field"]))
             )
-            for v in value_cols
+            for v in grouping["value_cols"]
             if v.get("field")
         )
 
-    sort_clauses: list[str] = []
+    sort_keys: list[tuple[str, str]] = []
     for entry in req.get("sortModel") or []:
         col_id = entry.get("colId")
         direction = entry.get("sort")
         if not col_id or not direction:
             continue
+        if pivot_fields and col_id in pivot_fields:
+            sort_keys.append((pivot_fields[col_id], direction.upper()))
+            continue
         col_expr = column_state_lookup.get(col_id)
         if not col_expr:
-            col_expr = quote_identifier(str(col_id))
+            col_expr = quote(str(col_id))
         if col_expr not in allowed_for_sort:
             continue
-        sort_clauses.append(f"{col_expr} {direction.upper()}")
-    order_clause = "ORDER BY " + ", ".join(sort_clauses) if sort_clauses else ""
+        sort_keys.append((col_expr, direction.upper()))
+
+    if keyset and grouping["at_leaf"]:
+        keyset_expr = quote(keyset)
+        if all(expr != keyset_expr for expr, _ in sort_keys):
+            sort_keys.append((keyset_expr, "ASC"))
+    return sort_keys
+
+
+def _seek_predicate(sort_keys: list[tuple[str, str]], values: Sequence[Any], binder: _Binder) -> str:
+    """
+    Select rows strictly after ``values`` in ``ORDER BY ... NULLS LAST`` order.
+
+    Expands to ``(k1 after v1) OR (k1 = v1 AND k2 after v2) OR ...``; nothing
+    sorts after a NULL, and NULLs sort after every non-NULL value.
+    """
+    branches = []
+    for index, (expr, direction) in enumerate(sort_keys):
+        value = values[index]
+        if value is None:
+            continue
+        op = ">" if direction == "ASC" else "<"
+        ties = [
+            f"{prev_expr} IS NOT DISTINCT FROM {binder.value(prev_value)}"
+            for (prev_expr, _), prev_value in zip(sort_keys[:index], values[:index])
+        ]
+        after = f"({expr} {op} {binder.value(value)} OR {expr} IS NULL)"
+        branches.append("(" + " AND ".join(ties + [after]) + ")")
+    return "(" + " OR ".join(branches) + ")" if branches else "1=0"
+
+
+def _agg_expr(
+    col: str,
+    func: str,
+    dialect: SqlDialect | None = None,
+    column_type: str | None = None,
+    *,
+    where: str | None = None,
+    alias: str | None = None,
+) -> str:
+    """
+    Render ``func(col) AS col`` (or ``AS alias``).  Numeric aggregates cast
+    unknown or text columns to a double; columns already numeric per
+    ``column_type`` are aggregated natively, and types no numeric aggregate
+    applies to (dates, booleans, nested types) are rejected.  ``where``
+    restricts the aggregate with ``FILTER (WHERE ...)``, as pivot result
+    columns do.  ``func`` must be one of ``_AGG_FUNCS``; other names raise
+    ``ValueError`` so request JSON never reaches the SQL text.
+    """
+    func_norm = str(func or "").lower()
+    if func_norm not in _AGG_FUNCS:
+        raise ValueError(f"Unsupported aggFunc {func!r}")
+    func_norm = _AGG_FUNC_ALIASES.get(func_norm, func_norm)
+    kind = _column_kind(column_type)
+    if func_norm in _NUMERIC_FUNCS:
+        if kind in ("integer", "float") or (kind is not None and func_norm in ("min", "max")):
+            call = f"{func_norm.upper()}({col})"
+        elif kind not in (None, "text"):
+            raise ValueError(f"aggFunc {func!r} cannot aggregate {column_type} column {col}")
+        else:
+            numeric = (dialect or _DUCKDB_DIALECT).try_cast_double(col)
+            call = f"{func_norm.upper()}({numeric})"
+    elif func_norm == "count":
+        call = f"COUNT({col})"
+    else:
+        call = f"{func_norm.upper()}({col})"
+    if where:
+        call += f" FILTER (WHERE {where})"
+    return f"{call} AS {alias or col}"
+
+
+def sql_for(
+    request: Mapping[str, Any] | None,
+    table: str | Any,
+    *,
+    row_count: bool = False,
+    parameterized: bool = False,
+    keyset: str | None = None,
+    seek: Sequence[Any] | None = None,
+    dialect: SqlDialect | None = None,
+    columns: Sequence[str] | None = None,
+    schema: Mapping[str, str] | None = None,
+    pivot_keys: Sequence[Sequence[Any]] | None = None,
+    child_count: bool = False,
+    grand_total: bool = False,
+) -> str | tuple[str, list[Any]]:
+    """
+    Build an SQL query that reflects the passed AG Grid SSRM request.
+
+    Parameters
+    ----------
+    request:
+        The ``params.request`` payload emitted by AG Grid's datasource.
+    table:
+        Table name, schema-qualified table, sub-query, or any object exposing
+        ``sql()`` (e.g. DuckDB relations).
+    row_count:
+        When true, append a ``COUNT(*) OVER ()`` column named
+        ``__ssrm_row_count`` so the page and the unpaged total come back from
+        a single execution.  The window is evaluated before ``LIMIT`` (and
+        after ``GROUP BY``), so it counts leaf rows or groups respectively.
+    parameterized:
+        When true, return ``(sql, params)`` with every request value bound
+        through a ``?`` placeholder instead of inlined, so the SQL text only
+        depends on the shape of the request.  Set filters with more than 256
+        values stay inlined because DuckDB evaluates long literal IN-lists
+        faster than bound lists.
+    keyset:
+        Unique column used as a tie-breaker so leaf rows have a total order.
+        It is appended to the leaf ``ORDER BY`` (which becomes explicitly
+        ``NULLS LAST``) and enables ``seek``.
+    seek:
+        Values of the leaf sort keys (see :func:`_sort_keys`) for the last row
+        of the previous block.  Instead of ``OFFSET``, rows after that tuple
+        are selected with a ``WHERE`` seek predicate, so deep blocks no longer
+        produce and discard every preceding row.  Ignored at group levels.
+    dialect:
+        :class:`SqlDialect` controlling identifier quoting, case-insensitive
+        matching, numeric casts and placeholders.  Defaults to DuckDB.
+    columns:
+        Leaf columns to select instead of ``*``.  The row-group, sort and
+        ``keyset`` columns are always added so grouping and seeking keep
+        working.  Ignored at group levels.
+    schema:
+        Column name to type mapping (``DESCRIBE`` output).  When given,
+        filter values are bound in the column's native type, text filters on
+        non-text columns compare their ``VARCHAR`` form, numeric columns are
+        aggregated without ``TRY_CAST``, leaf rows may sort by any column,
+        and aggregating an unknown column or one whose type the ``aggFunc``
+        cannot handle (e.g. ``sum`` of a ``DATE``) raises ``ValueError``.
+    pivot_keys:
+        Value tuples of the request's ``pivotCols`` (see
+        :func:`pivot_keys_sql`).  In ``pivotMode`` each value column is then
+        aggregated once per tuple with ``FILTER (WHERE ...)``, in a column
+        named by :func:`pivot_result_fields`; the leaf level of a pivot
+        without row groups is a single totals row.  Pivot requests are
+        aggregated unpivoted when this is omitted.
+    child_count:
+        When true, group levels also select ``COUNT(*) AS "childCount"``.
+    grand_total:
+        When true and the request targets the top group level, aggregate
+        with ``GROUPING SETS ((group), ())`` so the grand total comes from
+        the same scan.  It sorts first and is returned as the first row of
+        the block starting at row 0 (later blocks skip it); the window count
+        excludes it.  Not supported by dialects without ``GROUPING SETS``.
+    """
+    req = request or {}
+    binder = _Binder(parameterized, dialect, schema)
+    dialect = binder.dialect
+
+    if isinstance(table, str):
+        table_sql = table
+    else:
+        if not hasattr(table, "sql"):
+            raise TypeError("table must be a string or expose a .sql() method")
+        table_sql = f"({table.sql()}) AS t"
+
+    template = _sql_template(
+        req,
+        table_sql,
+        dialect,
+        row_count=row_count,
+        keyset=keyset,
+        seeking=seek is not None,
+        columns=columns,
+        schema=schema,
+        pivot_keys=pivot_keys,
+        parameterized=binder.parameterized,
+        child_count=child_count,
+        grand_total=grand_total,
+    )
+    binder.params.extend(template["select_params"])
+
+    filters = _filter_clauses(req.get("filterModel"), binder)
+    for expr, key_val in zip(template["group_exprs"], req.get("groupKeys") or ()):
+        filters.append(f"{expr} = {binder.value(key_val)}")
+
+    keyset_active = template["keyset_active"]
+    if keyset_active and seek is not None:
+        if len(seek) != len(template["sort_keys"]):
+            raise ValueError("seek values must match the keyset sort columns")
+        filters.append(_seek_predicate(template["sort_keys"], seek, binder))
+
+    where_clause = "WHERE " + " AND ".join(filters) if filters else ""
 
     limit_clause = ""
     start_row = req.get("startRow")
@@ -365,26 +921,646 @@ def sql_for(request: Mapping[str, Any] | None, table: str | Any) -> str:
         except (TypeError, ValueError):
             limit = None
             offset = None
-        if limit is not None and limit >= 0:
-            limit_clause = f"LIMIT {limit} OFFSET {offset or 0}"
+        if limit is not None and limit >= 0 and keyset_active and seek is not None:
+            # The seek predicate already skips the preceding rows
+            limit_clause = f"LIMIT {binder.value(limit)}"
+        elif limit is not None and limit >= 0 and template["grand_total"]:
+            # The grand total sorts first: include it in the first block only
+            if offset:
+                offset += 1
+            else:
+                limit += 1
+            limit_clause = f"LIMIT {binder.value(limit)} OFFSET {binder.value(offset or 0)}"
+        elif limit is not None and limit >= 0:
+            limit_clause = (
+                f"LIMIT {binder.value(limit)} OFFSET {binder.value(offset or 0)}"
+            )
+
+    clauses = (
+        template["select"],
+        template["source"],
+        where_clause,
+        template["group_by"],
+        template["order_by"],
+        limit_clause,
+    )
+    sql = "\n".join(clause for clause in clauses if clause)
+    if binder.parameterized:
+        return sql, binder.params
+    return sql
+
+
+def _sql_template(
+    req: Mapping[str, Any],
+    table_sql: str,
+    dialect: SqlDialect,
+    *,
+    row_count: bool,
+    keyset: str | None,
+    seeking: bool,
+    columns: Sequence[str] | None = None,
+    schema: Mapping[str, str] | None = None,
+    pivot_keys: Sequence[Sequence[Any]] | None = None,
+    parameterized: bool = False,
+    child_count: bool = False,
+    grand_total: bool = False,
+) -> dict[str, Any]:
+    """
+    Return the value-independent clauses of :func:`sql_for` for ``req``.
+
+    SELECT list, GROUP BY and ORDER BY depend only on the request's shape
+    (column state, grouping depth, value columns, pivot keys and sort), so
+    they are compiled once per shape and reused; filters, group keys, seek
+    values and paging are bound on every call.  Pivot key values bound in
+    the SELECT list are kept in ``select_params``.
+    """
+    try:
+        key = _sql_template_key(
+            req, table_sql, dialect, row_count, keyset, seeking, columns, schema,
+            pivot_keys, parameterized, child_count, grand_total,
+        )
+    except TypeError:
+        # unhashable request fields (not produced by AG Grid); compile uncached
+        key = None
+    template = _SQL_TEMPLATE_CACHE.get(key) if key is not None else None
+    if template is not None:
+        return template
+
+    grouping = _grouping(req, dialect)
+    column_state_lookup = grouping["column_state_lookup"]
+    group_cols = grouping["group_cols"]
+    depth = grouping["depth"]
+    at_leaf = grouping["at_leaf"]
+    pivoting = bool(grouping["pivot_cols"]) and pivot_keys is not None
+    keyset_active = bool(keyset) and at_leaf and not pivoting
+    grand_total = _wants_grand_total(grouping, grand_total)
+    if grand_total and not dialect.grouping_sets:
+        raise ValueError(f"The {dialect.name} dialect does not support grand totals")
+    select_binder = _Binder(parameterized, dialect)
+
+    if pivoting:
+        fields = pivot_result_fields(req, pivot_keys)
+        aliases = [dialect.quote_alias(field) for field in fields]
+        sort_keys = (
+            []
+            if at_leaf
+            else _sort_keys(req, grouping, schema=schema, pivot_fields=dict(zip(fields, aliases)))
+        )
+        select_cols = [] if at_leaf else [group_cols[depth]["expr"]]
+        select_cols.extend(_pivot_aggregates(grouping, pivot_keys, aliases, select_binder, schema))
+        if not select_cols:
+            # no pivot keys under the current filters: one row without values
+            select_cols.append(f"COUNT(*) AS {dialect.quote_identifier(_PIVOT_EMPTY_COLUMN)}")
+        group_by_clause = "" if at_leaf else _group_by(group_cols[depth]["expr"], grand_total)
+    elif at_leaf:
+        sort_keys = _sort_keys(req, grouping, keyset, schema)
+        select_cols = (
+            _leaf_projection(columns, grouping, sort_keys, keyset, dialect) if columns else ["*"]
+        )
+        group_by_clause = ""
+    else:
+        sort_keys = _sort_keys(req, grouping, keyset, schema)
+        next_group = group_cols[depth]["expr"]
+        select_cols = [next_group]
+        for v in grouping["value_cols"]:
+            if not v.get("field"):
+                continue
+            column_type = None
+            if schema:
+                column_type = schema.get(str(v["field"]))
+                if column_type is None:
+                    raise ValueError(f"Unknown value column: {v['field']!r}")
+            select_cols.append(
+                _agg_expr(
+                    column_state_lookup.get(
+                        v["field"],
+                        dialect.quote_identifier(str(v["field"])),
+                    ),
+                    v.get("aggFunc", "sum"),
+                    dialect,
+                    column_type,
+                )
+            )
+        group_by_clause = _group_by(next_group, grand_total)
+
+    if child_count and not at_leaf:
+        select_cols.append(f"COUNT(*) AS {dialect.quote_identifier(_CHILD_COUNT_COLUMN)}")
+    if row_count:
+        # the grand total row is not one of the groups being counted
+        window_count = "COUNT(*) OVER () - 1" if grand_total else "COUNT(*) OVER ()"
+        select_cols.append(f"{window_count} AS {dialect.quote_identifier(_ROW_COUNT_COLUMN)}")
+
+    null_order = " NULLS LAST" if keyset_active else ""
+    sort_clauses = [f"{expr} {direction}{null_order}" for expr, direction in sort_keys]
+    if grand_total:
+        sort_clauses.insert(0, f"GROUPING({group_cols[depth]['expr']}) DESC")
+
+    template = {
+        "select": f"SELECT {', '.join(select_cols)}",
+        "source": f"FROM {table_sql}",
+        "group_by": group_by_clause,
+        "order_by": "ORDER BY " + ", ".join(sort_clauses) if sort_clauses else "",
+        "group_exprs": [col["expr"] for col in group_cols[:depth]],
+        "sort_keys": sort_keys,
+        "keyset_active": keyset_active,
+        "select_params": select_binder.params if select_binder.parameterized else [],
+        "grand_total": grand_total,
+    }
+    if key is not None:
+        _SQL_TEMPLATE_CACHE.set(key, template)
+    return template
+
+
+def group_levels_sql(
+    request: Mapping[str, Any] | None,
+    table: str | Any,
+    open_groups: Sequence[Sequence[Any]],
+    *,
+    parameterized: bool = False,
+    dialect: SqlDialect | None = None,
+    schema: Mapping[str, str] | None = None,
+    child_count: bool = False,
+) -> str | tuple[str, list[Any]]:
+    """
+    Build one ``GROUPING SETS`` query answering the group level below each
+    of ``open_groups`` (group key paths, ``[]`` for the top level) for the
+    request's row groups, value columns, filters, sort and page.
+
+    Each result row carries its group columns (deeper ones are ``NULL``),
+    the aggregates, ``__ssrm_level`` (the number of group columns it is
+    grouped by, i.e. ``len(groupKeys) + 1``), its 1-based ``__ssrm_pos``
+    within its parent group and ``__ssrm_row_count``, the number of groups
+    under that parent.  Rows outside ``startRow``/``endRow`` are dropped,
+    except each parent's last group, kept so its count survives a page past
+    the end.  When the top level is not requested, the scan is restricted to
+    rows under the open groups.
+    """
+    req = request or {}
+    binder = _Binder(parameterized, dialect, schema)
+    dialect = binder.dialect
+    if not dialect.grouping_sets:
+        raise ValueError(f"The {dialect.name} dialect does not support GROUPING SETS")
+    grouping = _grouping(req, dialect)
+    group_cols = grouping["group_cols"]
+    paths = [list(path) for path in dict.fromkeys(tuple(path) for path in open_groups)]
+    if not paths:
+        raise ValueError("open_groups must list at least one group key path")
+    if any(len(path) >= len(group_cols) for path in paths):
+        raise ValueError("Every open group must be above the leaf level")
+    if isinstance(table, str):
+        table_sql = table
+    else:
+        if not hasattr(table, "sql"):
+            raise TypeError("table must be a string or expose a .sql() method")
+        table_sql = f"({table.sql()}) AS t"
+
+    depth = max(len(path) for path in paths) + 1
+    exprs = [col["expr"] for col in group_cols[:depth]]
+    quote = dialect.quote_identifier
+    level = quote(_LEVEL_COLUMN)
+    level_expr = " + ".join(f"(1 - GROUPING({expr}))" for expr in exprs)
+
+    # Aggregates get positional aliases so a value column that is also a
+    # group column stays addressable; the outer select restores the names.
+    value_aliases = {}
+    aggregates = []
+    outputs = []
+    for v in grouping["value_cols"]:
+        if not v.get("field"):
+            continue
+        col_expr = grouping["column_state_lookup"].get(v["field"], quote(str(v["field"])))
+        alias = quote(f"__ssrm_v{len(aggregates)}")
+        value_aliases[v["field"]] = alias
+        aggregates.append(
+            _agg_expr(
+                col_expr,
+                v.get("aggFunc", "sum"),
+                dialect,
+                (schema or {}).get(str(v["field"])),
+                alias=alias,
+            )
+        )
+        outputs.append(f"{alias} AS {col_expr}")
+    if child_count:
+        aggregates.append(f"COUNT(*) AS {quote(_CHILD_COUNT_COLUMN)}")
+        outputs.append(quote(_CHILD_COUNT_COLUMN))
+
+    def under(path: Sequence[Any]) -> list[str]:
+        return [f"{expr} = {binder.value(key)}" for expr, key in zip(exprs, path)]
+
+    select_cols = [*exprs, *aggregates, f"{level_expr} AS {level}"]
+    filters = _filter_clauses(req.get("filterModel"), binder)
+    if all(path for path in paths):
+        # the top level is not requested: only rows under an open group matter
+        filters.append("(" + " OR ".join("(" + " AND ".join(under(path)) + ")" for path in paths) + ")")
+    where_clause = "\nWHERE " + " AND ".join(filters) if filters else ""
+    grouping_sets = ", ".join(
+        "(" + ", ".join(exprs[: length + 1]) + ")"
+        for length in sorted({len(path) for path in paths})
+    )
+    having = " OR ".join(
+        "(" + " AND ".join([f"{level_expr} = {binder.value(len(path) + 1)}", *under(path)]) + ")"
+        for path in paths
+    )
+
+    # Partition by level and parent keys; a column below the row's level is NULL
+    partition = [level] + [
+        f"CASE WHEN {level} > {index + 1} THEN {expr} END" for index, expr in enumerate(exprs[:-1])
+    ]
+    order = []
+    for entry in req.get("sortModel") or ():
+        col_id, direction = entry.get("colId"), entry.get("sort")
+        if not col_id or not direction:
+            continue
+        expr = grouping["column_state_lookup"].get(col_id)
+        if col_id in value_aliases:
+            expr = value_aliases[col_id]
+        elif expr not in exprs:
+            expr = next((col["expr"] for col in group_cols[:depth] if col["field"] == col_id), None)
+        if expr:
+            order.append(f"{expr} {direction.upper()}")
+    order.extend(f"{expr} ASC" for expr in exprs)
+    window = f"PARTITION BY {', '.join(partition)}"
+
+    page = ""
+    bounds = _page_bounds(req)
+    if bounds:
+        position = quote(_POSITION_COLUMN)
+        page = (
+            f"\nWHERE ({position} > {binder.value(bounds[0])} AND {position} <= {binder.value(bounds[1])})"
+            f" OR {position} = {quote(_ROW_COUNT_COLUMN)}"
+        )
+
+    sql = (
+        f"WITH __ssrm_levels AS (\n"
+        f"SELECT {', '.join(select_cols)}\n"
+        f"FROM {table_sql}{where_clause}\n"
+        f"GROUP BY GROUPING SETS ({grouping_sets})\n"
+        f"HAVING {having}\n"
+        f"), __ssrm_ranked AS (\n"
+        f"SELECT *, ROW_NUMBER() OVER ({window} ORDER BY {', '.join(order)}) AS {quote(_POSITION_COLUMN)}, "
+        f"COUNT(*) OVER ({window}) AS {quote(_ROW_COUNT_COLUMN)}\n"
+        f"FROM __ssrm_levels\n"
+        f")\n"
+        f"SELECT {', '.join([*exprs, *outputs, level, quote(_POSITION_COLUMN), quote(_ROW_COUNT_COLUMN)])}\n"
+        f"FROM __ssrm_ranked{page}\n"
+        f"ORDER BY {level}, {quote(_POSITION_COLUMN)}"
+    )
+    if binder.parameterized:
+        return sql, binder.params
+    return sql
+
+
+def _nest_group_levels(
+    request: Mapping[str, Any],
+    open_groups: Sequence[Sequence[Any]],
+    columns: list[str],
+    records: list[tuple[Any, ...]],
+    response_format: str,
+) -> dict[str, Any]:
+    """
+    Distribute :func:`group_levels_sql` rows to their open groups as a tree:
+    every node may hold ``rows``/``rowCount`` (or columnar ``columns``/
+    ``values``) for its own level and ``children`` keyed by group key text.
+    Rows have the shape of a regular group block at that level.
+    """
+    fields = [col["field"] for col in _grouping(request)["group_cols"]]
+    # Columns come as group columns, measures, level, position, row count
+    level_index = columns.index(_LEVEL_COLUMN)
+    depth = max(len(path) for path in open_groups) + 1
+    measures = list(range(depth, level_index))
+    measure_names = [str(v["field"]) for v in request.get("valueCols") or () if v.get("field")]
+    measure_names += columns[depth + len(measure_names) : level_index]
+    position_index = level_index + 1
+    count_index = level_index + 2
+    bounds = _page_bounds(request)
+
+    def normalise(path: Sequence[Any]) -> tuple[str, ...]:
+        return tuple(_group_key_text(key) for key in path)
+
+    blocks: dict[tuple[Any, ...], list[tuple[Any, ...]]] = {normalise(path): [] for path in open_groups}
+    totals: dict[tuple[Any, ...], int] = {}
+    for record in records:
+        level = int(record[level_index]) - 1
+        parent = normalise(record[:level])
+        if parent not in blocks:
+            continue
+        totals[parent] = int(record[count_index])
+        if bounds is None or bounds[0] < record[position_index] <= bounds[1]:
+            blocks[parent].append(record)
+
+    tree: dict[str, Any] = {}
+    for path in open_groups:
+        key = normalise(path)
+        rows = blocks[key]
+        row_columns = [fields[len(path)], *measure_names]
+        indexes = [len(path), *measures]
+        shaped, _ = _shape_records(
+            row_columns,
+            [tuple(row[index] for index in indexes) for row in rows],
+            False,
+            response_format,
+        )
+        node = tree
+        for group_key in path:
+            node = node.setdefault("children", {}).setdefault(_group_key_text(group_key), {})
+        if response_format == "columnar":
+            node.update(shaped)
+        else:
+            node["rows"] = shaped
+        node["rowCount"] = totals.get(key, 0)
+    return tree
+
+
+def _group_key_text(value: Any) -> str:
+    """Render a group key as JavaScript's ``String()`` does for its JSON value."""
+    if isinstance(value, Decimal):
+        value = float(value)
+    if value is None or isinstance(value, bool):
+        return json.dumps(value)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (str, int, float)):
+        return str(value)
+    return str(_json_default(value))
+
+
+def _wants_grand_total(grouping: Mapping[str, Any], grand_total: bool) -> bool:
+    """Grand totals apply to the top group level only."""
+    return bool(grand_total) and not grouping["at_leaf"] and grouping["depth"] == 0
+
+
+def _group_by(group_expr: str, grand_total: bool) -> str:
+    if grand_total:
+        return f"GROUP BY GROUPING SETS (({group_expr}), ())"
+    return f"GROUP BY {group_expr}"
+
+
+def _pivot_aggregates(
+    grouping: Mapping[str, Any],
+    pivot_keys: Sequence[Sequence[Any]],
+    aliases: Sequence[str],
+    binder: _Binder,
+    schema: Mapping[str, str] | None = None,
+) -> list[str]:
+    """
+    Aggregate every value column once per pivot key tuple, restricted to the
+    rows matching that tuple; ``aliases`` follow :func:`pivot_result_fields`.
+    """
+    dialect = binder.dialect
+    value_cols = [v for v in grouping["value_cols"] if v.get("field")]
+    aliases = iter(aliases)
+    aggregates = []
+    for keys in pivot_keys:
+        condition = " AND ".join(
+            f"{col['expr']} IS NULL" if value is None else f"{col['expr']} = {binder.value(value)}"
+            for col, value in zip(grouping["pivot_cols"], keys)
+        )
+        for v in value_cols:
+            aggregates.append(
+                _agg_expr(
+                    grouping["column_state_lookup"].get(
+                        v["field"], dialect.quote_identifier(str(v["field"]))
+                    ),
+                    v.get("aggFunc", "sum"),
+                    dialect,
+                    (schema or {}).get(str(v["field"])),
+                    where=condition,
+                    alias=next(aliases),
+                )
+            )
+    return aggregates
+
+
+def pivot_result_fields(
+    request: Mapping[str, Any] | None,
+    pivot_keys: Sequence[Sequence[Any]],
+) -> list[str]:
+    """
+    Return the ``pivotResultFields`` AG Grid expects for ``pivot_keys``: per
+    key tuple and value column, the key values and the value column's field
+    joined with ``_`` (AG Grid's default ``serverSidePivotResultFieldSeparator``).
+    """
+    value_cols = [v for v in _grouping(request or {})["value_cols"] if v.get("field")]
+    return [
+        _PIVOT_FIELD_SEPARATOR.join(
+            [*("" if value is None else str(value) for value in keys), str(v["field"])]
+        )
+        for keys in pivot_keys
+        for v in value_cols
+    ]
+
+
+def pivot_keys_sql(
+    request: Mapping[str, Any] | None,
+    table: str | Any,
+    *,
+    limit: int | None = None,
+    parameterized: bool = False,
+    dialect: SqlDialect | None = None,
+    schema: Mapping[str, str] | None = None,
+) -> str | tuple[str, list[Any]]:
+    """
+    Build the query listing the distinct value tuples of the request's
+    ``pivotCols`` under its ``filterModel``, ordered, for
+    ``sql_for(..., pivot_keys=...)``.
+
+    Group keys are deliberately ignored so every block of a pivot grid
+    shares the same result columns.  Raises ``ValueError`` when the request
+    is not in ``pivotMode`` or has no pivot columns.
+    """
+    req = request or {}
+    binder = _Binder(parameterized, dialect, schema)
+    pivot_cols = _grouping(req, binder.dialect)["pivot_cols"]
+    if not pivot_cols:
+        raise ValueError("Request has no pivot columns")
+    if isinstance(table, str):
+        table_sql = table
+    else:
+        if not hasattr(table, "sql"):
+            raise TypeError("table must be a string or expose a .sql() method")
+        table_sql = f"({table.sql()}) AS t"
+
+    exprs = ", ".join(col["expr"] for col in pivot_cols)
+    filters = _filter_clauses(req.get("filterModel"), binder)
+    where_clause = " WHERE " + " AND ".join(filters) if filters else ""
+    order = ", ".join(str(index + 1) for index in range(len(pivot_cols)))
+    sql = f"SELECT DISTINCT {exprs} FROM {table_sql}{where_clause} ORDER BY {order}"
+    if limit is not None:
+        sql += f" LIMIT {binder.value(int(limit))}"
+    if binder.parameterized:
+        return sql, binder.params
+    return sql
+
+
+def _sql_template_key(
+    req: Mapping[str, Any],
+    table_sql: str,
+    dialect: SqlDialect,
+    row_count: bool,
+    keyset: str | None,
+    seeking: bool,
+    columns: Sequence[str] | None = None,
+    schema: Mapping[str, str] | None = None,
+    pivot_keys: Sequence[Sequence[Any]] | None = None,
+    parameterized: bool = False,
+    child_count: bool = False,
+    grand_total: bool = False,
+) -> tuple[Any, ...]:
+    """Reduce ``req`` to the fields :func:`_sql_template` reads, as a hashable tuple."""
+    row_group_cols = req.get("rowGroupCols")
+    value_cols = req.get("valueCols")
+    return (
+        table_sql,
+        dialect,
+        row_count,
+        keyset,
+        seeking,
+        None if columns is None else tuple(columns),
+        _template_token(schema, lambda types: tuple(types.items())),
+        _template_token(pivot_keys, lambda keys: tuple(tuple(key) for key in keys)),
+        parameterized,
+        child_count,
+        grand_total,
+        bool(req.get("pivotMode")),
+        tuple(col.get("field") for col in req.get("pivotCols") or ()),
+        tuple(
+            (col.get("colId"), bool(col.get("rowGroup")), col.get("aggFunc"))
+            for col in req.get("columnState") or ()
+        ),
+        None if row_group_cols is None else tuple(col.get("field") for col in row_group_cols),
+        None
+        if value_cols is None
+        else tuple((col.get("field"), col.get("aggFunc", "sum")) for col in value_cols),
+        len(req.get("groupKeys") or ()),
+        tuple((entry.get("colId"), entry.get("sort")) for entry in req.get("sortModel") or ()),
+    )
 
-    sql = f"""
-        SELECT {', '.join(select_cols)}
-        FROM {table_sql}
-        {where_clause}
-        {group_by_clause}
-        {order_clause}
-        {limit_clause}
+
+class _ColumnTypes(dict):
+    """Introspected column types; ``token`` identifies them in SQL template keys."""
+
+    def __init__(self, types: Mapping[str, str]) -> None:
+        super().__init__(types)
+        self.token = _content_token(tuple(self.items()))
+
+
+class _PivotKeys(list):
+    """A pivot key domain; ``token`` identifies it in SQL template keys."""
+
+    def __init__(self, keys: Iterable[tuple[Any, ...]]) -> None:
+        super().__init__(keys)
+        self.token = _content_token(tuple(self))
+
+
+def _content_token(value: tuple[Any, ...]) -> str:
+    return hashlib.blake2b(repr(value).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _template_token(value: Any, freeze: Callable[[Any], tuple[Any, ...]]) -> Any:
+    """
+    Key part for a schema or pivot key domain: the ``token`` computed once
+    when the grid cached it, so requests do not rehash every entry, or the
+    frozen value for mappings and lists passed to :func:`sql_for` directly.
     """
+    if value is None:
+        return None
+    token = getattr(value, "token", None)
+    return token if token is not None else freeze(value)
+
+
+def _leaf_projection(
+    columns: Sequence[str],
+    grouping: Mapping[str, Any],
+    sort_keys: list[tuple[str, str]],
+    keyset: str | None,
+    dialect: SqlDialect,
+) -> list[str]:
+    """Quote ``columns`` and add the group, sort and keyset columns, without duplicates."""
+    quote = dialect.quote_identifier
+    projected = dict.fromkeys(quote(str(col)) for col in columns)
+    projected.update(dict.fromkeys(col["expr"] for col in grouping["group_cols"]))
+    projected.update(dict.fromkeys(expr for expr, _ in sort_keys))
+    if keyset:
+        projected[quote(keyset)] = None
+    return list(projected)
+
+
+def _leaf_columns(
+    projection: str | tuple[str, ...] | None,
+    row_id: str | None,
+    payload: Mapping[str, Any],
+) -> list[str] | None:
+    """
+    Resolve a grid's ``columns`` setting to the leaf columns of one request.
 
-    return textwrap.dedent(sql).strip()
+    The request's visible columns come from ``visibleColumns`` (column-def
+    fields sent by the built-in datasource) or else non-hidden
+    ``columnState`` entries.  An allow-list keeps only those it names, or
+    all of them when the request reports none; ``"visible"`` takes them as
+    they are.  ``row_id`` is always included.  ``None`` means ``SELECT *``.
+    """
+    if projection is None:
+        return None
+    visible = payload.get("visibleColumns")
+    if visible is None:
+        visible = [
+            col.get("colId") for col in payload.get("columnState") or () if not col.get("hide")
+        ]
+    # auto-group and other synthetic columns have no plain identifier
+    visible = [str(col) for col in visible or () if col and _IDENT_RX.match(str(col))]
+    if projection == "visible":
+        columns = visible
+    else:
+        allowed = set(projection)
+        columns = [col for col in visible if col in allowed] or list(projection)
+    if not columns:
+        return None
+    if row_id and row_id not in columns:
+        columns.insert(0, row_id)
+    return columns
+
+
+def _projection_for_config(config: Mapping[str, Any]) -> str | tuple[str, ...] | None:
+    columns = config.get("columns")
+    if columns is None:
+        return None
+    if isinstance(columns, str):
+        if columns.lower() != "visible":
+            raise ValueError("SSR 'columns' must be 'visible' or a list of column names")
+        return "visible"
+    projection = tuple(str(col) for col in columns)
+    for col in projection:
+        quote_identifier(col)
+    return projection
+
+
+def _filter_clauses(filter_model: Any, binder: _Binder, exclude: str | None = None) -> list[str]:
+    """Translate an AG Grid filter model into SQL predicates, skipping ``exclude``."""
+    if not filter_model:
+        return []
+    if isinstance(filter_model, Mapping) and "filterType" in filter_model:
+        return [_child_to_sql(None, filter_model, binder)]
+    return [
+        _child_to_sql(col, node, binder)
+        for col, node in filter_model.items()
+        if col != exclude
+    ]
 
 
 def distinct_sql(
     target: str | Callable[[Mapping[str, Any]], str],
     column: str,
     request: Mapping[str, Any] | None = None,
-) -> str:
+    *,
+    filter_model: Mapping[str, Any] | None = None,
+    search: str | None = None,
+    limit: int | None = None,
+    counts: bool = False,
+    parameterized: bool = False,
+    dialect: SqlDialect | None = None,
+    schema: Mapping[str, str] | None = None,
+) -> str | tuple[str, list[Any]]:
     """
     Build a ``SELECT DISTINCT`` statement for the given column.
 
@@ -398,14 +1574,53 @@ def distinct_sql(
     request:
         Optional request payload (should be empty when querying the full
         domain for filters).
+    filter_model:
+        Optional AG Grid filter model restricting the values to the current
+        slice.  The entry for ``column`` itself is ignored so a set filter
+        keeps offering the values it has already excluded.
+    search:
+        Optional case-insensitive prefix the values must start with
+        (mini-filter typeahead).
+    limit:
+        Optional maximum number of values returned.
+    counts:
+        When true, also return a ``"count"`` column with the number of rows
+        per value.
+    parameterized:
+        When true, return ``(sql, params)`` with filter and search values
+        bound as ``?`` placeholders instead of inlined literals.
+    dialect:
+        Optional :class:`SqlDialect` (defaults to DuckDB).
+    schema:
+        Optional column name to type mapping used to bind filter values in
+        their native types (see :func:`sql_for`).
     """
-    col_sql = quote_identifier(column)
+    binder = _Binder(parameterized, dialect, schema)
+    col_sql = binder.dialect.quote_identifier(column)
 
     if callable(target):
-        base_sql = target(request or {})
-        return f"SELECT DISTINCT {col_sql} FROM ({base_sql}) ORDER BY 1"
+        source = f"({target(request or {})})"
+    else:
+        source = target
+
+    filters = _filter_clauses(filter_model, binder, exclude=column)
+    if search:
+        filters.append(binder.dialect.prefix_match(col_sql, str(search).lower(), binder))
+    where_clause = " WHERE " + " AND ".join(filters) if filters else ""
+
+    if counts:
+        sql = (
+            f'SELECT {col_sql}, COUNT(*) AS "count" FROM {source}{where_clause} '
+            f"GROUP BY 1 ORDER BY 1"
+        )
+    else:
+        sql = f"SELECT DISTINCT {col_sql} FROM {source}{where_clause} ORDER BY 1"
+    if limit is not None:
+        sql += f" LIMIT {binder.value(int(limit))}"
 
-    return f"SELECT DISTINCT {col_sql} FROM {target} ORDER BY 1"
+    if binder.parameterized:
+        return sql, binder.params
+    return sql
 
 
 def register_duckdb_ssrm(grid_id: str, config: Mapping[str, Any]) -> str:
@@ -419,9 +1634,122 @@ def register_duckdb_ssrm(grid_id: str, config: Mapping[str, Any]) -> str:
     config:
         Dict-like payload nested under ``configArgs['ssrm']`` that must include:
 
-        - ``duckdb_path``: path to the DuckDB file.
-        - ``table`` (str/subquery) **or** ``builder`` (callable returning SQL).
+        - ``duckdb_path``: path to the DuckDB file, **or** ``backend``: an
+          :class:`SsrmBackend` instance (:class:`DuckDBBackend`,
+          :class:`SQLiteBackend`, :class:`DBAPIBackend`), ``"sqlite"`` with
+          ``path``, or ``"duckdb"`` without a path for an in-memory database
+          (e.g. ``table="read_parquet('data/*.parquet')"``).  The backend's
+          dialect controls the generated SQL and it pools its own
+          connections; ``rollup`` needs a DuckDB file.
+        - ``data`` (alternative to ``duckdb_path``/``backend``): a pandas or
+          polars DataFrame, Arrow table or Parquet path/glob served from a
+          long-lived in-memory DuckDB as the view ``ssrm_data`` (the default
+          ``table``).  Replace it with :func:`swap_ssrm_data`.
+        - ``table`` (str/subquery) **or** ``builder`` (callable returning SQL,
+          a DuckDB relation, or a ``(sql, params)`` tuple).
         - Optional ``base``/``endpoint`` to customise the route prefix.
+        - Optional ``count``: ``"window"`` (default) computes the page and the
+          total row count in one query, ``"query"`` issues a separate
+          ``COUNT(*)``, and ``"none"`` only reports a count when it can be
+          inferred from a short page or a client-supplied ``knownRowCount``.
+          Custom ``builder`` callables always fall back to ``"query"``.
+        - Optional ``response_format``: ``"rows"`` (default, a list of row
+          objects), ``"columnar"`` (column names once plus one value array per
+          column) or ``"arrow"`` (Arrow IPC stream, requires ``pyarrow``; falls
+          back to ``"columnar"`` otherwise).  Requests may override it with a
+          ``responseFormat`` field.
+        - Optional ``json_encoder``: ``"auto"`` (default) lets DuckDB encode
+          ``"rows"`` blocks with ``to_json`` so no per-row Python objects are
+          built; ``"python"`` fetches tuples and encodes them with orjson
+          (when installed) or the stdlib.  Either way decimals become numbers,
+          dates/timestamps ISO strings and UUIDs strings.
+        - Optional ``parameterized``: bind request values as ``?`` placeholders
+          instead of inlining them (see :func:`sql_for`).
+        - Optional ``pagination``: ``"offset"`` (default) or ``"keyset"``.
+          Keyset mode requires ``row_id`` (a unique column).  The last sort-key
+          tuple of every served leaf block is remembered, and a block that
+          starts where a previous one ended is fetched with a seek predicate
+          instead of ``OFFSET``; random jumps still use ``OFFSET``.
+        - Optional ``count_cache_ttl`` (seconds, default 300; ``0`` disables)
+          to cache totals per filter/group state so scrolling does not recount.
+        - Optional ``version``: a token (or zero-argument callable returning
+          one) that invalidates cached results when it changes.  The DuckDB
+          file's size and mtime are always part of the cache key.
+        - Optional ``executor``: ``True`` (or a mapping with ``max_workers``)
+          runs this grid's queries on the shared, bounded SSRM thread pool.
+          The pool is process-wide and sized by the first grid that enables
+          it; a different ``max_workers`` from a later grid is ignored with a
+          warning.  At most ``max_concurrency`` (default 4) queries per
+          grid run at once.  When a request carries an ``ssrmClientId``,
+          in-flight queries from the same client whose filter/sort/grouping
+          state differs are interrupted and answered with HTTP 409.
+        - Optional ``distinct_cache_ttl`` (seconds, default 300; ``0``
+          disables) caches set-filter values per column until the data
+          version changes.  ``distinct_columns`` lists columns whose values
+          are precomputed in the background at registration, and
+          ``distinct_max_age`` (default 0) sets the browser ``Cache-Control``
+          max-age; responses always carry an ``ETag`` for revalidation.
+        - Optional ``result_cache_ttl`` (seconds, default 0 = off) caches the
+          serialized response of every block, keyed by grid, data version and
+          the request minus transport fields, so identical requests from
+          different users skip both the query and JSON encoding.  All grids
+          share a byte-bounded LRU (64 MiB, see
+          :func:`set_ssrm_result_cache_limit`); :func:`invalidate_ssrm_cache`
+          drops a grid's entries and :func:`ssrm_cache_stats` reports
+          hits/misses.
+        - Optional ``stream_chunk_rows`` (default 0 = off): blocks larger
+          than this many rows are fetched and sent in chunks of that size,
+          as NDJSON lines or Arrow record batches, keeping worker memory
+          flat.  A stream holds one of the grid's ``max_concurrency`` query
+          slots (the executor's, when enabled, so supersede applies) and its
+          connection for at most ``stream_timeout`` seconds (default 60;
+          ``0`` = no limit), then ends with an error record.  Streamed blocks
+          bypass the block caches.
+        - Optional ``columns``: project leaf queries instead of ``SELECT *``.
+          ``"visible"`` selects the columns the grid displays; a list is an
+          allow-list intersected with them (or used whole when the request
+          reports none).  ``row_id`` and the group, sort and keyset columns
+          are always selected.  Ignored by custom builders.
+        - Optional ``slow_query_ms`` (default 0 = off): block and distinct
+          queries slower than this are re-run under ``EXPLAIN ANALYZE`` on a
+          background thread and kept for :func:`ssrm_slow_queries`.
+        - Optional ``export_max_rows`` (default 1,000,000) and
+          ``export_concurrency`` (default 2 per grid) bound the
+          ``export/<gridId>`` route, which writes the grid's filtered and
+          sorted rows with DuckDB ``COPY ... TO`` as CSV, Excel-friendly CSV
+          or Parquet.  Exports over the concurrency limit get HTTP 429.
+        - Optional ``aggregate_cache_ttl`` (seconds, default 300; ``0``
+          disables) caches group-level blocks per row-group prefix, group
+          keys, filters, value columns, sort and page.
+        - Optional ``pivot_cache_ttl`` (seconds, default 300; ``0``
+          disables) caches the pivot key domain of ``pivotMode`` requests per
+          pivot columns and filters.  Pivot blocks are answered with
+          conditional aggregates plus ``pivotResultFields`` (at most 1000 key
+          combinations); custom builders are not pivoted.
+        - Optional ``child_count`` (default ``True``): group rows carry a
+          ``childCount`` column from the same query.  Top-level group
+          requests with ``grandTotal: true`` also return a ``grandTotal``
+          row, aggregated with ``GROUPING SETS`` in the same scan (not on
+          SQLite or custom builders).
+        - Optional ``rollup`` (list of group columns, outermost first) with
+          ``rollup_values`` (numeric columns) pre-aggregates every group
+          level with ``GROUP BY ROLLUP`` into an in-memory table built in the
+          background.  Unfiltered group requests whose grouping is a prefix of
+          ``rollup`` and whose aggregates are sum/min/max/count/avg over
+          ``rollup_values`` are served from it; it is rebuilt when the data
+          version changes.  Requires ``table``.
+        - Optional ``distinct_limit`` caps the number of set-filter values
+          returned per request.  The distinct route also accepts the other
+          columns' ``filterModel``, a ``search`` prefix, ``limit`` and
+          ``counts`` (query string, or JSON body via POST).
+        - Optional ``pool_size`` (default 8), ``pool_idle_timeout`` (seconds
+          idle cursors and an attached DuckDB file stay open, default 300;
+          ``0`` closes the file once no query runs so other processes can
+          write to it) and ``pool_timeout``
+          (seconds a request waits for a connection before a 503, default 30)
+          to tune the read-only connection pool shared by every grid that
+          points at the same DuckDB file (or the pool of a ``"sqlite"``
+          backend).  The first grid registered on a file sets its options.
 
     Returns
     -------
@@ -440,31 +1768,126 @@ def register_duckdb_ssrm(grid_id: str, config: Mapping[str, Any]) -> str:
     if existing:
         return existing["base"]
 
-    _ensure_duckdb_available()
     base = config.get("endpoint") or config.get("base") or config.get("base_route")
     canonical_base = _normalise_route_base(base)
     base_endpoint = canonical_base
     distinct_endpoint = f"{base_endpoint}/distinct"
 
-    duckdb_path = config.get("duckdb_path") or config.get("path") or config.get("database")
-    if not duckdb_path:
-        raise ValueError("SSR config must include 'duckdb_path'")
-
-    builder_fn, distinct_target = _resolve_builders(config)
+    backend = _backend_for_config(config)
+    if config.get("data") is not None and not (config.get("table") or config.get("builder")):
+        config = {**config, "table": _DATA_SOURCE_NAME}
+    builder_fn, distinct_target = _resolve_builders(config, backend.dialect)
+
+    count_mode = str(config.get("count") or "window").lower()
+    if count_mode not in _COUNT_MODES:
+        raise ValueError(f"Unsupported SSR count mode: {count_mode!r}")
+
+    pagination = str(config.get("pagination") or "offset").lower()
+    if pagination not in _PAGINATION_MODES:
+        raise ValueError(f"Unsupported SSR pagination mode: {pagination!r}")
+    row_id = config.get("row_id")
+    if pagination == "keyset":
+        if not row_id:
+            raise ValueError("Keyset pagination requires 'row_id' (a unique column)")
+        quote_identifier(str(row_id))
+
+    response_format = str(config.get("response_format") or "rows").lower()
+    if response_format not in _RESPONSE_FORMATS:
+        raise ValueError(f"Unsupported SSR response format: {response_format!r}")
+    json_encoder = str(config.get("json_encoder") or "auto").lower()
+    if json_encoder not in _JSON_ENCODERS:
+        raise ValueError(f"Unsupported SSR JSON encoder: {json_encoder!r}")
+
+    distinct_limit = config.get("distinct_limit")
+    if distinct_limit is not None:
+        distinct_limit = int(distinct_limit)
+        if distinct_limit < 1:
+            raise ValueError("SSR 'distinct_limit' must be a positive integer")
+
+    stream_chunk_rows = int(config.get("stream_chunk_rows") or 0)
+    if stream_chunk_rows < 0:
+        raise ValueError("SSR 'stream_chunk_rows' must be a positive integer")
+    max_concurrency = max(1, int(config.get("max_concurrency") or _DEFAULT_MAX_CONCURRENCY))
+
+    export_max_rows = int(config.get("export_max_rows") or _DEFAULT_EXPORT_MAX_ROWS)
+    export_concurrency = int(config.get("export_concurrency") or _DEFAULT_EXPORT_CONCURRENCY)
+    if export_max_rows < 1 or export_concurrency < 1:
+        raise ValueError("SSR 'export_max_rows' and 'export_concurrency' must be positive integers")
+
+    rollup_columns = [str(col) for col in config.get("rollup") or ()]
+    rollup_values = [str(col) for col in config.get("rollup_values") or ()]
+    if rollup_columns and config.get("builder"):
+        raise ValueError("SSR 'rollup' requires 'table' rather than a custom builder")
+    if rollup_columns and not (isinstance(backend, DuckDBBackend) and backend.path):
+        raise ValueError("SSR 'rollup' requires a DuckDB database file")
+    for col in (*rollup_columns, *rollup_values):
+        quote_identifier(col)
 
     print(f'[AgGridJS] SSRM register {grid_key} -> {canonical_base}')
     entry = {
+        "grid_id": grid_key,
         "base": canonical_base,
-        "duckdb_path": Path(duckdb_path),
+        "backend": backend,
         "builder": builder_fn,
         "distinct_target": distinct_target,
+        "source": None if config.get("builder") else distinct_target,
+        "count_mode": count_mode,
+        "response_format": response_format,
+        "json_encoder": "python" if json_encoder == "python" else "duckdb",
+        "parameterized": bool(config.get("parameterized")) or backend.dialect.paramstyle == "format",
+        "keyset": str(row_id) if pagination == "keyset" else None,
+        "row_id": str(row_id) if row_id else None,
+        "columns": _projection_for_config(config),
+        "schema": None,
+        "executor": _executor_for_config(config.get("executor")),
+        "max_concurrency": max_concurrency,
+        "distinct_cache_ttl": float(config.get("distinct_cache_ttl", _DEFAULT_DISTINCT_CACHE_TTL) or 0),
+        "distinct_max_age": max(0, int(config.get("distinct_max_age") or 0)),
+        "distinct_limit": distinct_limit,
+        "result_cache_ttl": float(config.get("result_cache_ttl") or 0),
+        "stream_chunk_rows": stream_chunk_rows,
+        "stream_timeout": float(config.get("stream_timeout", _DEFAULT_STREAM_TIMEOUT) or 0),
+        "stream_slots": threading.BoundedSemaphore(max_concurrency),
+        "pool_timeout": float(config.get("pool_timeout", _DEFAULT_POOL_TIMEOUT) or 0),
+        "slow_query_ms": float(config.get("slow_query_ms") or 0),
+        "export_max_rows": export_max_rows,
+        "export_slots": threading.BoundedSemaphore(export_concurrency),
+        "aggregate_cache_ttl": float(config.get("aggregate_cache_ttl", _DEFAULT_AGGREGATE_CACHE_TTL) or 0),
+        "pivot_cache_ttl": float(config.get("pivot_cache_ttl", _DEFAULT_PIVOT_CACHE_TTL) or 0),
+        "child_count": bool(config.get("child_count", True)),
+        "rollup": None,
+        "count_cache_ttl": float(config.get("count_cache_ttl", _DEFAULT_COUNT_CACHE_TTL) or 0),
+        "version": config.get("version"),
     }
     _SSRM_REGISTRY[grid_key] = entry
     _register_routes_for_base(canonical_base)
+    _column_types(entry)
+    if rollup_columns:
+        entry["rollup"] = _RollupTable(rollup_columns, rollup_values)
+        entry["rollup"].refresh(entry)
+    _precompute_distinct(entry, config.get("distinct_columns") or ())
 
     return base_endpoint.rstrip("/")
 
 
+def swap_ssrm_data(grid_id: str, data: Any, *, name: str | None = None) -> None:
+    """
+    Atomically replace the in-memory data behind a registered grid.
+
+    ``grid_id`` must have been registered with ``data`` or an
+    :class:`InMemoryBackend`.  ``name`` selects the view to replace and
+    defaults to the one created from ``data``.  Cached counts, distinct values
+    and aggregates are invalidated because the backend version changes.
+    """
+    entry = _SSRM_REGISTRY.get(str(grid_id))
+    if entry is None:
+        raise KeyError(f"No SSRM configuration registered for grid {grid_id!r}")
+    backend = entry["backend"]
+    if not isinstance(backend, InMemoryBackend):
+        raise TypeError(f"SSRM grid {grid_id!r} is not backed by in-memory data")
+    backend.swap({name or _DATA_SOURCE_NAME: data})
+
+
 def _ensure_duckdb_available() -> None:
     if duckdb is None:  # pragma: no cover - runtime guard
         raise RuntimeError(
@@ -480,7 +1903,10 @@ def _normalise_route_base(base: str | None) -> str:
     return candidate or _DEFAULT_BASE
 
 
-def _resolve_builders(config: Mapping[str, Any]) -> tuple[Callable[[Mapping[str, Any]], str], Any]:
+def _resolve_builders(
+    config: Mapping[str, Any],
+    dialect: SqlDialect | None = None,
+) -> tuple[Callable[[Mapping[str, Any]], Any], Any]:
     builder = config.get("builder")
     table = config.get("table")
     relation = config.get("relation")
@@ -498,8 +1924,19 @@ def _resolve_builders(config: Mapping[str, Any]) -> tuple[Callable[[Mapping[str,
     if not target:
         raise ValueError("SSR config requires 'table' (str/relation) when no builder is supplied.")
 
-    def _default_builder(req: Mapping[str, Any], source=target):
-        return sql_for(req, source)
+    parameterized = bool(config.get("parameterized"))
+    projection = _projection_for_config(config)
+    row_id = str(config["row_id"]) if config.get("row_id") else None
+
+    def _default_builder(req: Mapping[str, Any], source=target, schema=None):
+        return sql_for(
+            req,
+            source,
+            parameterized=parameterized,
+            dialect=dialect,
+            columns=_leaf_columns(projection, row_id, req),
+            schema=schema,
+        )
 
     return _default_builder, target
 
@@ -508,73 +1945,66 @@ def _register_routes_for_base(base: str) -> None:
     if base in _REGISTERED_BASES:
         return
 
-    def serve_ssrm(grid_id: str, _base=base):
-        return _serve_ssrm_request(_base, grid_id)
-
-    serve_ssrm.__name__ = f"aggrid_ssrm_{base.replace('/', '_')}"
-    hooks.route(
-        name=f"{base}/<grid_id>",
-        methods=("POST", "OPTIONS"),
-        priority=90,
-    )(serve_ssrm)
-
-    def serve_distinct(grid_id: str, column: str, _base=base):
-        return _serve_distinct_request(_base, grid_id, column)
-
-    serve_distinct.__name__ = f"aggrid_ssrm_distinct_{base.replace('/', '_')}"
-    hooks.route(
-        name=f"{base}/distinct/<grid_id>/<column>",
-        methods=("GET",),
-        priority=90,
-    )(serve_distinct)
+    views = _views_for_base(base)
+    for rule, view, methods in views:
+        hooks.route(
+            name=f"{base}/{rule}",
+            methods=methods,
+            priority=90,
+        )(view)
 
     @hooks.setup(priority=90)
-    def _attach_on_setup(app: "dash.Dash", _base=base):
-        _attach_routes_to_app(app, _base, serve_ssrm, serve_distinct)
+    def _attach_on_setup(app: "dash.Dash", _base=base, _views=views):
+        _attach_routes_to_app(app, _base, _views)
 
-    _maybe_attach_to_current_app(base, serve_ssrm, serve_distinct)
+    _maybe_attach_to_current_app(base, views)
     _REGISTERED_BASES.add(base)
 
 
-def _maybe_attach_to_current_app(base: str, serve_ssrm, serve_distinct) -> None:
-    try:
+def _views_for_base(base: str) -> list[tuple[str, Callable[..., Any], tuple[str, ...]]]:
+    """
+    Bind every entry of ``_SSRM_ROUTES`` to ``base``, returning
+    ``(rule, view, methods)`` triples ready for Dash hooks or Flask.
+    """
+    views = []
+    for rule, name, methods, handler in _SSRM_ROUTES:
+
+        def view(*args, _base=base, _handler=handler, **kwargs):
+            return _handler(_base, *args, **kwargs)
+
+        view.__name__ = f"{name}_{base.replace('/', '_')}"
+        views.append((rule, view, methods))
+    return views
+
+
+def _maybe_attach_to_current_app(base: str, views) -> None:
+    try:
         app = dash.get_app()
     except Exception:  # pragma: no cover
         app = None
     if app is None:
         return
-    _attach_routes_to_app(app, base, serve_ssrm, serve_distinct)
+    _attach_routes_to_app(app, base, views)
 
 
-def _attach_routes_to_app(app: "dash.Dash", base: str, serve_ssrm, serve_distinct) -> None:
+def _attach_routes_to_app(app: "dash.Dash", base: str, views) -> None:
     cache = _APP_ROUTE_CACHE.setdefault(id(app), set())
     if base in cache:
         return
 
     flask_app = app.server
     base_clean = base.strip("/") or _DEFAULT_BASE
-    rule_base = f"/{base_clean}/<grid_id>"
-    rule_distinct = f"/{base_clean}/distinct/<grid_id>/<column>"
-
-    endpoint_suffix = base_clean.replace("/", "_")
-    endpoint_base = f"aggrid_ssrm_{endpoint_suffix}_{id(app)}"
-    endpoint_distinct = f"aggrid_ssrm_distinct_{endpoint_suffix}_{id(app)}"
-
     existing = {rule.rule for rule in flask_app.url_map.iter_rules()}
-    if rule_base not in existing:
-        flask_app.add_url_rule(
-            rule_base,
-            endpoint=endpoint_base,
-            view_func=serve_ssrm,
-            methods=["POST", "OPTIONS"],
-        )
 
-    if rule_distinct not in existing:
+    for rule, view, methods in views:
+        url_rule = f"/{base_clean}/{rule}"
+        if url_rule in existing:
+            continue
         flask_app.add_url_rule(
-            rule_distinct,
-            endpoint=endpoint_distinct,
-            view_func=serve_distinct,
-            methods=["GET"],
+            url_rule,
+            endpoint=f"{view.__name__}_{id(app)}",
+            view_func=view,
+            methods=list(methods),
         )
 
     cache.add(base)
@@ -590,27 +2020,494 @@ def _serve_ssrm_request(base: str, grid_id: str):
     if not entry:
         return jsonify({"error": f"No SSRM configuration registered for grid {grid_id!r}"}), 404
 
-    builder = entry["builder"]
+    timer = _RequestTimer()
+    with timer.phase("cache"):
+        result_key = _result_cache_key(entry, payload, _resolve_response_format(entry, payload))
+        cached_response = _RESULT_CACHE.get(result_key) if result_key else None
+    if cached_response is not None:
+        body, mimetype, headers = cached_response
+        response = Response(body, mimetype=mimetype, headers=headers)
+        return _finish_request(entry, "block", timer, response, cache="result")
 
     try:
-        query_sql = _ensure_sql(builder(payload))
-        count_payload = {
-            key: value
-            for key, value in payload.items()
-            if key not in {"startRow", "endRow"}
+        with timer.phase("build"):
+            plan = _plan_block(entry, payload)
+    except _SupersededQuery as err:
+        return _finish_request(entry, "block", timer, (jsonify({"error": str(err)}), 409))
+    except _PoolTimeout as err:
+        return _finish_request(entry, "block", timer, _execution_failure(err))
+    except Exception as err:
+        response = jsonify({"error": f"Failed to build SSRM SQL: {err}"}), 500
+        return _finish_request(entry, "block", timer, response)
+
+    if _should_stream(entry, plan):
+        try:
+            response = _stream_block(entry, plan)
+        except _SupersededQuery as err:
+            response = jsonify({"error": str(err)}), 409
+        except Exception as err:
+            response = _execution_failure(err)
+        return _finish_request(entry, "block", timer, response)
+
+    result = _cached_block(plan)
+    cache = "aggregate" if result is not None else None
+    if result is None:
+        try:
+            result = _run_timed_query(
+                entry, payload, timer, lambda con: _execute_block(con, entry, plan, timer)
+            )
+        except _SupersededQuery as err:
+            return _finish_request(entry, "block", timer, (jsonify({"error": str(err)}), 409))
+        except Exception as err:
+            response = _execution_failure(err)
+            return _finish_request(entry, "block", timer, response)
+        _record_block(entry, plan, result)
+        _check_slow_query(entry, "block", plan["sql"], plan["params"], timer)
+
+    with timer.phase("encode"):
+        response = _block_response(
+            result["block"], result["total"], plan["response_format"], _block_extras(plan, result)
+        )
+    if result_key and result["shared"]:
+        body = response.get_data()
+        headers = {
+            name: value for name, value in response.headers.items() if name == _ROW_COUNT_HEADER
+        }
+        _RESULT_CACHE.set(
+            result_key,
+            (body, response.mimetype, headers),
+            ttl=entry["result_cache_ttl"],
+            size=len(body),
+        )
+    return _finish_request(entry, "block", timer, response, rows=result["returned"], cache=cache)
+
+
+def _plan_block(
+    entry: Mapping[str, Any], payload: Mapping[str, Any], connection: Any = None
+) -> dict[str, Any]:
+    """
+    Work out how to answer one SSRM block request: the SQL to run, whether it
+    carries its own row count, and the cache keys involved.  Lookups planning
+    needs (schema, pivot keys) run on ``connection`` when the caller already
+    holds one, so a batch never checks out a second pooled connection.
+    """
+    count_key = _count_cache_key(entry, payload)
+    cached_total = _ROW_COUNT_CACHE.get(count_key) if count_key else None
+    known_total = cached_total if cached_total is not None else _known_row_count(payload)
+    keyset = entry["keyset"] if entry["source"] is not None else None
+    keyset_key = _keyset_cache_key(entry, payload) if keyset else None
+    bounds = _page_bounds(payload)
+    seek = _KEYSET_CACHE.get((*keyset_key, bounds[0])) if keyset_key and bounds else None
+    use_window = (
+        entry["count_mode"] == "window"
+        and known_total is None
+        and entry["source"] is not None
+        # a seek query only sees rows after the seek tuple, so it cannot count
+        and seek is None
+    )
+
+    rollup = entry["rollup"]
+    rollup_statement = (
+        rollup.statement(entry, payload, row_count=use_window, child_count=entry["child_count"])
+        if rollup is not None
+        else None
+    )
+    grand_total = (
+        entry["source"] is not None
+        and rollup_statement is None
+        and entry["backend"].dialect.grouping_sets
+        and _wants_grand_total(_grouping(payload), payload.get("grandTotal"))
+    )
+    schema = _column_types(entry, connection)
+    pivot_keys = (
+        _pivot_keys(entry, payload, schema, connection)
+        if entry["source"] is not None and rollup_statement is None
+        else None
+    )
+    if rollup_statement is not None:
+        statement = rollup_statement
+    elif entry["source"] is not None:
+        statement = sql_for(
+            payload,
+            entry["source"],
+            row_count=use_window,
+            parameterized=entry["parameterized"],
+            keyset=keyset,
+            seek=seek,
+            dialect=entry["backend"].dialect,
+            columns=_leaf_columns(entry["columns"], entry["row_id"], payload),
+            schema=schema,
+            pivot_keys=pivot_keys,
+            child_count=entry["child_count"],
+            grand_total=grand_total,
+        )
+    else:
+        statement = entry["builder"](payload)
+    sql, params = _ensure_statement(statement)
+
+    return {
+        "payload": payload,
+        "sql": sql,
+        "params": params,
+        "response_format": _resolve_response_format(entry, payload),
+        "count_key": count_key,
+        "known_total": known_total,
+        # a client-supplied total must not reach caches shared across clients
+        "client_total": cached_total is None and known_total is not None,
+        "keyset": keyset,
+        "keyset_key": keyset_key,
+        "bounds": bounds,
+        "aggregate_key": _aggregate_cache_key(entry, payload),
+        "aggregate_ttl": entry["aggregate_cache_ttl"],
+        "rollup": rollup if rollup_statement is not None else None,
+        "pivot_fields": None if pivot_keys is None else pivot_result_fields(payload, pivot_keys),
+        # the grand total is the first row of the block starting at row 0
+        "grand_total": grand_total and (bounds is None or bounds[0] == 0),
+    }
+
+
+def _pivot_keys(
+    entry: Mapping[str, Any],
+    payload: Mapping[str, Any],
+    schema: Mapping[str, str] | None = None,
+    connection: Any = None,
+) -> "_PivotKeys | None":
+    """
+    Return the pivot key tuples of a ``pivotMode`` request, cached per grid,
+    data version, pivot columns and filters so every block of a pivot view
+    reuses them; ``None`` when the request does not pivot.  The lookup runs
+    on ``connection``, or through :func:`_run_query` without one.
+    """
+    pivot_cols = _grouping(payload)["pivot_cols"]
+    if not pivot_cols:
+        return None
+    cache_key = None
+    if entry["pivot_cache_ttl"] > 0:
+        shape = {
+            "pivotCols": [col["field"] for col in pivot_cols],
+            "filterModel": payload.get("filterModel") or {},
         }
-        count_sql = _ensure_sql(builder(count_payload))
+        cache_key = (entry["grid_id"], _data_version(entry), _request_fingerprint(shape, frozenset()))
+        cached = _PIVOT_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
+    sql, params = pivot_keys_sql(
+        payload,
+        entry["source"],
+        limit=_MAX_PIVOT_KEYS + 1,
+        parameterized=True,
+        dialect=entry["backend"].dialect,
+        schema=schema,
+    )
+
+    def fetch(con):
+        return _PivotKeys(tuple(row) for row in con.sql(sql, params=params or None).fetchall())
+
+    keys = fetch(connection) if connection is not None else _run_query(entry, payload, fetch)
+    if len(keys) > _MAX_PIVOT_KEYS:
+        raise ValueError(f"Pivot columns have more than {_MAX_PIVOT_KEYS} value combinations")
+    if cache_key is not None:
+        _PIVOT_CACHE.set(cache_key, keys, ttl=entry["pivot_cache_ttl"])
+    return keys
+
+
+def _execute_block(
+    connection: "duckdb.DuckDBPyConnection",
+    entry: Mapping[str, Any],
+    plan: Mapping[str, Any],
+    timer: "_RequestTimer | None" = None,
+) -> dict[str, Any]:
+    timer = timer or _RequestTimer()
+    payload = plan["payload"]
+    with timer.phase("query"):
+        if plan["rollup"] is not None:
+            with plan["rollup"].cursor() as cursor:
+                block, returned, total = _fetch_block(
+                    cursor,
+                    plan["sql"],
+                    plan["params"],
+                    plan["response_format"],
+                    json_encoder=entry["json_encoder"],
+                )
+        else:
+            block, returned, total = _fetch_block(
+                connection,
+                plan["sql"],
+                plan["params"],
+                plan["response_format"],
+                json_encoder=entry["json_encoder"],
+            )
+    grand_total = None
+    if plan["grand_total"]:
+        block, grand_total = _split_grand_total(block, plan["response_format"])
+        returned -= 1
+    if total is None:
+        total = _infer_row_count(payload, returned)
+    total, counted = _complete_total(connection, entry, plan, total, timer)
+    return {
+        "block": block,
+        "returned": returned,
+        "total": total,
+        "counted": counted,
+        "shared": counted or not plan["client_total"],
+        "grand_total": grand_total,
+    }
+
+
+def _split_grand_total(block: Any, response_format: str) -> tuple[Any, dict[str, Any] | None]:
+    """Remove the leading grand total row from a block, returning it as a dict."""
+    if isinstance(block, _JsonRows):
+        return _JsonRows(block[1:]), json.loads(block[0]) if block else None
+    if response_format == "arrow":
+        if not block.num_rows:
+            return block, None
+        return block.slice(1), block.slice(0, 1).to_pylist()[0]
+    if response_format == "columnar":
+        if not block["values"] or not block["values"][0]:
+            return block, None
+        grand_total = {column: values[0] for column, values in zip(block["columns"], block["values"])}
+        return {**block, "values": [values[1:] for values in block["values"]]}, grand_total
+    return block[1:], block[0] if block else None
+
+
+def _block_extras(plan: Mapping[str, Any], result: Mapping[str, Any]) -> dict[str, Any]:
+    """Response fields beyond rows and ``rowCount``: pivot result fields and grand total."""
+    extras = {}
+    if plan["pivot_fields"] is not None:
+        extras["pivotResultFields"] = plan["pivot_fields"]
+    if result.get("grand_total") is not None:
+        extras["grandTotal"] = result["grand_total"]
+    return extras
+
+
+def _complete_total(
+    connection: Any,
+    entry: Mapping[str, Any],
+    plan: Mapping[str, Any],
+    total: int | None,
+    timer: "_RequestTimer | None" = None,
+) -> tuple[int | None, bool]:
+    """
+    Fall back to the known total, then a count query, when the block did not
+    carry its own; also report whether the total was computed here.
+    """
+    # Only totals computed here are cached; known ones may be stale.
+    counted = total is not None
+    if total is None:
+        total = plan["known_total"]
+    if total is None and entry["count_mode"] != "none":
+        count_sql, count_params = _ensure_statement(
+            _build_statement(entry, _without_paging(plan["payload"]))
+        )
+        with (timer or _RequestTimer()).phase("count"):
+            total = _execute_count(connection, count_sql, count_params)
+        counted = True
+    return total, counted
+
+
+def _cached_block(plan: Mapping[str, Any]) -> dict[str, Any] | None:
+    if not plan["aggregate_key"]:
+        return None
+    return _AGGREGATE_CACHE.get((*plan["aggregate_key"], plan["response_format"]))
+
+
+def _record_block(entry: Mapping[str, Any], plan: Mapping[str, Any], result: Mapping[str, Any]) -> None:
+    if plan["aggregate_key"] and result["shared"]:
+        _AGGREGATE_CACHE.set(
+            (*plan["aggregate_key"], plan["response_format"]),
+            result,
+            ttl=plan["aggregate_ttl"],
+        )
+
+    if plan["count_key"] and result["counted"]:
+        _ROW_COUNT_CACHE.set(plan["count_key"], result["total"], ttl=entry["count_cache_ttl"])
+
+    bounds = plan["bounds"]
+    if plan["keyset_key"] and bounds and result["returned"]:
+        _remember_keyset(
+            plan["keyset_key"],
+            plan["payload"],
+            plan["keyset"],
+            result["block"],
+            plan["response_format"],
+            bounds[0] + result["returned"],
+        )
+
+
+def _serve_batch_request(base: str, grid_id: str):
+    """
+    Answer several SSRM block requests for one grid in a single round trip.
+
+    The body is ``{"requests": [...]}``; the response is ``{"results": [...]}``
+    in the same order, each a regular block payload or ``{"error": ...}``.
+    All blocks run on one pooled connection, and totals counted for an
+    earlier block are reused by later blocks sharing its filter/group state.
+    Arrow requests are answered as columnar JSON.
+    """
+    try:
+        payload = request.get_json(force=True) or {}
+    except Exception as err:  # pragma: no cover - Flask handles JSON errors
+        return jsonify({"error": f"Invalid JSON payload: {err}"}), 400
+
+    block_requests = payload.get("requests") if isinstance(payload, Mapping) else payload
+    if not isinstance(block_requests, list) or not block_requests:
+        return jsonify({"error": "Batch payload must contain a non-empty 'requests' list"}), 400
+    if len(block_requests) > _MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch exceeds {_MAX_BATCH_SIZE} requests"}), 400
+
+    first = block_requests[0] if isinstance(block_requests[0], Mapping) else {}
+    entry = _resolve_entry_for_request(base, grid_id, first)
+    if not entry:
+        return jsonify({"error": f"No SSRM configuration registered for grid {grid_id!r}"}), 404
+
+    # Cached blocks are spliced in as JSON bytes; only the misses touch DuckDB
+    encoded: list[bytes | None] = []
+    keys: list[tuple[Any, ...] | None] = []
+    for item in block_requests:
+        key = None
+        if isinstance(item, Mapping):
+            response_format = _resolve_response_format(entry, item)
+            if response_format == "arrow":
+                response_format = "columnar"
+            key = _result_cache_key(entry, item, response_format)
+        cached = _RESULT_CACHE.get(key) if key else None
+        keys.append(key)
+        encoded.append(cached[0] if cached is not None else None)
+
+    pending = [index for index, body in enumerate(encoded) if body is None]
+    if pending:
+        def work(con):
+            return [_serve_batch_item(con, entry, block_requests[index]) for index in pending]
+
+        lead = block_requests[pending[0]]
+        try:
+            results = _run_query(entry, lead if isinstance(lead, Mapping) else first, work)
+        except _SupersededQuery as err:
+            return jsonify({"error": str(err)}), 409
+        except Exception as err:
+            return _execution_failure(err)
+
+        for index, (body, ok) in zip(pending, results):
+            encoded[index] = body
+            if keys[index] and ok:
+                _RESULT_CACHE.set(
+                    keys[index],
+                    (body, "application/json", {}),
+                    ttl=entry["result_cache_ttl"],
+                    size=len(body),
+                )
+
+    return Response(b'{"results":[' + b",".join(encoded) + b"]}", mimetype="application/json")
+
+
+def _serve_batch_item(
+    connection: "duckdb.DuckDBPyConnection",
+    entry: Mapping[str, Any],
+    item: Any,
+) -> tuple[bytes, bool]:
+    """Return one batch result as JSON bytes and whether it may be cached."""
+    if not isinstance(item, Mapping):
+        return _dumps({"error": "Batch entries must be SSRM request objects"}), False
+
+    try:
+        plan = _plan_block(entry, item, connection)
     except Exception as err:
-        return jsonify({"error": f"Failed to build SSRM SQL: {err}"}), 500
+        return _dumps({"error": f"Failed to build SSRM SQL: {err}"}), False
+    if plan["response_format"] == "arrow":
+        plan["response_format"] = "columnar"
+
+    result = _cached_block(plan)
+    if result is None:
+        try:
+            result = _execute_block(connection, entry, plan)
+        except Exception as err:
+            return _dumps({"error": f"DuckDB execution failed: {err}"}), False
+        _record_block(entry, plan, result)
+    return (
+        _encode_block(
+            result["block"], result["total"], plan["response_format"], _block_extras(plan, result)
+        ),
+        result["shared"],
+    )
 
+
+def _serve_prefetch_request(base: str, grid_id: str):
+    """
+    Answer the group levels below several open groups with one query.
+
+    The body is a group-level SSRM request (row groups, value columns,
+    filters, sort and page) plus ``openGroups``, a list of ``groupKeys``
+    paths (``[]`` for the top level).  The response nests one block per open
+    group under ``children`` keyed by group key, e.g.
+    ``{"rows": [...], "rowCount": 4, "children": {"North": {...}}}``, each
+    shaped like the block route's payload for that path.  Arrow requests are
+    answered as columnar JSON.
+    """
     try:
-        with _open_readonly_connection(entry) as con:
-            rows = _fetch_rows(con, query_sql)
-            total = _execute_count(con, count_sql)
+        payload = request.get_json(force=True) or {}
+    except Exception as err:  # pragma: no cover - Flask handles JSON errors
+        return jsonify({"error": f"Invalid JSON payload: {err}"}), 400
+    if not isinstance(payload, Mapping):
+        return jsonify({"error": "Prefetch payload must be an SSRM request object"}), 400
+
+    entry = _resolve_entry_for_request(base, grid_id, payload)
+    if not entry:
+        return jsonify({"error": f"No SSRM configuration registered for grid {grid_id!r}"}), 404
+
+    open_groups = payload.get("openGroups")
+    if (
+        not isinstance(open_groups, list)
+        or not open_groups
+        or not all(isinstance(path, list) for path in open_groups)
+    ):
+        return jsonify({"error": "Prefetch payload must contain a non-empty 'openGroups' list of key lists"}), 400
+    if len(open_groups) > _MAX_PREFETCH_GROUPS:
+        return jsonify({"error": f"Prefetch exceeds {_MAX_PREFETCH_GROUPS} open groups"}), 400
+    if entry["source"] is None or not entry["backend"].dialect.grouping_sets:
+        return jsonify({"error": "Prefetch requires a table or query source with GROUPING SETS support"}), 400
+    if _grouping(payload)["pivot_cols"]:
+        return jsonify({"error": "Prefetch does not support pivot mode"}), 400
+
+    timer = _RequestTimer()
+    response_format = _resolve_response_format(entry, payload)
+    if response_format == "arrow":
+        response_format = "columnar"
+    try:
+        with timer.phase("build"):
+            sql, params = _ensure_statement(
+                group_levels_sql(
+                    payload,
+                    entry["source"],
+                    open_groups,
+                    parameterized=entry["parameterized"],
+                    dialect=entry["backend"].dialect,
+                    schema=_column_types(entry),
+                    child_count=entry["child_count"],
+                )
+            )
+    except Exception as err:
+        response = jsonify({"error": f"Failed to build SSRM SQL: {err}"}), 500
+        return _finish_request(entry, "prefetch", timer, response)
+
+    def work(con):
+        with timer.phase("query"):
+            relation = con.sql(sql, params=params or None)
+            return relation.columns, relation.fetchall()
+
+    try:
+        columns, records = _run_timed_query(entry, payload, timer, work)
+    except _SupersededQuery as err:
+        return _finish_request(entry, "prefetch", timer, (jsonify({"error": str(err)}), 409))
     except Exception as err:
-        return jsonify({"error": f"DuckDB execution failed: {err}"}), 500
+        response = _execution_failure(err)
+        return _finish_request(entry, "prefetch", timer, response)
+    _check_slow_query(entry, "prefetch", sql, params, timer)
 
-    return jsonify({"rows": rows, "rowCount": total})
+    with timer.phase("encode"):
+        tree = _nest_group_levels(payload, open_groups, columns, records, response_format)
+        response = Response(_dumps(tree), mimetype="application/json")
+    return _finish_request(entry, "prefetch", timer, response, rows=len(records))
 
 
 def _serve_distinct_request(base: str, grid_id: str, column: str):
@@ -619,17 +2516,273 @@ def _serve_distinct_request(base: str, grid_id: str, column: str):
         return jsonify({"error": f"No SSRM configuration registered for grid {grid_id!r}"}), 404
 
     try:
-        sql = distinct_sql(entry["distinct_target"], column)
+        options = _distinct_options(entry)
+    except ValueError as err:
+        return jsonify({"error": f"Invalid distinct request: {err}"}), 400
+
+    timer = _RequestTimer()
+    try:
+        body, etag, truncated = _distinct_payload(entry, column, options, timer)
+    except _DistinctBuildError as err:
+        response = jsonify({"error": f"Failed to build distinct SQL: {err}"}), 500
+        return _finish_request(entry, "distinct", timer, response)
     except Exception as err:
-        return jsonify({"error": f"Failed to build distinct SQL: {err}"}), 500
+        response = _execution_failure(err)
+        return _finish_request(entry, "distinct", timer, response)
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = f"private, max-age={entry['distinct_max_age']}"
+    if truncated:
+        response.headers[_DISTINCT_TRUNCATED_HEADER] = "true"
+    return _finish_request(entry, "distinct", timer, response)
+
+
+class _DistinctBuildError(ValueError):
+    """Raised when the distinct SQL for a column cannot be generated."""
+
+
+def _distinct_options(entry: Mapping[str, Any]) -> dict[str, Any]:
+    """
+    Read ``filterModel``, ``search``, ``limit`` and ``counts`` from the query
+    string (GET) or JSON body (POST, for filter models too long for a URL).
+    """
+    if request.method == "POST":
+        raw = request.get_json(silent=True) or {}
+        if not isinstance(raw, Mapping):
+            raise ValueError("body must be a JSON object")
+    else:
+        raw = request.args
+
+    filter_model = raw.get("filterModel") or None
+    if isinstance(filter_model, str):
+        try:
+            filter_model = json.loads(filter_model)
+        except ValueError as err:
+            raise ValueError("filterModel must be JSON") from err
+    if filter_model is not None and not isinstance(filter_model, Mapping):
+        raise ValueError("filterModel must be an object")
+
+    limit = raw.get("limit")
+    if limit in (None, ""):
+        limit = None
+    else:
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError) as err:
+            raise ValueError("limit must be an integer") from err
+        if limit < 1:
+            raise ValueError("limit must be positive")
+    if entry["distinct_limit"] is not None:
+        limit = min(limit or entry["distinct_limit"], entry["distinct_limit"])
+
+    counts = raw.get("counts")
+    if isinstance(counts, str):
+        counts = counts.lower() in {"1", "true", "yes"}
+
+    return {
+        "filterModel": filter_model,
+        "search": str(raw.get("search") or "") or None,
+        "limit": limit,
+        "counts": bool(counts),
+    }
+
+
+def _distinct_payload(
+    entry: Mapping[str, Any],
+    column: str,
+    options: Mapping[str, Any] | None = None,
+    timer: "_RequestTimer | None" = None,
+) -> tuple[bytes, str, bool]:
+    """
+    Return the JSON-encoded set-filter values for ``column``, their ETag and
+    whether ``limit`` truncated them, served from the distinct cache while the
+    grid's data version is unchanged.
+    """
+    timer = timer or _RequestTimer()
+    options = dict(options or {"filterModel": None, "search": None, "limit": entry["distinct_limit"], "counts": False})
+    cache_key = None
+    if entry["distinct_cache_ttl"] > 0:
+        with timer.phase("cache"):
+            cache_key = (
+                entry["grid_id"],
+                _data_version(entry),
+                column,
+                _request_fingerprint(options, frozenset()),
+            )
+            cached = _DISTINCT_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
+    limit = options["limit"]
+    try:
+        with timer.phase("build"):
+            sql, params = distinct_sql(
+                entry["distinct_target"],
+                column,
+                filter_model=options["filterModel"],
+                search=options["search"],
+                limit=None if limit is None else limit + 1,
+                counts=options["counts"],
+                parameterized=True,
+                dialect=entry["backend"].dialect,
+                schema=_column_types(entry),
+            )
+    except Exception as err:
+        raise _DistinctBuildError(str(err)) from err
+
+    def fetch(con):
+        with timer.phase("query"):
+            return con.sql(sql, params=params or None).fetchall()
+
+    rows = _run_timed_query(entry, {}, timer, fetch)
+    _check_slow_query(entry, "distinct", sql, params, timer)
+    truncated = limit is not None and len(rows) > limit
+    if truncated:
+        rows = rows[:limit]
+
+    with timer.phase("encode"):
+        if options["counts"]:
+            values = [{"value": str(row[0]), "count": row[1]} for row in rows if row[0] is not None]
+        else:
+            values = [str(row[0]) for row in rows if row[0] is not None]
+        body = _dumps(values)
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+
+    result = (body, etag, truncated)
+    if cache_key is not None:
+        _DISTINCT_CACHE.set(cache_key, result, ttl=entry["distinct_cache_ttl"])
+    return result
+
+
+def _precompute_distinct(entry: Mapping[str, Any], columns: Iterable[str]) -> None:
+    """
+    Warm the distinct cache for ``columns`` on a background thread so
+    registration (typically at import time) is not delayed.
+    """
+    columns = [str(column) for column in columns]
+    if not columns or entry["distinct_cache_ttl"] <= 0:
+        return
+
+    def warm():
+        for column in columns:
+            try:
+                _distinct_payload(entry, column)
+            except Exception as err:  # pragma: no cover - logged, never fatal
+                print(f"[AgGridJS] SSRM distinct precompute failed for {column!r}: {err}")
+
+    threading.Thread(target=warm, name="aggrid-ssrm-distinct", daemon=True).start()
+
+
+def _serve_export_request(base: str, grid_id: str):
+    """
+    Export every row matching the grid's filter/sort/group state.
+
+    The request (a JSON body, or a ``request`` form/query field holding the
+    SSRM request as JSON) is run through the grid's builder without paging,
+    capped at ``export_max_rows`` rows, and written by DuckDB ``COPY ... TO``
+    to a temporary file that is streamed back and then deleted, so the rows
+    never pass through Python.  ``format`` is ``"csv"`` (default),
+    ``"excel"`` (CSV with a UTF-8 byte-order mark) or ``"parquet"``.
+    """
+    entry = _resolve_entry_for_request(base, grid_id)
+    if not entry:
+        return jsonify({"error": f"No SSRM configuration registered for grid {grid_id!r}"}), 404
+    if not isinstance(entry["backend"].dialect, DuckDBDialect):
+        return jsonify({"error": "SSRM export requires a DuckDB backend"}), 400
+
+    try:
+        options = _export_options(entry)
+    except ValueError as err:
+        return jsonify({"error": f"Invalid export request: {err}"}), 400
+    extension, mimetype, copy_options, preamble = _EXPORT_FORMATS[options["format"]]
+
+    try:
+        sql, params = _ensure_statement(_build_statement(entry, options["request"]))
+    except Exception as err:
+        return jsonify({"error": f"Failed to build SSRM SQL: {err}"}), 500
+
+    slots = entry["export_slots"]
+    if not slots.acquire(blocking=False):
+        response = jsonify({"error": "Too many concurrent exports for this grid"})
+        response.headers["Retry-After"] = "5"
+        return response, 429
+
+    handle = None
+    fd, path = tempfile.mkstemp(prefix="aggrid-export-", suffix=f".{extension}")
+    os.close(fd)
+
+    def cleanup() -> None:
+        if handle is not None:
+            handle.close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        slots.release()
 
     try:
         with _open_readonly_connection(entry) as con:
-            values = [row[0] for row in con.sql(sql).fetchall()]
+            written = con.execute(
+                f"COPY ({sql}) TO {_sql_literal(path)} ({copy_options})", params or None
+            ).fetchone()[0]
+        handle = open(path, "rb")
     except Exception as err:
-        return jsonify({"error": f"DuckDB execution failed: {err}"}), 500
+        cleanup()
+        return _execution_failure(err)
+
+    def generate() -> Iterator[bytes]:
+        if preamble:
+            yield preamble
+        for chunk in iter(lambda: handle.read(_EXPORT_CHUNK_BYTES), b""):
+            yield chunk
+
+    response = Response(generate(), mimetype=mimetype)
+    response.call_on_close(cleanup)
+    response.headers["Content-Length"] = str(len(preamble) + os.fstat(handle.fileno()).st_size)
+    response.headers["Content-Disposition"] = (
+        f'attachment; filename="{options["file_name"]}.{extension}"'
+    )
+    response.headers[_EXPORT_ROWS_HEADER] = str(written)
+    if written >= entry["export_max_rows"]:
+        response.headers[_EXPORT_CAPPED_HEADER] = "true"
+    return response
+
+
+def _export_options(entry: Mapping[str, Any]) -> dict[str, Any]:
+    """Read ``request``, ``format`` and ``fileName`` from the JSON body, form or query string."""
+    if request.is_json:
+        raw = request.get_json(silent=True) or {}
+        if not isinstance(raw, Mapping):
+            raise ValueError("body must be a JSON object")
+    else:
+        raw = request.form if request.method == "POST" else request.args
 
-    return jsonify([str(value) for value in values if value is not None])
+    ssrm_request = raw.get("request")
+    if ssrm_request is None and request.is_json:
+        ssrm_request = {key: value for key, value in raw.items() if key not in {"format", "fileName"}}
+    if isinstance(ssrm_request, str):
+        try:
+            ssrm_request = json.loads(ssrm_request)
+        except ValueError as err:
+            raise ValueError("request must be JSON") from err
+    if not isinstance(ssrm_request, Mapping):
+        raise ValueError("request must be an object")
+
+    export_format = str(raw.get("format") or "csv").lower()
+    if export_format not in _EXPORT_FORMATS:
+        raise ValueError(f"unsupported format {export_format!r}")
+
+    file_name = _EXPORT_FILENAME_RX.sub("_", str(raw.get("fileName") or entry["grid_id"]))
+    return {
+        # the whole result, from the first row up to the export cap
+        "request": {**_without_paging(ssrm_request), "startRow": 0, "endRow": entry["export_max_rows"]},
+        "format": export_format,
+        "file_name": file_name.strip("._") or "export",
+    }
 
 
 def _ensure_sql(candidate: Any) -> str:
@@ -640,14 +2793,637 @@ def _ensure_sql(candidate: Any) -> str:
     raise TypeError("SSR builder must return a SQL string or DuckDB relation.")
 
 
+def _ensure_statement(candidate: Any) -> tuple[str, list[Any]]:
+    """
+    Normalise builder output to ``(sql, params)``; plain SQL gets no params.
+    """
+    if isinstance(candidate, tuple) and len(candidate) == 2:
+        sql, params = candidate
+        return _ensure_sql(sql), list(params or [])
+    return _ensure_sql(candidate), []
+
+
 def _fetch_rows(connection: "duckdb.DuckDBPyConnection", sql: str) -> list[dict[str, Any]]:
     relation = connection.sql(sql)
     columns = relation.columns
     return [dict(zip(columns, row)) for row in relation.fetchall()]
 
 
-def _execute_count(connection: "duckdb.DuckDBPyConnection", sql: str) -> int:
-    return connection.sql(f"SELECT COUNT(*) FROM ({sql})").fetchone()[0]
+def _resolve_response_format(entry: Mapping[str, Any], payload: Mapping[str, Any]) -> str:
+    requested = str(payload.get("responseFormat") or entry["response_format"]).lower()
+    if requested not in _RESPONSE_FORMATS:
+        requested = entry["response_format"]
+    if requested == "arrow" and pyarrow is None:
+        return "columnar"
+    return requested
+
+
+def _fetch_block(
+    connection: "duckdb.DuckDBPyConnection",
+    sql: str,
+    params: list[Any] | None = None,
+    response_format: str = "rows",
+    *,
+    json_encoder: str = "python",
+) -> tuple[Any, int, int | None]:
+    """
+    Execute ``sql`` and shape the result for ``response_format``.
+
+    Returns the block (row dicts, a columnar mapping or an Arrow table), the
+    number of rows it holds, and the total from a trailing
+    ``COUNT(*) OVER ()`` column if the query carries one (``None`` when the
+    column is absent or the page came back empty).  With
+    ``json_encoder="duckdb"`` on a DuckDB connection, ``"rows"`` blocks are
+    encoded by DuckDB's ``to_json`` and returned as :class:`_JsonRows`.
+    """
+    relation = connection.sql(sql, params=params or None)
+    columns = list(relation.columns)
+    has_count = bool(columns) and columns[-1] == _ROW_COUNT_COLUMN
+
+    if response_format == "rows" and json_encoder == "duckdb" and _is_duckdb(connection):
+        return _fetch_json_rows(relation, has_count)
+
+    if response_format == "arrow":
+        # ``to_arrow_table`` supersedes ``fetch_arrow_table`` in newer DuckDB releases
+        fetch_arrow = getattr(relation, "to_arrow_table", None) or relation.fetch_arrow_table
+        table = fetch_arrow()
+        total = None
+        if has_count:
+            if table.num_rows:
+                total = int(table.column(len(columns) - 1)[0].as_py())
+            table = table.remove_column(len(columns) - 1)
+        return table, table.num_rows, total
+
+    records = relation.fetchall()
+    block, total = _shape_records(columns, records, has_count, response_format)
+    return block, len(records), total
+
+
+def _shape_records(
+    columns: list[str], records: list[tuple[Any, ...]], has_count: bool, response_format: str
+) -> tuple[Any, int | None]:
+    """Shape fetched tuples as row dicts or a columnar mapping, minus the count column."""
+    total = int(records[0][-1]) if has_count and records else None
+    if has_count:
+        columns = columns[:-1]
+
+    if response_format == "columnar":
+        values = [list(column) for column in zip(*records)][: len(columns)]
+        if not records:
+            values = [[] for _ in columns]
+        return {"columns": columns, "values": values}, total
+
+    # zip() stops at the shorter sequence, dropping the count column if present
+    return [dict(zip(columns, row)) for row in records], total
+
+
+class _JsonRows(list):
+    """Leaf or group rows already encoded as JSON object texts by DuckDB."""
+
+
+# ``to_json`` of the block alias keeps the window count as the last key
+_JSON_COUNT_SUFFIX = f',"{_ROW_COUNT_COLUMN}":'
+
+
+def _is_duckdb(connection: Any) -> bool:
+    return duckdb is not None and isinstance(connection, duckdb.DuckDBPyConnection)
+
+
+def _json_relation(relation: Any) -> Any:
+    return relation.set_alias("__ssrm_block").project("to_json(__ssrm_block)")
+
+
+def _fetch_json_rows(relation: Any, has_count: bool) -> tuple[_JsonRows, int, int | None]:
+    block, total = _json_texts([row[0] for row in _json_relation(relation).fetchall()], has_count)
+    return block, len(block), total
+
+
+def _json_texts(texts: list[str], has_count: bool) -> tuple[_JsonRows, int | None]:
+    """Strip the window count key from ``to_json`` row texts, returning its value."""
+    total = None
+    if has_count and texts:
+        cut = texts[0].rfind(_JSON_COUNT_SUFFIX)
+        total = int(texts[0][cut + len(_JSON_COUNT_SUFFIX) : -1])
+    if has_count:
+        texts = [text[: text.rfind(_JSON_COUNT_SUFFIX)] + "}" for text in texts]
+    return _JsonRows(texts), total
+
+
+def _json_default(value: Any) -> Any:
+    """Encode the DuckDB/Python values the stdlib and orjson cannot."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, _dt.datetime):
+        # matches DuckDB's own VARCHAR/JSON rendering of timestamps
+        return value.isoformat(sep=" ")
+    if isinstance(value, (_dt.date, _dt.time)):
+        return value.isoformat()
+    if isinstance(value, _dt.timedelta):
+        return value.total_seconds()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(value)).decode("ascii")
+    return str(value)
+
+
+def _dumps(value: Any) -> bytes:
+    """Serialize ``value`` to compact JSON bytes, via orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(
+            value, default=_json_default, option=orjson.OPT_PASSTHROUGH_DATETIME
+        )
+    return json.dumps(value, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+
+def _encode_block(
+    block: Any,
+    total: int | None,
+    response_format: str,
+    extra: Mapping[str, Any] | None = None,
+) -> bytes:
+    """
+    Encode a ``"rows"``/``"columnar"`` block plus ``rowCount`` and any
+    ``extra`` fields (see :func:`_block_extras`) as JSON bytes.
+    """
+    extra = extra or {}
+    if isinstance(block, _JsonRows):
+        rows = ",".join(block).encode("utf-8")
+        tail = b"," + _dumps(extra)[1:-1] if extra else b""
+        return b'{"rows":[' + rows + b'],"rowCount":' + _dumps(total) + tail + b"}"
+    if response_format == "columnar":
+        return _dumps({**block, "rowCount": total, **extra})
+    return _dumps({"rows": block, "rowCount": total, **extra})
+
+
+def _block_response(
+    block: Any,
+    total: int | None,
+    response_format: str,
+    extra: Mapping[str, Any] | None = None,
+):
+    if response_format == "arrow":
+        if extra:
+            # Arrow carries the extra fields as JSON-encoded schema metadata
+            metadata = dict(block.schema.metadata or {})
+            metadata.update((name.encode("utf-8"), _dumps(value)) for name, value in extra.items())
+            block = block.replace_schema_metadata(metadata)
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, block.schema) as writer:
+            writer.write_table(block)
+        response = Response(sink.getvalue().to_pybytes(), mimetype=_ARROW_MIMETYPE)
+        if total is not None:
+            response.headers[_ROW_COUNT_HEADER] = str(total)
+        return response
+    return Response(
+        _encode_block(block, total, response_format, extra), mimetype="application/json"
+    )
+
+
+def _should_stream(entry: Mapping[str, Any], plan: Mapping[str, Any]) -> bool:
+    """Stream blocks (or unpaged requests) larger than ``stream_chunk_rows``."""
+    chunk_rows = entry["stream_chunk_rows"]
+    if not chunk_rows or plan["rollup"] is not None:
+        return False
+    if plan["pivot_fields"] is not None or plan["grand_total"]:
+        return False
+    bounds = plan["bounds"]
+    return bounds is None or bounds[1] - bounds[0] > chunk_rows
+
+
+def _stream_block(entry: Mapping[str, Any], plan: Mapping[str, Any]) -> Response:
+    """
+    Answer a block as a chunked response built ``stream_chunk_rows`` rows at
+    a time, so worker memory stays flat however large the block is.
+
+    JSON formats stream as NDJSON: one ``{"rows": [...]}`` (or columnar) line
+    per chunk, then a closing ``{"rowCount": n}`` line.  Arrow streams IPC
+    record batches with the row count header resolved before the first byte.
+    A failure after the headers are sent ends NDJSON with an ``{"error": ...}``
+    line and Arrow with an empty batch whose custom metadata carries
+    ``error``.  The connection and query slot are held through a
+    :class:`_StreamLease`; streamed blocks bypass the block caches.
+    """
+    lease = _StreamLease.open(entry, plan["payload"])
+    try:
+        with lease.fetching() as connection:
+            relation = connection.sql(plan["sql"], params=plan["params"] or None)
+            if plan["response_format"] == "arrow":
+                response = _arrow_stream_response(lease, relation, entry, plan)
+            else:
+                response = Response(
+                    _ndjson_chunks(lease, relation, entry, plan), mimetype=_NDJSON_MIMETYPE
+                )
+    except BaseException as err:
+        lease.close()
+        if isinstance(err, Exception) and lease.job is not None and lease.job.cancelled:
+            raise _SupersededQuery("SSRM request superseded by a newer request") from err
+        raise
+    response.call_on_close(lease.close)
+    return response
+
+
+class _StreamLease:
+    """
+    Connection and query slot held by one streamed response.
+
+    The slot is the executor's per-grid slot when the grid uses the executor
+    (so a newer request from the same client interrupts the stream) and the
+    grid's ``stream_slots`` otherwise; both are bounded by
+    ``max_concurrency``.  Chunks are fetched under :meth:`fetching`.  The
+    lease is released when the response closes or, at the latest,
+    ``stream_timeout`` seconds after it opened, so a client that stops
+    reading cannot keep a pooled connection checked out; a generator resumed
+    after that finds the lease closed instead of touching a connection
+    another request may own.
+    """
+
+    def __init__(self, stack: ExitStack, connection: Any, job: "_QueryJob | None", timeout: float) -> None:
+        self.connection = connection
+        self.job = job
+        self.error: str | None = None
+        self._stack = stack
+        self._lock = threading.Lock()
+        self._closed = False
+        self._timer = None
+        if timeout > 0:
+            self._timer = threading.Timer(timeout, self._expire, args=(timeout,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    @classmethod
+    def open(cls, entry: Mapping[str, Any], payload: Mapping[str, Any]) -> "_StreamLease":
+        stack = ExitStack()
+        try:
+            executor = entry.get("executor")
+            if executor is not None:
+                connection, job = stack.enter_context(executor.lease(entry, payload))
+            else:
+                slots = entry["stream_slots"]
+                if not _acquire_slot(slots, entry["pool_timeout"]):
+                    raise _PoolTimeout(
+                        f"No SSRM query slot became free within {entry['pool_timeout']:g}s"
+                    )
+                stack.callback(slots.release)
+                connection, job = stack.enter_context(_open_readonly_connection(entry)), None
+        except BaseException:
+            stack.close()
+            raise
+        return cls(stack, connection, job, entry["stream_timeout"])
+
+    @contextmanager
+    def fetching(self) -> Iterator[Any]:
+        """Hold the connection for one fetch; raise once the lease is closed or superseded."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(self.error or "SSRM stream closed")
+            if self.job is not None and self.job.cancelled:
+                raise _SupersededQuery("SSRM request superseded by a newer request")
+            yield self.connection
+
+    def failure(self, err: Exception) -> str:
+        """Message for the in-band error record that ends a failed stream."""
+        if self.error:
+            return self.error
+        if self.job is not None and self.job.cancelled:
+            return "SSRM request superseded by a newer request"
+        return f"DuckDB execution failed: {err}"
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+        self._stack.close()
+
+    def _expire(self, timeout: float) -> None:
+        self.error = f"SSRM stream exceeded stream_timeout ({timeout:g}s)"
+        if not self._lock.acquire(blocking=False):
+            # a fetch is running: stop it, then close once it lets go
+            self.connection.interrupt()
+        else:
+            self._lock.release()
+        self.close()
+
+
+def _ndjson_chunks(
+    lease: _StreamLease, relation: Any, entry: Mapping[str, Any], plan: Mapping[str, Any]
+) -> Iterator[bytes]:
+    chunk_rows = entry["stream_chunk_rows"]
+    response_format = plan["response_format"]
+    columns = list(relation.columns)
+    has_count = bool(columns) and columns[-1] == _ROW_COUNT_COLUMN
+    total = None
+    returned = 0
+    last_chunk = None
+    try:
+        with lease.fetching() as connection:
+            use_json = (
+                response_format == "rows"
+                and entry["json_encoder"] == "duckdb"
+                and _is_duckdb(connection)
+            )
+            source = _json_relation(relation) if use_json else relation
+        while True:
+            with lease.fetching():
+                records = source.fetchmany(chunk_rows)
+            if not records:
+                break
+            if use_json:
+                chunk, chunk_total = _json_texts([row[0] for row in records], has_count)
+                line = b'{"rows":[' + ",".join(chunk).encode("utf-8") + b"]}\n"
+            else:
+                chunk, chunk_total = _shape_records(columns, records, has_count, response_format)
+                line = _dumps(chunk if response_format == "columnar" else {"rows": chunk}) + b"\n"
+            if total is None:
+                total = chunk_total
+            returned += len(records)
+            last_chunk = chunk
+            yield line
+        if total is None:
+            total = _infer_row_count(plan["payload"], returned)
+        with lease.fetching() as connection:
+            total, counted = _complete_total(connection, entry, plan, total)
+    except Exception as err:
+        # headers are already sent; report the failure in-band
+        yield _dumps({"error": lease.failure(err)}) + b"\n"
+        return
+    _record_streamed_block(entry, plan, last_chunk, returned, total, counted)
+    yield _dumps({"rowCount": total}) + b"\n"
+
+
+def _arrow_stream_response(
+    lease: _StreamLease, relation: Any, entry: Mapping[str, Any], plan: Mapping[str, Any]
+) -> Response:
+    # runs under lease.fetching(), from _stream_block
+    columns = list(relation.columns)
+    has_count = bool(columns) and columns[-1] == _ROW_COUNT_COLUMN
+    reader = relation.to_arrow_reader(entry["stream_chunk_rows"])
+    schema = reader.schema
+    if has_count:
+        schema = schema.remove(len(columns) - 1)
+    batches = iter(reader)
+    first = next(batches, None)
+    total = None
+    if has_count and first is not None and first.num_rows:
+        total = int(first.column(len(columns) - 1)[0].as_py())
+    elif first is None:
+        total = _infer_row_count(plan["payload"], 0)
+    total, counted = _complete_total(lease.connection, entry, plan, total)
+
+    def generate() -> Iterator[bytes]:
+        sink = io.BytesIO()
+        returned = 0
+        last_batch = None
+        failed = False
+        with pyarrow.ipc.new_stream(sink, schema) as writer:
+            batch = first
+            try:
+                while batch is not None:
+                    if has_count:
+                        batch = pyarrow.RecordBatch.from_arrays(batch.columns[:-1], schema=schema)
+                    if batch.num_rows:
+                        writer.write_batch(batch)
+                        returned += batch.num_rows
+                        last_batch = batch
+                        yield sink.getvalue()
+                        sink.seek(0)
+                        sink.truncate()
+                    with lease.fetching():
+                        batch = next(batches, None)
+            except Exception as err:
+                # headers are already sent; report the failure in-band
+                failed = True
+                writer.write_batch(
+                    pyarrow.RecordBatch.from_pylist([], schema=schema),
+                    custom_metadata={"error": lease.failure(err)},
+                )
+        yield sink.getvalue()
+        if not failed:
+            _record_streamed_block(entry, plan, last_batch, returned, total, counted)
+
+    response = Response(generate(), mimetype=_ARROW_MIMETYPE)
+    if total is not None:
+        response.headers[_ROW_COUNT_HEADER] = str(total)
+    return response
+
+
+def _record_streamed_block(
+    entry: Mapping[str, Any],
+    plan: Mapping[str, Any],
+    last_chunk: Any,
+    returned: int,
+    total: int | None,
+    counted: bool,
+) -> None:
+    # the keyset seek only needs the final chunk; streamed blocks are not cached
+    _record_block(
+        entry,
+        {**plan, "aggregate_key": None},
+        {"block": last_chunk, "returned": returned, "total": total, "counted": counted},
+    )
+
+
+def _execute_count(
+    connection: "duckdb.DuckDBPyConnection", sql: str, params: list[Any] | None = None
+) -> int:
+    return connection.sql(
+        f"SELECT COUNT(*) FROM ({sql}) AS __ssrm_count", params=params or None
+    ).fetchone()[0]
+
+
+def _without_paging(payload: Mapping[str, Any]) -> dict[str, Any]:
+    return {key: value for key, value in payload.items() if key not in _PAGING_KEYS}
+
+
+def _page_bounds(payload: Mapping[str, Any]) -> tuple[int, int] | None:
+    try:
+        start = int(payload["startRow"])
+        end = int(payload["endRow"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return (start, end) if end >= start else None
+
+
+def _infer_row_count(payload: Mapping[str, Any], returned: int) -> int | None:
+    """
+    Derive the total from the page itself when that is unambiguous.
+
+    A page shorter than the requested block is the last one, so the total is
+    ``startRow + returned``.  Unpaged requests return everything.  An empty
+    page past the first row says nothing about where the data ends.
+    """
+    bounds = _page_bounds(payload)
+    if bounds is None:
+        return returned
+    start, end = bounds
+    if returned < end - start and (returned or start == 0):
+        return start + returned
+    return None
+
+
+def _request_fingerprint(payload: Mapping[str, Any], ignore: Iterable[str] = ()) -> str:
+    """
+    Hash a request canonically (sorted keys, fields in ``ignore`` dropped) so
+    logically identical payloads share cache entries.
+    """
+    skip = set(ignore)
+    canonical = json.dumps(
+        {key: value for key, value in payload.items() if key not in skip},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _data_version(entry: Mapping[str, Any]) -> tuple[Any, ...]:
+    """
+    Return a token that changes whenever the grid's underlying data may have.
+    """
+    version = entry.get("version")
+    if callable(version):
+        version = version()
+    return (entry["backend"].version(), version)
+
+
+def _column_types(entry: dict[str, Any], connection: Any = None) -> dict[str, str] | None:
+    """
+    Return the grid's column name to type mapping from ``DESCRIBE``, cached
+    per data version and re-read on ``connection`` when given.  ``None`` for
+    custom builders, non-DuckDB dialects or when introspection fails; SQL is
+    then generated untyped.
+    """
+    source = entry["source"]
+    if source is None or not isinstance(entry["backend"].dialect, DuckDBDialect):
+        return None
+    version = _data_version(entry)
+    cached = entry.get("schema")
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    table_sql = source if isinstance(source, str) else f"({source.sql()}) AS t"
+    try:
+        if connection is not None:
+            rows = connection.sql(f"DESCRIBE SELECT * FROM {table_sql}").fetchall()
+        else:
+            with _open_readonly_connection(entry) as con:
+                rows = con.sql(f"DESCRIBE SELECT * FROM {table_sql}").fetchall()
+        schema = _ColumnTypes({str(row[0]): str(row[1]) for row in rows})
+    except Exception as err:
+        print(f"[AgGridJS] SSRM schema introspection failed for {entry['grid_id']!r}: {err}")
+        schema = None
+    entry["schema"] = (version, schema)
+    return schema
+
+
+def _build_statement(entry: Mapping[str, Any], payload: Mapping[str, Any]) -> Any:
+    """Run the grid's builder, handing the default builder the cached schema."""
+    if entry["source"] is None:
+        return entry["builder"](payload)
+    return entry["builder"](payload, schema=_column_types(entry))
+
+
+def _count_cache_key(entry: Mapping[str, Any], payload: Mapping[str, Any]) -> tuple[Any, ...] | None:
+    if entry.get("count_cache_ttl", 0) <= 0:
+        return None
+    return (
+        entry["grid_id"],
+        _data_version(entry),
+        _request_fingerprint(payload, _COUNT_CACHE_IGNORED_KEYS),
+    )
+
+
+def _result_cache_key(
+    entry: Mapping[str, Any],
+    payload: Mapping[str, Any],
+    response_format: str,
+) -> tuple[Any, ...] | None:
+    if entry.get("result_cache_ttl", 0) <= 0:
+        return None
+    ignored = _RESULT_CACHE_IGNORED_KEYS
+    if entry.get("columns") is None:
+        ignored = ignored | _PROJECTION_KEYS
+    return (
+        entry["grid_id"],
+        _data_version(entry),
+        _request_fingerprint(payload, ignored),
+        response_format,
+    )
+
+
+def _aggregate_cache_key(entry: Mapping[str, Any], payload: Mapping[str, Any]) -> tuple[Any, ...] | None:
+    """
+    Key a group-level block by what determines its aggregates: the row-group
+    prefix down to the requested level, open group keys, filters, value
+    columns, sort and page.  Leaf blocks are not cached here.
+    """
+    if entry.get("aggregate_cache_ttl", 0) <= 0:
+        return None
+    grouping = _grouping(payload)
+    if grouping["at_leaf"]:
+        return None
+    shape = {
+        "groupCols": [col["expr"] for col in grouping["group_cols"][: grouping["depth"] + 1]],
+        "groupKeys": grouping["group_keys"],
+        "filterModel": payload.get("filterModel") or {},
+        "valueCols": [[col.get("field"), col.get("aggFunc", "sum")] for col in grouping["value_cols"]],
+        "pivotCols": [col["field"] for col in grouping["pivot_cols"]],
+        "grandTotal": _wants_grand_total(grouping, payload.get("grandTotal")),
+        "sort": [[entry.get("colId"), entry.get("sort")] for entry in payload.get("sortModel") or ()],
+        "page": _page_bounds(payload),
+    }
+    return (entry["grid_id"], _data_version(entry), _request_fingerprint(shape, frozenset()))
+
+
+def _keyset_cache_key(entry: Mapping[str, Any], payload: Mapping[str, Any]) -> tuple[Any, ...] | None:
+    if not _grouping(payload)["at_leaf"]:
+        return None
+    return (
+        entry["grid_id"],
+        _data_version(entry),
+        _request_fingerprint(payload, _KEYSET_CACHE_IGNORED_KEYS),
+    )
+
+
+def _remember_keyset(
+    keyset_key: tuple[Any, ...],
+    payload: Mapping[str, Any],
+    keyset: str,
+    block: Any,
+    response_format: str,
+    end_row: int,
+) -> None:
+    """
+    Store the sort-key tuple of the block's last row under the row index the
+    next block will start at.
+    """
+    sort_keys = _sort_keys(payload, _grouping(payload), keyset)
+    # sort expressions are quoted identifiers; strip the quotes to get names
+    names = [expr[1:-1] for expr, _ in sort_keys]
+    try:
+        values = _last_row_values(block, response_format, names)
+    except (KeyError, IndexError, ValueError):
+        return
+    _KEYSET_CACHE.set((*keyset_key, end_row), values)
+
+
+def _last_row_values(block: Any, response_format: str, names: list[str]) -> tuple[Any, ...]:
+    if response_format == "arrow":
+        return tuple(block.column(name)[-1].as_py() for name in names)
+    if response_format == "columnar":
+        positions = [block["columns"].index(name) for name in names]
+        return tuple(block["values"][position][-1] for position in positions)
+    last = json.loads(block[-1]) if isinstance(block, _JsonRows) else block[-1]
+    return tuple(last[name] for name in names)
+
+
+def _known_row_count(payload: Mapping[str, Any]) -> int | None:
+    known = payload.get("knownRowCount")
+    if isinstance(known, bool) or not isinstance(known, int) or known < 0:
+        return None
+    return known
 
 
 def _resolve_entry_for_request(base: str, grid_id: str, payload: Mapping[str, Any] | None = None):
@@ -672,14 +3448,1515 @@ def _resolve_entry_for_request(base: str, grid_id: str, payload: Mapping[str, An
     return None
 
 
-@contextmanager
+class _PoolTimeout(RuntimeError):
+    """Raised when no pooled connection frees up within the pool's timeout."""
+
+
+class _ConnectionPool:
+    """
+    Bounded pool of read-only DuckDB cursors for a single database file, or
+    for a private in-memory database when ``path`` is ``None``.
+
+    A parent connection is opened lazily (an in-memory database attaching the
+    file read-only) and every checkout hands out a ``cursor()`` derived from
+    it.  At most ``max_size`` cursors are in use at once; further callers wait
+    up to ``timeout`` seconds for one to be returned, then get
+    :class:`_PoolTimeout`.  Cursors idle for longer than ``idle_timeout``
+    seconds are closed, and the parent is released by the first checkout
+    after nothing was in use for that long, or immediately with
+    ``idle_timeout=0`` so the file is not held open between requests.  When the file on disk is replaced (inode,
+    size or mtime change) new checkouts get a fresh parent while cursors of
+    the old one finish; the old parent is closed with its last cursor.
+    ``setup`` is called with the parent connection each time it is opened,
+    e.g. to create views over Parquet files in an in-memory database.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None,
+        *,
+        max_size: int = _DEFAULT_POOL_SIZE,
+        idle_timeout: float = _DEFAULT_POOL_IDLE_TIMEOUT,
+        timeout: float = _DEFAULT_POOL_TIMEOUT,
+        setup: Callable[[Any], Any] | None = None,
+    ) -> None:
+        self.path = Path(path) if path is not None else None
+        self._setup = setup
+        self.max_size = max(1, int(max_size))
+        self.idle_timeout = float(idle_timeout)
+        self.timeout = float(timeout)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._parent = None
+        self._signature: tuple[int, int, int] | None = None
+        self._idle: list[tuple[Any, float]] = []
+        # id() of each checked-out cursor -> the parent it was derived from
+        self._owners: dict[int, Any] = {}
+        self._last_used = time.monotonic()
+
+    @contextmanager
+    def connection(self):
+        if not _acquire_slot(self._slots, self.timeout):
+            raise _PoolTimeout(f"No SSRM connection became free within {self.timeout:g}s")
+        try:
+            cursor = self._checkout()
+            failed = False
+            try:
+                yield cursor
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                self._checkin(cursor, check_health=failed)
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_idle_locked()
+            if not self._leased_locked(self._parent):
+                self._close_parent_locked()
+
+    def _file_signature(self) -> tuple[int, int, int] | None:
+        if self.path is None:
+            return None
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _checkout(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refresh_locked(now)
+            while self._idle:
+                cursor, last_used = self._idle.pop()
+                if now - last_used > _POOL_HEALTH_CHECK_AFTER and not _cursor_is_healthy(cursor):
+                    _close_quietly(cursor)
+                    continue
+                self._owners[id(cursor)] = self._parent
+                return cursor
+            if self._parent is None:
+                self._parent = self._open_parent()
+                self._signature = self._file_signature()
+            cursor = self._parent.cursor()
+            if self.path is not None:
+                # cursors start in the in-memory catalog
+                cursor.execute(f"USE {_FILE_CATALOG}")
+            self._owners[id(cursor)] = self._parent
+            return cursor
+
+    def _open_parent(self):
+        parent = duckdb.connect(":memory:")
+        try:
+            if self.path is not None:
+                # ATTACH rather than connect(path): DuckDB shares one instance per
+                # path, which would keep serving a replaced file's old contents
+                path = str(self.path).replace("'", "''")
+                parent.execute(f"ATTACH '{path}' AS {_FILE_CATALOG} (READ_ONLY)")
+                parent.execute(f"USE {_FILE_CATALOG}")
+            if self._setup is not None:
+                self._setup(parent)
+        except BaseException:
+            _close_quietly(parent)
+            raise
+        return parent
+
+    def _checkin(self, cursor, *, check_health: bool) -> None:
+        healthy = not check_health or _cursor_is_healthy(cursor)
+        with self._lock:
+            parent = self._owners.pop(id(cursor))
+            now = time.monotonic()
+            self._last_used = now
+            if parent is not self._parent:
+                # derived from a parent retired after a file replacement
+                _close_quietly(cursor)
+                if not self._leased_locked(parent):
+                    _close_quietly(parent)
+                return
+            if healthy and len(self._idle) < self.max_size:
+                self._idle.append((cursor, now))
+            else:
+                _close_quietly(cursor)
+            if self.idle_timeout <= 0 and not self._owners:
+                self._close_idle_locked()
+                self._close_parent_locked()
+
+    def _leased_locked(self, parent) -> bool:
+        return parent is not None and any(owner is parent for owner in self._owners.values())
+
+    def _refresh_locked(self, now: float) -> None:
+        fresh = []
+        for cursor, last_used in self._idle:
+            if now - last_used > self.idle_timeout:
+                _close_quietly(cursor)
+            else:
+                fresh.append((cursor, last_used))
+        self._idle = fresh
+
+        if self._parent is None:
+            return
+        if self._file_signature() != self._signature:
+            # retire the parent; its last outstanding cursor closes it
+            self._close_idle_locked()
+            if not self._leased_locked(self._parent):
+                _close_quietly(self._parent)
+            self._parent = None
+            self._signature = None
+            return
+        expired = not self._idle and now - self._last_used > self.idle_timeout
+        if expired and not self._owners:
+            self._close_parent_locked()
+
+    def _close_idle_locked(self) -> None:
+        for cursor, _ in self._idle:
+            _close_quietly(cursor)
+        self._idle = []
+
+    def _close_parent_locked(self) -> None:
+        if self._parent is not None:
+            _close_quietly(self._parent)
+        self._parent = None
+        self._signature = None
+
+
+def _acquire_slot(slots: threading.BoundedSemaphore, timeout: float) -> bool:
+    """Wait for a pool slot, ``timeout`` seconds at most (no limit when not positive)."""
+    if timeout > 0:
+        return slots.acquire(timeout=timeout)
+    return slots.acquire()
+
+
+class _TTLCache:
+    """
+    Thread-safe LRU cache with per-item expiry.
+
+    Entries are evicted least-recently-used first once ``max_size`` items (or,
+    when ``max_bytes`` is set, that many bytes as reported to :meth:`set`)
+    are stored, and lazily dropped on lookup once their ``ttl`` has elapsed.
+    Lookups and evictions are counted for :func:`ssrm_cache_stats`.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float | None = None,
+        *,
+        max_bytes: int | None = None,
+    ) -> None:
+        self.max_size = max(1, int(max_size))
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._items: OrderedDict[Any, tuple[Any, float | None, int]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires, size = item
+            if expires is not None and expires <= time.monotonic():
+                del self._items[key]
+                self._bytes -= size
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Any, value: Any, *, ttl: float | None = None, size: int = 0) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._items[key] = (value, expires, size)
+            self._bytes += size
+            self._evict_locked()
+
+    def resize(self, *, max_bytes: int | None) -> None:
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        while len(self._items) > self.max_size or (
+            self.max_bytes is not None and self._bytes > self.max_bytes
+        ):
+            _, (_, _, evicted) = self._items.popitem(last=False)
+            self._bytes -= evicted
+            self.evictions += 1
+
+    def discard(self, predicate: Callable[[Any], bool]) -> int:
+        """Drop every entry whose key matches ``predicate``; return how many."""
+        with self._lock:
+            doomed = [key for key in self._items if predicate(key)]
+            for key in doomed:
+                self._bytes -= self._items.pop(key)[2]
+            return len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+_ROW_COUNT_CACHE = _TTLCache(max_size=_COUNT_CACHE_SIZE, ttl=_DEFAULT_COUNT_CACHE_TTL)
+_KEYSET_CACHE = _TTLCache(max_size=_KEYSET_CACHE_SIZE, ttl=_KEYSET_CACHE_TTL)
+_DISTINCT_CACHE = _TTLCache(max_size=_DISTINCT_CACHE_SIZE, ttl=_DEFAULT_DISTINCT_CACHE_TTL)
+_AGGREGATE_CACHE = _TTLCache(max_size=_AGGREGATE_CACHE_SIZE, ttl=_DEFAULT_AGGREGATE_CACHE_TTL)
+_RESULT_CACHE = _TTLCache(
+    max_size=_RESULT_CACHE_SIZE,
+    ttl=_DEFAULT_RESULT_CACHE_TTL,
+    max_bytes=_DEFAULT_RESULT_CACHE_MAX_BYTES,
+)
+_PIVOT_CACHE = _TTLCache(max_size=_PIVOT_CACHE_SIZE, ttl=_DEFAULT_PIVOT_CACHE_TTL)
+_SQL_TEMPLATE_CACHE = _TTLCache(max_size=_SQL_TEMPLATE_CACHE_SIZE)
+# Recent slow-query plans by SQL text
+_SLOW_QUERY_PLANS = _TTLCache(max_size=_SLOW_QUERY_LOG_SIZE, ttl=_SLOW_QUERY_EXPLAIN_INTERVAL)
+# Grid-scoped caches, keyed by tuples whose first element is the grid id
+_GRID_CACHES = {
+    "result": _RESULT_CACHE,
+    "count": _ROW_COUNT_CACHE,
+    "keyset": _KEYSET_CACHE,
+    "distinct": _DISTINCT_CACHE,
+    "aggregate": _AGGREGATE_CACHE,
+    "pivot": _PIVOT_CACHE,
+}
+
+
+def ssrm_cache_stats() -> dict[str, dict[str, Any]]:
+    """
+    Return entry, byte, hit, miss and eviction counters for each SSRM cache
+    (``result``, ``count``, ``keyset``, ``distinct``, ``aggregate`` and
+    ``pivot``, plus
+    the shared ``sql_template`` cache of compiled :func:`sql_for` clauses).
+    Only the ``result`` cache tracks bytes.
+    """
+    stats = {name: cache.stats() for name, cache in _GRID_CACHES.items()}
+    stats["sql_template"] = _SQL_TEMPLATE_CACHE.stats()
+    return stats
+
+
+def invalidate_ssrm_cache(grid_id: str | None = None) -> int:
+    """
+    Drop cached results, counts, keyset positions, distinct values,
+    aggregates and pivot keys for ``grid_id`` (every grid when ``None``), e.g. after the
+    data changed in a way the file mtime or ``version`` token cannot see.
+    Returns the number of entries removed.
+    """
+    if grid_id is None:
+        removed = sum(len(cache) for cache in _GRID_CACHES.values())
+        for cache in _GRID_CACHES.values():
+            cache.clear()
+        return removed
+    key = str(grid_id)
+    return sum(
+        cache.discard(lambda cached_key: cached_key[0] == key)
+        for cache in _GRID_CACHES.values()
+    )
+
+
+def set_ssrm_result_cache_limit(max_bytes: int) -> None:
+    """Set the byte budget shared by every grid's cached SSRM responses."""
+    max_bytes = int(max_bytes)
+    if max_bytes < 0:
+        raise ValueError("max_bytes must be non-negative")
+    _RESULT_CACHE.resize(max_bytes=max_bytes)
+
+
+class _RollupTable:
+    """
+    In-memory ``GROUP BY ROLLUP`` of a grid's table over its ``rollup``
+    columns, holding sum/min/max/count per ``rollup_values`` column for every
+    group level.
+
+    The table lives in a private in-memory DuckDB that attaches the grid's file
+    read-only while building.  Builds run on a background thread; until one
+    matching the current data version completes, requests fall back to the
+    base table.  A replaced connection is closed once its last cursor is done.
+    """
+
+    def __init__(self, columns: Sequence[str], values: Sequence[str]):
+        self.columns = list(columns)
+        self.values = list(values)
+        self._lock = threading.Lock()
+        self._connection: Any = None
+        self._version: Any = None
+        self._building = False
+        # open cursors per connection, keyed by id()
+        self._leases: dict[int, int] = {}
+
+    def refresh(self, entry: Mapping[str, Any]) -> None:
+        """Start a background rebuild unless one is already running."""
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+        thread = threading.Thread(
+            target=self._build,
+            args=(entry,),
+            name=f"aggrid-ssrm-rollup-{entry['grid_id']}",
+            daemon=True,
+        )
+        thread.start()
+
+    def _build(self, entry: Mapping[str, Any]) -> None:
+        try:
+            version = _data_version(entry)
+            connection = duckdb.connect(":memory:")
+            path = str(entry["backend"].path).replace("'", "''")
+            connection.execute(f"ATTACH '{path}' AS __ssrm_source (READ_ONLY)")
+            connection.execute("USE __ssrm_source")
+            connection.execute(self._build_sql(entry["source"]))
+            connection.execute("USE memory")
+            connection.execute("DETACH __ssrm_source")
+        except Exception as err:  # pragma: no cover - logged, requests fall back
+            print(f"[AgGridJS] SSRM rollup build failed for {entry['grid_id']!r}: {err}")
+            with self._lock:
+                self._building = False
+            return
+
+        with self._lock:
+            previous = self._connection
+            self._connection = connection
+            self._version = version
+            self._building = False
+            # cursors still reading the old table close it when they finish
+            retire = previous is not None and id(previous) not in self._leases
+        if retire:
+            _close_quietly(previous)
+
+    def _build_sql(self, source: Any) -> str:
+        table_sql = source if isinstance(source, str) else f"({source.sql()}) AS t"
+        group_exprs = [quote_identifier(col) for col in self.columns]
+        grouped = " + ".join(f"(1 - GROUPING({expr}))" for expr in group_exprs)
+        measures = [f"COUNT(*) AS {quote_identifier(_ROLLUP_ROWS_COLUMN)}"]
+        for col in self.values:
+            expr = quote_identifier(col)
+            numeric = f"try_cast({expr} AS DOUBLE)"
+            measures.extend(
+                [
+                    f"SUM({numeric}) AS {quote_identifier('sum__' + col)}",
+                    f"MIN({numeric}) AS {quote_identifier('min__' + col)}",
+                    f"MAX({numeric}) AS {quote_identifier('max__' + col)}",
+                    f"COUNT({expr}) AS {quote_identifier('count__' + col)}",
+                    f"COUNT({numeric}) AS {quote_identifier('numeric__' + col)}",
+                ]
+            )
+        return (
+            f"CREATE TABLE memory.main.__ssrm_rollup AS "
+            f"SELECT {', '.join(group_exprs)}, {grouped} AS {quote_identifier(_ROLLUP_LEVEL_COLUMN)}, "
+            f"{', '.join(measures)} FROM {table_sql} GROUP BY ROLLUP ({', '.join(group_exprs)})"
+        )
+
+    @contextmanager
+    def cursor(self):
+        with self._lock:
+            connection = self._connection
+            self._leases[id(connection)] = self._leases.get(id(connection), 0) + 1
+        try:
+            cursor = connection.cursor()
+            try:
+                yield cursor
+            finally:
+                _close_quietly(cursor)
+        finally:
+            with self._lock:
+                remaining = self._leases.pop(id(connection)) - 1
+                if remaining:
+                    self._leases[id(connection)] = remaining
+                retire = not remaining and connection is not self._connection
+            if retire:
+                _close_quietly(connection)
+
+    def statement(
+        self,
+        entry: Mapping[str, Any],
+        payload: Mapping[str, Any],
+        *,
+        row_count: bool = False,
+        child_count: bool = False,
+    ) -> tuple[str, list[Any]] | None:
+        """
+        Return ``(sql, params)`` answering ``payload`` from the rollup, or
+        ``None`` when it cannot (leaf level, filters, pivots, grand totals,
+        unsupported aggregates, a grouping that is not a prefix of the
+        rollup, or a stale table).
+        """
+        grouping = _grouping(payload)
+        if (
+            grouping["at_leaf"]
+            or grouping["pivot_cols"]
+            or payload.get("filterModel")
+            or payload.get("grandTotal")
+        ):
+            return None
+        depth = grouping["depth"]
+        fields = [col["field"] for col in grouping["group_cols"][: depth + 1]]
+        if fields != self.columns[: depth + 1]:
+            return None
+
+        measures = []
+        for col in grouping["value_cols"]:
+            field = col.get("field")
+            if not field:
+                continue
+            func = str(col.get("aggFunc", "sum")).lower()
+            if field not in self.values or func not in _ROLLUP_FUNCS:
+                return None
+            measures.append(_rollup_measure(str(field), func))
+
+        with self._lock:
+            fresh = self._connection is not None and self._version == _data_version(entry)
+        if not fresh:
+            self.refresh(entry)
+            return None
+
+        binder = _Binder(True)
+        filters = [f"{quote_identifier(_ROLLUP_LEVEL_COLUMN)} = {binder.value(depth + 1)}"]
+        for field, key in zip(fields, grouping["group_keys"]):
+            filters.append(f"{quote_identifier(field)} = {binder.value(key)}")
+
+        select_cols = [quote_identifier(fields[depth]), *measures]
+        if child_count:
+            select_cols.append(
+                f"{quote_identifier(_ROLLUP_ROWS_COLUMN)} AS {quote_identifier(_CHILD_COUNT_COLUMN)}"
+            )
+        if row_count:
+            select_cols.append(f"COUNT(*) OVER () AS {quote_identifier(_ROW_COUNT_COLUMN)}")
+        sort_keys = _sort_keys(payload, grouping)
+        sql = (
+            f"SELECT {', '.join(select_cols)} FROM memory.main.__ssrm_rollup "
+            f"WHERE {' AND '.join(filters)}"
+        )
+        if sort_keys:
+            sql += " ORDER BY " + ", ".join(f"{expr} {direction}" for expr, direction in sort_keys)
+        bounds = _page_bounds(payload)
+        if bounds:
+            sql += f" LIMIT {binder.value(bounds[1] - bounds[0])} OFFSET {binder.value(bounds[0])}"
+        return sql, binder.params
+
+
+def _rollup_measure(field: str, func: str) -> str:
+    alias = quote_identifier(field)
+    if func == "sum":
+        return f"{quote_identifier('sum__' + field)} AS {alias}"
+    if func in {"min", "max"}:
+        return f"{quote_identifier(func + '__' + field)} AS {alias}"
+    if func == "count":
+        return f"{quote_identifier('count__' + field)} AS {alias}"
+    # avg/average/mean
+    return (
+        f"{quote_identifier('sum__' + field)} / NULLIF({quote_identifier('numeric__' + field)}, 0)"
+        f" AS {alias}"
+    )
+
+
+def _cursor_is_healthy(cursor) -> bool:
+    try:
+        cursor.execute("SELECT 1").fetchone()
+    except Exception:
+        return False
+    return True
+
+
+def _close_quietly(handle) -> None:
+    try:
+        handle.close()
+    except Exception:  # pragma: no cover - best effort cleanup
+        pass
+
+
+def _pool_for(
+    path: str | Path,
+    *,
+    max_size: int = _DEFAULT_POOL_SIZE,
+    idle_timeout: float = _DEFAULT_POOL_IDLE_TIMEOUT,
+    timeout: float = _DEFAULT_POOL_TIMEOUT,
+) -> _ConnectionPool:
+    key = str(Path(path).resolve())
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = _ConnectionPool(key, max_size=max_size, idle_timeout=idle_timeout, timeout=timeout)
+            _POOLS[key] = pool
+            return pool
+    requested = (max(1, int(max_size)), float(idle_timeout), float(timeout))
+    if requested != (pool.max_size, pool.idle_timeout, pool.timeout):
+        print(
+            f"[AgGridJS] SSRM pool for {key} already exists with pool_size={pool.max_size}, "
+            f"pool_idle_timeout={pool.idle_timeout:g}, pool_timeout={pool.timeout:g}; "
+            "options of later grids on the same file are ignored"
+        )
+    return pool
+
+
+class SsrmBackend(abc.ABC):
+    """
+    Where a grid's SSRM queries run: a pooled connection factory plus the
+    :class:`SqlDialect` used to render SQL for it.
+
+    ``connection()`` is a context manager yielding a connection that offers
+    the part of DuckDB's Python API the routes use: ``sql(query, params=None)``
+    returning a result with ``columns``, ``fetchall()``, ``fetchone()`` and
+    ``to_arrow_table()``, plus ``interrupt()``.  ``path``, when set, is the
+    file whose size and mtime invalidate cached results.
+    """
+
+    dialect: SqlDialect = SqlDialect()
+    path: Path | None = None
+
+    @abc.abstractmethod
+    def connection(self):
+        """Return a context manager yielding a pooled connection."""
+
+    def version(self) -> Any:
+        if self.path is None:
+            return None
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def close(self) -> None:
+        pass
+
+
+class DuckDBBackend(SsrmBackend):
+    """
+    DuckDB database file, or a private in-memory database when ``path`` is
+    ``None`` (point ``table`` at ``read_parquet(...)`` or create views in
+    ``setup``).  File-backed backends share one cursor pool per file unless a
+    ``setup`` hook is given.  Idle files stay attached (and locked) for
+    ``idle_timeout`` seconds; ``idle_timeout=0`` closes the file once no
+    query is running so other processes can write to it.
+    """
+
+    dialect = _DUCKDB_DIALECT
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        *,
+        pool_size: int = _DEFAULT_POOL_SIZE,
+        idle_timeout: float = _DEFAULT_POOL_IDLE_TIMEOUT,
+        timeout: float = _DEFAULT_POOL_TIMEOUT,
+        setup: Callable[[Any], Any] | None = None,
+    ) -> None:
+        _ensure_duckdb_available()
+        self.path = Path(path) if path is not None else None
+        options = {"max_size": pool_size, "idle_timeout": idle_timeout, "timeout": timeout}
+        if self.path is not None and setup is None:
+            self._pool = _pool_for(self.path, **options)
+        else:
+            self._pool = _ConnectionPool(self.path, setup=setup, **options)
+
+    def connection(self):
+        return self._pool.connection()
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+class InMemoryBackend(DuckDBBackend):
+    """
+    Long-lived in-memory DuckDB serving data already held by the process.
+
+    ``sources`` maps view names to pandas/polars DataFrames or Arrow tables,
+    which DuckDB scans in place without copying, or to Parquet paths/globs.
+    :meth:`swap` replaces sources atomically: every checkout sees either the
+    old or the new set, queries already running finish on the data they
+    started with, and the backend version changes so cached results are
+    invalidated.
+    """
+
+    def __init__(
+        self,
+        sources: Mapping[str, Any] | None = None,
+        *,
+        pool_size: int = _DEFAULT_POOL_SIZE,
+        idle_timeout: float = _DEFAULT_POOL_IDLE_TIMEOUT,
+        timeout: float = _DEFAULT_POOL_TIMEOUT,
+    ) -> None:
+        super().__init__(None, pool_size=pool_size, idle_timeout=idle_timeout, timeout=timeout)
+        self._lock = threading.Lock()
+        self._sources: dict[str, Any] = {}
+        self._generation = 0
+        # cursor -> generation of the sources registered on it
+        self._bound: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        if sources:
+            self.swap(sources)
+
+    def swap(self, sources: Mapping[str, Any]) -> None:
+        """Add or replace the given views in one step."""
+        prepared = {}
+        for name, data in sources.items():
+            quote_identifier(str(name))
+            prepared[str(name)] = _scannable(data)
+        with self._lock:
+            self._sources = {**self._sources, **prepared}
+            self._generation += 1
+
+    def version(self) -> Any:
+        with self._lock:
+            return self._generation
+
+    @contextmanager
+    def connection(self):
+        with self._pool.connection() as cursor:
+            self._bind(cursor)
+            yield cursor
+
+    def _bind(self, cursor) -> None:
+        with self._lock:
+            generation, sources = self._generation, self._sources
+            if self._bound.get(cursor) == generation:
+                return
+        for name, data in sources.items():
+            quoted = quote_identifier(name)
+            if isinstance(data, str):
+                cursor.execute(
+                    f"CREATE OR REPLACE TEMP VIEW {quoted} AS "
+                    f"SELECT * FROM read_parquet({_sql_literal(data)})"
+                )
+            else:
+                cursor.execute(f"DROP VIEW IF EXISTS {quoted}")
+                cursor.register(name, data)
+        with self._lock:
+            self._bound[cursor] = generation
+
+
+def _scannable(data: Any) -> Any:
+    """Normalise an in-memory source into something DuckDB can register."""
+    if isinstance(data, (str, os.PathLike)):
+        return os.fspath(data)
+    # polars frames register most reliably through their Arrow view
+    if type(data).__module__.startswith("polars") and hasattr(data, "to_arrow"):
+        return data.to_arrow()
+    return data
+
+
+class SQLiteBackend(SsrmBackend):
+    """SQLite database file opened read-only, one pooled connection per checkout."""
+
+    dialect = SQLiteDialect()
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        pool_size: int = _DEFAULT_POOL_SIZE,
+        idle_timeout: float = _DEFAULT_POOL_IDLE_TIMEOUT,
+        timeout: float = _DEFAULT_POOL_TIMEOUT,
+    ) -> None:
+        self.path = Path(path)
+        uri = f"{self.path.resolve().as_uri()}?mode=ro"
+        self._pool = _DBAPIPool(
+            lambda: sqlite3.connect(uri, uri=True, check_same_thread=False),
+            max_size=pool_size,
+            idle_timeout=idle_timeout,
+            timeout=timeout,
+        )
+
+    def connection(self):
+        return self._pool.connection()
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+class DBAPIBackend(SsrmBackend):
+    """
+    Any DB-API 2.0 driver.  ``connect`` is a zero-argument callable returning
+    a new connection; connections are pooled and rolled back after each use.
+    ``dialect`` defaults to ANSI SQL with ``?`` placeholders; ``version`` is an
+    optional zero-argument callable whose result invalidates caches.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        *,
+        dialect: SqlDialect | None = None,
+        pool_size: int = _DEFAULT_POOL_SIZE,
+        idle_timeout: float = _DEFAULT_POOL_IDLE_TIMEOUT,
+        timeout: float = _DEFAULT_POOL_TIMEOUT,
+        version: Callable[[], Any] | None = None,
+    ) -> None:
+        if not callable(connect):
+            raise TypeError("DBAPIBackend requires a connection factory callable")
+        self.dialect = dialect or SqlDialect()
+        self._version = version
+        self._pool = _DBAPIPool(
+            connect, max_size=pool_size, idle_timeout=idle_timeout, timeout=timeout
+        )
+
+    def connection(self):
+        return self._pool.connection()
+
+    def version(self) -> Any:
+        return self._version() if self._version is not None else None
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+class _DBAPIPool:
+    """
+    Bounded pool of DB-API connections created by ``factory``.
+
+    Mirrors :class:`_ConnectionPool`: at most ``max_size`` checkouts (waiting
+    up to ``timeout`` seconds for one), idle connections closed after
+    ``idle_timeout`` seconds and health-checked after
+    :data:`_POOL_HEALTH_CHECK_AFTER` seconds or a failed query.  Each checkout
+    is wrapped in a :class:`_DBAPISession`.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        *,
+        max_size: int = _DEFAULT_POOL_SIZE,
+        idle_timeout: float = _DEFAULT_POOL_IDLE_TIMEOUT,
+        timeout: float = _DEFAULT_POOL_TIMEOUT,
+    ) -> None:
+        self._factory = factory
+        self.max_size = max(1, int(max_size))
+        self.idle_timeout = float(idle_timeout)
+        self.timeout = float(timeout)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._idle: list[tuple[Any, float]] = []
+
+    @contextmanager
+    def connection(self):
+        if not _acquire_slot(self._slots, self.timeout):
+            raise _PoolTimeout(f"No SSRM connection became free within {self.timeout:g}s")
+        try:
+            connection = self._checkout()
+            failed = False
+            try:
+                yield _DBAPISession(connection)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                self._checkin(connection, check_health=failed)
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            _close_quietly(connection)
+
+    def _checkout(self):
+        stale = []
+        with self._lock:
+            now = time.monotonic()
+            candidate = None
+            while self._idle:
+                connection, last_used = self._idle.pop()
+                if now - last_used > self.idle_timeout:
+                    stale.append(connection)
+                    continue
+                candidate = (connection, now - last_used > _POOL_HEALTH_CHECK_AFTER)
+                break
+        for connection in stale:
+            _close_quietly(connection)
+        if candidate is not None:
+            connection, check = candidate
+            if not check or _dbapi_is_healthy(connection):
+                return connection
+            _close_quietly(connection)
+        return self._factory()
+
+    def _checkin(self, connection, *, check_health: bool) -> None:
+        try:
+            # end the read transaction so the next checkout sees fresh data
+            connection.rollback()
+        except Exception:
+            check_health = True
+        healthy = not check_health or _dbapi_is_healthy(connection)
+        with self._lock:
+            if healthy and len(self._idle) < self.max_size:
+                self._idle.append((connection, time.monotonic()))
+                return
+        _close_quietly(connection)
+
+
+def _dbapi_is_healthy(connection) -> bool:
+    try:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+        finally:
+            cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+class _DBAPISession:
+    """Expose a DB-API connection through the DuckDB-style ``sql()`` API."""
+
+    def __init__(self, connection) -> None:
+        self.connection = connection
+
+    def sql(self, query: str, params: Sequence[Any] | None = None) -> "_DBAPIResult":
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, tuple(params or ()))
+        except BaseException:
+            cursor.close()
+            raise
+        return _DBAPIResult(cursor)
+
+    execute = sql
+
+    def interrupt(self) -> None:
+        # sqlite3 exposes interrupt(), psycopg cancel(); other drivers neither
+        interrupt = getattr(self.connection, "interrupt", None) or getattr(self.connection, "cancel", None)
+        if interrupt is not None:
+            interrupt()
+
+
+class _DBAPIResult:
+    def __init__(self, cursor) -> None:
+        self._cursor = cursor
+        self.columns = [column[0] for column in cursor.description or ()]
+
+    def fetchall(self) -> list[tuple[Any, ...]]:
+        try:
+            return [tuple(row) for row in self._cursor.fetchall()]
+        finally:
+            self._cursor.close()
+
+    def fetchone(self) -> tuple[Any, ...] | None:
+        try:
+            row = self._cursor.fetchone()
+            return tuple(row) if row is not None else None
+        finally:
+            self._cursor.close()
+
+    def fetchmany(self, size: int) -> list[tuple[Any, ...]]:
+        rows = self._cursor.fetchmany(size)
+        if not rows:
+            self._cursor.close()
+        return [tuple(row) for row in rows]
+
+    def to_arrow_table(self):
+        rows = self.fetchall()
+        return pyarrow.table(
+            {name: [row[index] for row in rows] for index, name in enumerate(self.columns)}
+        )
+
+    def to_arrow_reader(self, batch_size: int):
+        # the first chunk fixes the schema every later batch is cast to
+        first = self.fetchmany(batch_size)
+        schema = self._record_batch(first).schema
+
+        def batches():
+            rows = first
+            while rows:
+                yield self._record_batch(rows, schema)
+                rows = self.fetchmany(batch_size)
+
+        return pyarrow.RecordBatchReader.from_batches(schema, batches())
+
+    def _record_batch(self, rows: list[tuple[Any, ...]], schema=None):
+        arrays = {name: [row[index] for row in rows] for index, name in enumerate(self.columns)}
+        return pyarrow.RecordBatch.from_pydict(arrays, schema=schema)
+
+
+def _backend_for_config(config: Mapping[str, Any]) -> SsrmBackend:
+    """
+    Resolve ``config['backend']``: an :class:`SsrmBackend` instance, an
+    :class:`InMemoryBackend` over ``config['data']``, or ``"duckdb"``
+    (default) / ``"sqlite"`` with ``duckdb_path``/``path``.  A DuckDB backend
+    without a path is an in-memory database.
+    """
+    backend = config.get("backend")
+    if isinstance(backend, SsrmBackend):
+        return backend
+    if config.get("data") is not None:
+        return InMemoryBackend(
+            {_DATA_SOURCE_NAME: config["data"]},
+            pool_size=config.get("pool_size", _DEFAULT_POOL_SIZE),
+            idle_timeout=config.get("pool_idle_timeout", _DEFAULT_POOL_IDLE_TIMEOUT),
+            timeout=config.get("pool_timeout", _DEFAULT_POOL_TIMEOUT),
+        )
+
+    pool_options = {
+        "pool_size": config.get("pool_size", _DEFAULT_POOL_SIZE),
+        "idle_timeout": config.get("pool_idle_timeout", _DEFAULT_POOL_IDLE_TIMEOUT),
+        "timeout": config.get("pool_timeout", _DEFAULT_POOL_TIMEOUT),
+    }
+    path = config.get("duckdb_path") or config.get("path") or config.get("database")
+    kind = str(backend or "duckdb").lower()
+    if kind == "duckdb":
+        if not path and not backend:
+            raise ValueError("SSR config must include 'duckdb_path' or 'backend'")
+        return DuckDBBackend(path or None, **pool_options)
+    if kind == "sqlite":
+        if not path:
+            raise ValueError("SQLite SSR backend requires 'path'")
+        return SQLiteBackend(path, **pool_options)
+    raise ValueError(f"Unsupported SSR backend: {backend!r}")
+
+
 def _open_readonly_connection(entry: dict[str, Any]):
-    con = duckdb.connect(str(entry["duckdb_path"]), read_only=True)
+    return entry["backend"].connection()
+
+
+class _SupersededQuery(RuntimeError):
+    """Raised when a newer request from the same client made a query obsolete."""
+
+
+def _execution_failure(err: Exception) -> tuple[Any, int]:
+    """Error response for a failed query: 503 when no pooled connection freed up in time."""
+    if isinstance(err, _PoolTimeout):
+        return jsonify({"error": str(err)}), 503
+    return jsonify({"error": f"DuckDB execution failed: {err}"}), 500
+
+
+class _QueryJob:
+    def __init__(self, grid_id: str, client_id: Any, generation: str) -> None:
+        self.grid_id = grid_id
+        self.client_id = client_id
+        self.generation = generation
+        self.cancelled = False
+        self.started = False
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def attach(self, connection) -> bool:
+        with self._lock:
+            if self.cancelled:
+                return False
+            self._connection = connection
+            return True
+
+    def detach(self) -> None:
+        with self._lock:
+            self._connection = None
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            if self._connection is not None:
+                self._connection.interrupt()
+
+
+class _QueryExecutor:
+    """
+    Bounded thread pool that runs SSRM queries.
+
+    Each grid may run at most its ``max_concurrency`` queries at once; extra
+    requests wait for a slot and are counted as queued.  Jobs are tracked per
+    ``(grid, client)`` so a request whose filter/sort/grouping state differs
+    from what the same client has in flight cancels the older jobs: queued ones
+    never start, running ones are stopped with ``connection.interrupt()``.
+    """
+
+    def __init__(self, max_workers: int | None = None) -> None:
+        self.max_workers = max(1, int(max_workers or min(32, (os.cpu_count() or 1) + 4)))
+        self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="aggrid-ssrm")
+        self._lock = threading.Lock()
+        self._grid_slots: dict[str, threading.BoundedSemaphore] = {}
+        self._inflight: dict[tuple[str, Any], set[_QueryJob]] = {}
+        self._stats = {"queued": 0, "running": 0, "completed": 0, "failed": 0, "superseded": 0}
+        self._grid_stats: dict[str, dict[str, int]] = {}
+
+    def run(self, entry: Mapping[str, Any], payload: Mapping[str, Any], work: Callable[[Any], Any]) -> Any:
+        grid_id = entry["grid_id"]
+        job = _QueryJob(
+            grid_id,
+            payload.get("ssrmClientId"),
+            _request_fingerprint(payload, _GENERATION_IGNORED_KEYS),
+        )
+        self._track(job)
+        slot = self._slot_for(grid_id, entry["max_concurrency"])
+        self._bump(grid_id, "queued", 1)
+        try:
+            with slot:
+                if job.cancelled:
+                    self._bump(grid_id, "superseded", 1)
+                    raise _SupersededQuery("SSRM request superseded by a newer request")
+                return self._pool.submit(self._run_job, job, entry, work).result()
+        finally:
+            if not job.started:
+                self._bump(grid_id, "queued", -1)
+            self._forget(job)
+
+    @contextmanager
+    def lease(self, entry: Mapping[str, Any], payload: Mapping[str, Any]) -> Iterator[tuple[Any, _QueryJob]]:
+        """
+        Hold one of the grid's slots and a connection on the calling thread,
+        for work such as a streamed response that outlives a single call.
+        The job is tracked like :meth:`run`'s, so a newer request from the
+        same client interrupts it.
+        """
+        grid_id = entry["grid_id"]
+        job = _QueryJob(
+            grid_id,
+            payload.get("ssrmClientId"),
+            _request_fingerprint(payload, _GENERATION_IGNORED_KEYS),
+        )
+        self._track(job)
+        slot = self._slot_for(grid_id, entry["max_concurrency"])
+        try:
+            if not _acquire_slot(slot, entry["pool_timeout"]):
+                raise _PoolTimeout(f"No SSRM query slot became free within {entry['pool_timeout']:g}s")
+            try:
+                with _open_readonly_connection(entry) as con:
+                    if not job.attach(con):
+                        self._bump(grid_id, "superseded", 1)
+                        raise _SupersededQuery("SSRM request superseded by a newer request")
+                    self._bump(grid_id, "running", 1)
+                    try:
+                        yield con, job
+                    finally:
+                        job.detach()
+                        self._bump(grid_id, "running", -1)
+                        self._bump(grid_id, "superseded" if job.cancelled else "completed", 1)
+            finally:
+                slot.release()
+        finally:
+            self._forget(job)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                **self._stats,
+                "grids": {grid: dict(values) for grid, values in self._grid_stats.items()},
+            }
+
+    def _run_job(self, job: _QueryJob, entry: Mapping[str, Any], work: Callable[[Any], Any]) -> Any:
+        grid_id = job.grid_id
+        job.started = True
+        self._bump(grid_id, "queued", -1)
+        self._bump(grid_id, "running", 1)
+        outcome = "failed"
+        try:
+            with _open_readonly_connection(entry) as con:
+                if not job.attach(con):
+                    outcome = "superseded"
+                    raise _SupersededQuery("SSRM request superseded by a newer request")
+                try:
+                    result = work(con)
+                except Exception as err:
+                    if job.cancelled:
+                        outcome = "superseded"
+                        raise _SupersededQuery("SSRM request superseded by a newer request") from err
+                    raise
+                finally:
+                    job.detach()
+            # An interrupt that lands before DuckDB starts executing is a no-op
+            if job.cancelled:
+                outcome = "superseded"
+                raise _SupersededQuery("SSRM request superseded by a newer request")
+            outcome = "completed"
+            return result
+        finally:
+            self._bump(grid_id, "running", -1)
+            self._bump(grid_id, outcome, 1)
+
+    def _slot_for(self, grid_id: str, limit: int) -> threading.BoundedSemaphore:
+        with self._lock:
+            slot = self._grid_slots.get(grid_id)
+            if slot is None:
+                slot = threading.BoundedSemaphore(limit)
+                self._grid_slots[grid_id] = slot
+            return slot
+
+    def _track(self, job: _QueryJob) -> None:
+        stale: list[_QueryJob] = []
+        with self._lock:
+            jobs = self._inflight.setdefault((job.grid_id, job.client_id), set())
+            if job.client_id is not None:
+                stale = [other for other in jobs if other.generation != job.generation]
+            jobs.add(job)
+        for other in stale:
+            other.cancel()
+
+    def _forget(self, job: _QueryJob) -> None:
+        with self._lock:
+            key = (job.grid_id, job.client_id)
+            jobs = self._inflight.get(key)
+            if jobs is not None:
+                jobs.discard(job)
+                if not jobs:
+                    del self._inflight[key]
+
+    def _bump(self, grid_id: str, field: str, delta: int) -> None:
+        with self._lock:
+            self._stats[field] += delta
+            grid_stats = self._grid_stats.setdefault(
+                grid_id, {key: 0 for key in self._stats}
+            )
+            grid_stats[field] += delta
+
+
+def _executor_for_config(option: Any) -> _QueryExecutor | None:
+    """
+    Return the process-wide query executor, created with the ``max_workers``
+    of the first grid that enables it.
+    """
+    if not option:
+        return None
+    global _EXECUTOR
+    max_workers = option.get("max_workers") if isinstance(option, Mapping) else None
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = _QueryExecutor(max_workers)
+            return _EXECUTOR
+        executor = _EXECUTOR
+    if max_workers is not None and max(1, int(max_workers)) != executor.max_workers:
+        print(
+            f"[AgGridJS] SSRM query executor already exists with max_workers={executor.max_workers}; "
+            f"max_workers={max_workers} of later grids is ignored"
+        )
+    return executor
+
+
+def _run_query(entry: Mapping[str, Any], payload: Mapping[str, Any], work: Callable[[Any], Any]) -> Any:
+    """
+    Run ``work(connection)`` for a grid, on the query executor when enabled.
+    """
+    executor = entry.get("executor")
+    if executor is None:
+        with _open_readonly_connection(entry) as con:
+            return work(con)
+    return executor.run(entry, payload, work)
+
+
+def ssrm_executor_stats() -> dict[str, Any]:
+    """
+    Return queue-depth and outcome counters of the SSRM query executor.
+
+    ``queued`` counts requests waiting for a per-grid slot or a worker thread,
+    ``running`` those executing, and ``completed``/``failed``/``superseded``
+    are cumulative.  The same counters are broken down per grid under
+    ``grids``.  Empty when no grid has enabled the executor.
+    """
+    executor = _EXECUTOR
+    return executor.stats() if executor is not None else {}
+
+
+class _RequestTimer:
+    """Wall-clock phase durations of one SSRM request, in seconds."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        metrics = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()]
+        metrics.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+def _run_timed_query(
+    entry: Mapping[str, Any],
+    payload: Mapping[str, Any],
+    timer: _RequestTimer,
+    work: Callable[[Any], Any],
+) -> Any:
+    """:func:`_run_query`, timing executor queueing plus checkout as ``connect``."""
+    queued = time.perf_counter()
+
+    def timed(con):
+        timer.add("connect", time.perf_counter() - queued)
+        return work(con)
+
+    return _run_query(entry, payload, timed)
+
+
+def _finish_request(
+    entry: Mapping[str, Any],
+    route: str,
+    timer: _RequestTimer,
+    response: Any,
+    **details: Any,
+) -> Response:
+    """
+    Attach the ``Server-Timing`` header (not on streamed responses, whose
+    body runs after the headers are sent) and report the request to the
+    metrics hook.  ``details`` may carry ``rows`` and ``cache`` (the cache that
+    answered it).
+    """
+    response = make_response(response)
+    # a streamed body runs after the headers are sent, so its timings would be partial
+    if not response.is_streamed:
+        response.headers["Server-Timing"] = timer.server_timing()
+    hook = _METRICS_HOOK
+    if hook is not None:
+        event = {
+            "grid_id": entry["grid_id"],
+            "route": route,
+            "status": response.status_code,
+            "duration": timer.elapsed(),
+            "phases": dict(timer.phases),
+            "rows": details.get("rows"),
+            # streamed bodies have no length up front
+            "bytes": response.content_length,
+            "cache": details.get("cache"),
+        }
+        try:
+            hook(event)
+        except Exception as err:
+            print(f"[AgGridJS] SSRM metrics hook failed: {err}")
+    return response
+
+
+def set_ssrm_metrics_hook(hook: Callable[[dict[str, Any]], Any] | None) -> None:
+    """
+    Call ``hook(event)`` after every SSRM block, distinct and prefetch
+    request (``None`` removes it).
+
+    ``event`` holds ``grid_id``, ``route`` (``"block"``/``"distinct"``/
+    ``"prefetch"``), ``status``, ``duration`` and per-phase ``phases`` in seconds (``cache``,
+    ``build``, ``connect``, ``query``, ``count``, ``encode``), ``rows``,
+    ``bytes`` and ``cache`` (``"result"``/``"aggregate"`` when a cache
+    answered).  :class:`SsrmMetrics` is a ready-made Prometheus-style hook.
+    Exceptions raised by the hook are printed and otherwise ignored.
+    """
+    global _METRICS_HOOK
+    if hook is not None and not callable(hook):
+        raise TypeError("SSRM metrics hook must be callable")
+    _METRICS_HOOK = hook
+
+
+class SsrmMetrics:
+    """
+    Prometheus-style collector usable as :func:`set_ssrm_metrics_hook`.
+
+    Keeps request, row and response-byte counters per grid and route, and
+    latency histograms per grid, route and phase.  :meth:`render` returns the
+    Prometheus text exposition format, e.g. for a ``/metrics`` view.
+    """
+
+    default_buckets = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets: Iterable[float] | None = None, *, prefix: str = "aggrid_ssrm") -> None:
+        self.buckets = tuple(sorted(buckets)) if buckets else self.default_buckets
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+        # (name, labels) -> per-bucket counts followed by sum and count
+        self._histograms: dict[tuple[str, tuple[tuple[str, str], ...]], list[float]] = {}
+
+    def __call__(self, event: Mapping[str, Any]) -> None:
+        labels = (("grid", str(event["grid_id"])), ("route", str(event["route"])))
+        with self._lock:
+            self._increment("requests_total", (*labels, ("status", str(event["status"]))), 1)
+            if event.get("rows"):
+                self._increment("rows_total", labels, event["rows"])
+            if event.get("bytes"):
+                self._increment("response_bytes_total", labels, event["bytes"])
+            if event.get("cache"):
+                self._increment("cache_hits_total", (*labels, ("cache", str(event["cache"]))), 1)
+            self._observe("request_duration_seconds", labels, event["duration"])
+            for phase, seconds in (event.get("phases") or {}).items():
+                self._observe("phase_duration_seconds", (*labels, ("phase", phase)), seconds)
+
+    def _increment(self, name: str, labels: tuple[tuple[str, str], ...], amount: float) -> None:
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def _observe(self, name: str, labels: tuple[tuple[str, str], ...], value: float) -> None:
+        series = self._histograms.setdefault((name, labels), [0] * (len(self.buckets) + 2))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return ``{"counters": {...}, "histograms": {...}}`` keyed by (name, labels)."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "histograms": {key: list(series) for key, series in self._histograms.items()},
+            }
+
+    def render(self) -> str:
+        snapshot = self.snapshot()
+        lines: list[str] = []
+        typed: set[str] = set()
+        for (name, labels), value in sorted(snapshot["counters"].items()):
+            metric = f"{self.prefix}_{name}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_prometheus_labels(labels)} {value:g}")
+        for (name, labels), series in sorted(snapshot["histograms"].items()):
+            metric = f"{self.prefix}_{name}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            for bound, count in zip(self.buckets, series):
+                bucket_labels = (*labels, ("le", f"{bound:g}"))
+                lines.append(f"{metric}_bucket{_prometheus_labels(bucket_labels)} {count:g}")
+            lines.append(f'{metric}_bucket{_prometheus_labels((*labels, ("le", "+Inf")))} {series[-1]:g}')
+            lines.append(f"{metric}_sum{_prometheus_labels(labels)} {series[-2]:g}")
+            lines.append(f"{metric}_count{_prometheus_labels(labels)} {series[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _prometheus_labels(labels: Iterable[tuple[str, str]]) -> str:
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels) + "}"
+
+
+def _check_slow_query(
+    entry: Mapping[str, Any],
+    route: str,
+    sql: str,
+    params: list[Any] | None,
+    timer: _RequestTimer,
+) -> None:
+    """
+    Log queries over the grid's ``slow_query_ms``.  Plans come from a single
+    background worker with a bounded backlog, and SQL explained within the
+    last :data:`_SLOW_QUERY_EXPLAIN_INTERVAL` seconds reuses its plan, so a
+    slow server is not asked to re-run every slow query.
+    """
+    threshold = entry.get("slow_query_ms")
+    duration = timer.phases.get("query", 0.0) + timer.phases.get("count", 0.0)
+    if not threshold or duration * 1000 < threshold:
+        return
+    params = list(params or ())
+    plan = _SLOW_QUERY_PLANS.get(sql)
+    if plan is not None:
+        _log_slow_query(entry, route, sql, params, duration, plan)
+        return
+    with _SLOW_QUERY_LOCK:
+        if sql in _SLOW_QUERY_PENDING:
+            plan = "EXPLAIN pending for an earlier run of this SQL"
+        else:
+            try:
+                _SLOW_QUERY_QUEUE.put_nowait((entry, route, sql, params, duration))
+            except queue.Full:
+                plan = "EXPLAIN skipped: too many slow queries waiting"
+            else:
+                _SLOW_QUERY_PENDING.add(sql)
+                _ensure_slow_query_worker()
+    if plan is not None:
+        _log_slow_query(entry, route, sql, params, duration, plan)
+
+
+def _ensure_slow_query_worker() -> None:
+    global _SLOW_QUERY_WORKER
+    if _SLOW_QUERY_WORKER is None or not _SLOW_QUERY_WORKER.is_alive():
+        _SLOW_QUERY_WORKER = threading.Thread(
+            target=_explain_slow_queries, name="aggrid-ssrm-explain", daemon=True
+        )
+        _SLOW_QUERY_WORKER.start()
+
+
+def _explain_slow_queries() -> None:
+    while True:
+        entry, route, sql, params, duration = _SLOW_QUERY_QUEUE.get()
+        try:
+            _record_slow_query(entry, route, sql, params, duration)
+        finally:
+            with _SLOW_QUERY_LOCK:
+                _SLOW_QUERY_PENDING.discard(sql)
+
+
+def _record_slow_query(
+    entry: Mapping[str, Any], route: str, sql: str, params: list[Any], duration: float
+) -> None:
     try:
-        yield con
-    finally:
-        con.close()
+        with _open_readonly_connection(entry) as con:
+            rows = con.sql(entry["backend"].dialect.explain(sql), params=params or None).fetchall()
+        plan = "\n".join(" ".join(str(cell) for cell in row[1:] or row) for row in rows)
+        _SLOW_QUERY_PLANS.set(sql, plan)
+    except Exception as err:
+        plan = f"EXPLAIN failed: {err}"
+    _log_slow_query(entry, route, sql, params, duration, plan)
+
+
+def _log_slow_query(
+    entry: Mapping[str, Any], route: str, sql: str, params: list[Any], duration: float, plan: str
+) -> None:
+    _SLOW_QUERIES.append(
+        {
+            "grid_id": entry["grid_id"],
+            "route": route,
+            "duration": duration,
+            "sql": sql,
+            "params": params,
+            "plan": plan,
+            "recorded_at": time.time(),
+        }
+    )
+    print(f"[AgGridJS] SSRM slow {route} query on {entry['grid_id']!r}: {duration * 1000:.0f} ms")
+
+
+def ssrm_slow_queries() -> list[dict[str, Any]]:
+    """
+    Return the most recent slow queries (oldest first) recorded for grids
+    with ``slow_query_ms``: grid, route, duration in seconds, SQL, params and
+    the ``EXPLAIN ANALYZE`` output (``EXPLAIN`` on engines without it).
+    """
+    return list(_SLOW_QUERIES)
+
 
+# (rule under the base route, view name, HTTP methods, handler(base, **url_args))
+_SSRM_ROUTES = (
+    ("<grid_id>", "aggrid_ssrm", ("POST", "OPTIONS"), _serve_ssrm_request),
+    ("distinct/<grid_id>/<column>", "aggrid_ssrm_distinct", ("GET", "POST"), _serve_distinct_request),
+    ("batch/<grid_id>", "aggrid_ssrm_batch", ("POST",), _serve_batch_request),
+    ("prefetch/<grid_id>", "aggrid_ssrm_prefetch", ("POST",), _serve_prefetch_request),
+    ("export/<grid_id>", "aggrid_ssrm_export", ("GET", "POST"), _serve_export_request),
+)
 
 # Ensure the default SSRM route is registered as soon as the module loads so
 # Dash apps with callable layouts have the endpoints mounted before the first
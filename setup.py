@@ -30,6 +30,7 @@ setup(
     extras_require={
         "dev": ["pre-commit>=3.6", "build>=1.0", "twine>=4.0"],
         "test": ["pytest>=7.4", "dash[testing]>=2.14", "selenium>=4.15"],
+        "benchmark": ["pytest-benchmark>=4.0", "duckdb>=1.4.2,<2.0"],
     },
     python_requires=">=3.8",
     url="https://github.com/ScottTpirate/dash-aggrid",
@@ -526,6 +526,486 @@ if (typeof window !== 'undefined') {
   window.setTimeout(retry, 100);
 }
 
+const SSRM_PAGING_KEYS = new Set(['startRow', 'endRow', 'knownRowCount', 'ssrmClientId']);
+const SSRM_KNOWN_ROW_COUNT_LIMIT = 500;
+const ssrmKnownRowCounts = new Map();
+const ssrmClientIds = new Map();
+
+// Identifies this page's grid instance so the server only cancels our own superseded queries.
+const ssrmClientIdFor = (gridId) => {
+  if (!ssrmClientIds.has(gridId)) {
+    ssrmClientIds.set(gridId, `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`);
+  }
+  return ssrmClientIds.get(gridId);
+};
+
+const ssrmStoreKey = (requestPayload) => JSON.stringify(
+  Object.keys(requestPayload || {})
+    .filter((key) => !SSRM_PAGING_KEYS.has(key))
+    .sort()
+    .map((key) => [key, requestPayload[key]])
+);
+
+const knownRowCountsFor = (gridId) => {
+  if (!ssrmKnownRowCounts.has(gridId)) {
+    ssrmKnownRowCounts.set(gridId, new Map());
+  }
+  return ssrmKnownRowCounts.get(gridId);
+};
+
+// Known counts describe the data the grid last loaded: forget them whenever the grid
+// refreshes or purges its server-side stores, or is given another datasource.
+const forgetSsrmRowCountsOnRefresh = (api, gridId) => {
+  if (!api || api.ssrmRowCountsWrapped) {
+    return;
+  }
+  const { refreshServerSide, setGridOption } = api;
+  if (typeof refreshServerSide === 'function') {
+    api.refreshServerSide = (...args) => {
+      ssrmKnownRowCounts.delete(gridId);
+      return refreshServerSide.apply(api, args);
+    };
+  }
+  if (typeof setGridOption === 'function') {
+    api.setGridOption = (key, ...args) => {
+      if (key === 'serverSideDatasource') {
+        ssrmKnownRowCounts.delete(gridId);
+      }
+      return setGridOption.call(api, key, ...args);
+    };
+  }
+  api.ssrmRowCountsWrapped = true;
+};
+
+const rememberRowCount = (knownCounts, storeKey, rowCount) => {
+  if (!knownCounts.has(storeKey) && knownCounts.size >= SSRM_KNOWN_ROW_COUNT_LIMIT) {
+    knownCounts.delete(knownCounts.keys().next().value);
+  }
+  knownCounts.set(storeKey, rowCount);
+};
+
+const ssrmShownFields = new Map();
+
+const displayedSsrmFields = (api) => {
+  const displayed = api?.getAllDisplayedColumns?.();
+  if (!Array.isArray(displayed)) {
+    return null;
+  }
+  return displayed.map((column) => column.getColDef().field).filter(Boolean);
+};
+
+// With `columns` projection, loaded rows only hold the fields that were displayed when
+// they were fetched: purge the cache once a column without data becomes visible.
+const refreshOnShownSsrmColumns = (gridId, event) => {
+  const fields = displayedSsrmFields(event?.api);
+  if (!fields) {
+    return;
+  }
+  const shown = ssrmShownFields.get(gridId);
+  ssrmShownFields.set(gridId, new Set(fields));
+  if (shown && fields.some((field) => !shown.has(field))) {
+    event.api.refreshServerSide?.({ purge: true });
+  }
+};
+
+const SSRM_ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream';
+const SSRM_ROW_COUNT_HEADER = 'X-AgGrid-Row-Count';
+const SSRM_NDJSON_MIMETYPE = 'application/x-ndjson';
+// Response fields beyond rows/rowCount; Arrow responses carry them as schema metadata.
+const SSRM_EXTRA_FIELDS = ['pivotResultFields', 'grandTotal'];
+
+const columnarToRows = (columns, values) => {
+  const length = Array.isArray(values?.[0]) ? values[0].length : 0;
+  const rows = new Array(length);
+  for (let rowIndex = 0; rowIndex < length; rowIndex += 1) {
+    const row = {};
+    columns.forEach((column, columnIndex) => {
+      row[column] = values[columnIndex][rowIndex];
+    });
+    rows[rowIndex] = row;
+  }
+  return rows;
+};
+
+const arrowAvailable = () => (
+  typeof window !== 'undefined' && typeof window.Arrow?.tableFromIPC === 'function'
+);
+
+const arrowExtras = (schema) => {
+  const extras = {};
+  SSRM_EXTRA_FIELDS.forEach((name) => {
+    const value = schema?.metadata?.get?.(name);
+    if (value) {
+      extras[name] = JSON.parse(value);
+    }
+  });
+  return extras;
+};
+
+// A streamed Arrow block that fails mid-way ends with an empty batch whose metadata carries `error`.
+const throwArrowBatchError = (batch) => {
+  const error = batch?.metadata?.get?.('error');
+  if (error) {
+    throw new Error(error);
+  }
+};
+
+// Decode Arrow IPC batch by batch when the reader API and a body stream are available.
+const decodeArrowResponse = async (response) => {
+  const Arrow = window.Arrow;
+  if (typeof Arrow.RecordBatchReader?.from === 'function' && response.body) {
+    const reader = await Arrow.RecordBatchReader.from(response.body);
+    const rows = [];
+    for await (const batch of reader) {
+      throwArrowBatchError(batch);
+      for (const row of batch) {
+        rows.push(row.toJSON());
+      }
+    }
+    return { rows, ...arrowExtras(reader.schema) };
+  }
+  const table = Arrow.tableFromIPC(new Uint8Array(await response.arrayBuffer()));
+  table.batches.forEach(throwArrowBatchError);
+  return { rows: table.toArray().map((row) => row.toJSON()), ...arrowExtras(table.schema) };
+};
+
+// Streamed JSON blocks arrive as NDJSON: one rows/columnar chunk per line, then { rowCount }.
+const decodeNdjsonResponse = async (response) => {
+  const result = { rows: [], rowCount: undefined };
+  const consume = (line) => {
+    if (!line.trim()) {
+      return;
+    }
+    const message = JSON.parse(line);
+    if (message.error) {
+      throw new Error(message.error);
+    }
+    if ('rowCount' in message) {
+      result.rowCount = message.rowCount;
+      return;
+    }
+    normaliseSsrmPayload(message).rows.forEach((row) => result.rows.push(row));
+  };
+
+  if (!response.body) {
+    (await response.text()).split('\n').forEach(consume);
+    return result;
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffered += decoder.decode(value, { stream: !done });
+    const lines = buffered.split('\n');
+    buffered = lines.pop();
+    lines.forEach(consume);
+    if (done) {
+      break;
+    }
+  }
+  consume(buffered);
+  return result;
+};
+
+// Normalise any SSRM response format (rows, columnar JSON, Arrow IPC, NDJSON) to
+// { rows, rowCount } plus pivotResultFields (pivot blocks) and grandTotal when present.
+const decodeSsrmResponse = async (response) => {
+  const contentType = String(response.headers.get('content-type') || '');
+  if (contentType.startsWith(SSRM_ARROW_MIMETYPE)) {
+    if (!arrowAvailable()) {
+      throw new Error('Arrow SSRM responses require window.Arrow (apache-arrow)');
+    }
+    const header = response.headers.get(SSRM_ROW_COUNT_HEADER);
+    return {
+      ...(await decodeArrowResponse(response)),
+      rowCount: header === null ? undefined : Number(header),
+    };
+  }
+  if (contentType.startsWith(SSRM_NDJSON_MIMETYPE)) {
+    return decodeNdjsonResponse(response);
+  }
+
+  const payload = await response.json().catch(() => null);
+  if (!response.ok || !payload || typeof payload !== 'object') {
+    throw new Error(payload?.error || `HTTP ${response.status}`);
+  }
+  return normaliseSsrmPayload(payload);
+};
+
+const normaliseSsrmPayload = (payload) => {
+  if (Array.isArray(payload?.columns) && Array.isArray(payload?.values)) {
+    return { ...payload, rows: columnarToRows(payload.columns, payload.values) };
+  }
+  return payload;
+};
+
+const postSsrmJson = (url, body) => fetch(url, {
+  method: 'POST',
+  credentials: 'same-origin',
+  headers: { 'Content-Type': 'application/json' },
+  body: JSON.stringify(body),
+}).then(decodeSsrmResponse);
+
+const settleSsrmParams = (params, payload) => {
+  const result = {
+    rowData: Array.isArray(payload.rows) ? payload.rows : [],
+    rowCount: typeof payload.rowCount === 'number' ? payload.rowCount : undefined,
+  };
+  // pivot blocks: AG Grid builds the secondary columns from these fields
+  if (Array.isArray(payload.pivotResultFields)) {
+    result.pivotResultFields = payload.pivotResultFields;
+  }
+  if (payload.grandTotal && typeof payload.grandTotal === 'object') {
+    result.groupLevelInfo = { grandTotal: payload.grandTotal };
+  }
+  params.success(result);
+};
+
+// `grandTotal`: 'top' or 'bottom' (true) pins the server's grand total row to the grid.
+const pinSsrmGrandTotal = (params, payload, position) => {
+  if (!position || !payload.grandTotal || typeof params.api?.setGridOption !== 'function') {
+    return;
+  }
+  const option = position === 'top' ? 'pinnedTopRowData' : 'pinnedBottomRowData';
+  params.api.setGridOption(option, [payload.grandTotal]);
+};
+
+const failSsrmParams = (params, err) => {
+  console.error('[AgGridJS:ssrm] request failed', err);
+  params.fail();
+};
+
+// Group-level requests differing only in groupKeys can share one prefetch query.
+const ssrmPrefetchShape = (requestPayload) => {
+  const { groupKeys = [], ...rest } = requestPayload;
+  if (rest.pivotMode || rest.grandTotal || groupKeys.length >= (rest.rowGroupCols || []).length) {
+    return null;
+  }
+  return JSON.stringify(rest);
+};
+
+const isSsrmPathBelow = (path, keys) => (
+  path.length > keys.length && keys.every((key, index) => String(path[index]) === String(key))
+);
+
+const ssrmPathKey = (shape, groupKeys) => JSON.stringify([shape, (groupKeys || []).map(String)]);
+
+// `batch`: false (default) sends one POST per getRows; true or a delay in ms coalesces
+// getRows calls issued within that window into a single POST to `${endpoint}/batch/<gridId>`.
+// `prefetch`: true, or a list of groupKeys paths expected to be open (e.g. restored state),
+// answers coalesced group-level getRows calls with one POST to `${endpoint}/prefetch/<gridId>`;
+// listed paths below a requested group come back in the same query and settle later getRows
+// calls without a round trip.
+const createSsrmDatasource = ({
+  endpoint, gridId, responseFormat, batch, grandTotal, prefetch,
+}) => {
+  const format = responseFormat === 'arrow' && !arrowAvailable() ? 'columnar' : responseFormat;
+  const blockUrl = `${endpoint}/${encodeURIComponent(gridId)}`;
+  const batchUrl = `${endpoint}/batch/${encodeURIComponent(gridId)}`;
+  const prefetchUrl = `${endpoint}/prefetch/${encodeURIComponent(gridId)}`;
+  const prefetching = Boolean(prefetch);
+  const prefetchPaths = Array.isArray(prefetch) ? prefetch.filter(Array.isArray) : [];
+  const batchEnabled = batch !== false && batch !== undefined && batch !== null;
+  // prefetching coalesces getRows calls even without `batch`
+  const batchDelay = batch === true || !batchEnabled ? 0 : Number(batch);
+  const batching = (batchEnabled || prefetching) && batchDelay >= 0;
+  const grandTotalPosition = grandTotal === true ? 'bottom' : grandTotal;
+  const prefetched = new Map();
+  let pending = [];
+  let timer = null;
+
+  const settle = (params, payload) => {
+    settleSsrmParams(params, payload);
+    pinSsrmGrandTotal(params, payload, grandTotalPosition);
+  };
+
+  const sendOne = ({ params, requestPayload }) => {
+    postSsrmJson(blockUrl, requestPayload)
+      .then((payload) => settle(params, payload))
+      .catch((err) => failSsrmParams(params, err));
+  };
+
+  // One GROUPING SETS query for the group levels below every queued path (and the
+  // configured open paths beneath them); unrequested levels are kept for later getRows.
+  const sendPrefetch = (shape, items) => {
+    const depth = items[0].requestPayload.rowGroupCols.length;
+    const requested = items.map((item) => item.requestPayload.groupKeys || []);
+    const openGroups = [
+      ...requested,
+      ...prefetchPaths.filter((path) => (
+        path.length < depth && requested.some((keys) => isSsrmPathBelow(path, keys))
+      )),
+    ];
+    postSsrmJson(prefetchUrl, { ...items[0].requestPayload, groupKeys: [], openGroups })
+      .then((tree) => {
+        const nodeAt = (path) => path.reduce((node, key) => node?.children?.[String(key)], tree);
+        openGroups.slice(items.length).forEach((path) => {
+          const node = nodeAt(path);
+          if (node && ('rows' in node || 'values' in node)) {
+            prefetched.set(ssrmPathKey(shape, path), normaliseSsrmPayload(node));
+          }
+        });
+        items.forEach((item) => {
+          const node = nodeAt(item.requestPayload.groupKeys || []);
+          if (node && ('rows' in node || 'values' in node)) {
+            settle(item.params, normaliseSsrmPayload(node));
+          } else {
+            sendOne(item);
+          }
+        });
+      })
+      .catch((err) => items.forEach((item) => failSsrmParams(item.params, err)));
+  };
+
+  const flush = () => {
+    let queued = pending;
+    pending = [];
+    timer = null;
+    if (prefetching) {
+      const shapes = new Map();
+      queued.forEach((item) => {
+        const shape = ssrmPrefetchShape(item.requestPayload);
+        if (shape !== null) {
+          shapes.set(shape, [...(shapes.get(shape) || []), item]);
+        }
+      });
+      shapes.forEach((items, shape) => {
+        const deeper = prefetchPaths.some((path) => items.some(
+          (item) => isSsrmPathBelow(path, item.requestPayload.groupKeys || []),
+        ));
+        if (items.length > 1 || deeper) {
+          sendPrefetch(shape, items);
+          queued = queued.filter((item) => !items.includes(item));
+        }
+      });
+      if (!queued.length) {
+        return;
+      }
+    }
+    if (queued.length === 1) {
+      sendOne(queued[0]);
+      return;
+    }
+    postSsrmJson(batchUrl, { requests: queued.map((item) => item.requestPayload) })
+      .then((payload) => {
+        const results = Array.isArray(payload.results) ? payload.results : [];
+        queued.forEach((item, index) => {
+          const result = results[index];
+          if (!result || result.error) {
+            failSsrmParams(item.params, result?.error || 'missing batch result');
+            return;
+          }
+          settle(item.params, normaliseSsrmPayload(result));
+        });
+      })
+      .catch((err) => queued.forEach((item) => failSsrmParams(item.params, err)));
+  };
+
+  return {
+    getRows(params) {
+      const requestPayload = { ...(params.request || {}) };
+      if (format) {
+        requestPayload.responseFormat = format;
+      }
+      // the server answers the grand total alongside the first top-level group block
+      if (grandTotalPosition && !(requestPayload.groupKeys || []).length) {
+        requestPayload.grandTotal = true;
+      }
+      // column-def fields on screen, for servers that project leaf columns (`columns`)
+      const visibleColumns = displayedSsrmFields(params.api);
+      if (visibleColumns) {
+        requestPayload.visibleColumns = visibleColumns;
+      }
+      if (prefetching) {
+        // a top-level request means a fresh view: drop levels kept from earlier prefetches
+        if (!(requestPayload.groupKeys || []).length) {
+          prefetched.clear();
+        }
+        const shape = ssrmPrefetchShape(requestPayload);
+        const key = shape === null ? null : ssrmPathKey(shape, requestPayload.groupKeys);
+        if (key !== null && prefetched.has(key)) {
+          const payload = prefetched.get(key);
+          prefetched.delete(key);
+          settle(params, payload);
+          return;
+        }
+      }
+      if (!batching) {
+        sendOne({ params, requestPayload });
+        return;
+      }
+      pending.push({ params, requestPayload });
+      if (timer === null) {
+        timer = setTimeout(flush, batchDelay);
+      }
+    },
+  };
+};
+
+// Download every row matching the grid's current filter/sort (and optionally group) state.
+// A form post lets the browser stream the attachment straight to disk.
+const exportSsrmRows = (api, {
+  endpoint = '_aggrid/ssrm', gridId, format = 'csv', fileName, grouped = false,
+} = {}) => {
+  const columnState = api.getColumnState();
+  const request = {
+    filterModel: api.getFilterModel() || {},
+    sortModel: columnState
+      .filter((column) => column.sort)
+      .sort((a, b) => (a.sortIndex ?? 0) - (b.sortIndex ?? 0))
+      .map((column) => ({ colId: column.colId, sort: column.sort })),
+    columnState: columnState.filter((column) => !column.hide),
+    visibleColumns: api.getAllDisplayedColumns()
+      .map((column) => column.getColDef().field)
+      .filter(Boolean),
+  };
+  if (grouped) {
+    const toColumn = (column) => ({ id: column.getColId(), field: column.getColDef().field });
+    request.rowGroupCols = api.getRowGroupColumns().map(toColumn);
+    request.valueCols = api.getValueColumns().map((column) => ({
+      ...toColumn(column),
+      aggFunc: column.getAggFunc(),
+    }));
+    request.groupKeys = [];
+  }
+
+  const form = document.createElement('form');
+  form.method = 'POST';
+  form.action = `${String(endpoint).replace(/\/+$/, '')}/export/${encodeURIComponent(gridId)}`;
+  form.style.display = 'none';
+  const fields = { request: JSON.stringify(request), format, fileName: fileName || gridId };
+  Object.entries(fields).forEach(([name, value]) => {
+    const input = document.createElement('input');
+    input.type = 'hidden';
+    input.name = name;
+    input.value = value;
+    form.appendChild(input);
+  });
+  document.body.appendChild(form);
+  form.submit();
+  form.remove();
+};
+
+if (typeof window !== 'undefined') {
+  window.AgGridJsSsrm = window.AgGridJsSsrm || {};
+  window.AgGridJsSsrm.decodeResponse = decodeSsrmResponse;
+  window.AgGridJsSsrm.createDatasource = createSsrmDatasource;
+  window.AgGridJsSsrm.exportRows = exportSsrmRows;
+}
+
+// Text typed into a set filter's mini filter, sent as the distinct route's `search` prefix
+// when values are (re)loaded, e.g. by `refreshFilterValues()`.
+const readMiniFilter = async (api, colId) => {
+  try {
+    const filter = await api?.getColumnFilterInstance?.(colId);
+    const text = filter?.getMiniFilter?.();
+    return typeof text === 'string' ? text : '';
+  } catch (err) {
+    return '';
+  }
+};
+
 const withSsrmFilterValues = (options, gridId, configArgs) => {
   if (!gridId || !configArgs || !configArgs.ssrm || !options) {
     return options;
@@ -536,6 +1016,7 @@ const withSsrmFilterValues = (options, gridId, configArgs) => {
   const distinctEndpointRaw = ssrmArgs.distinctEndpoint || `${baseEndpointRaw}/distinct`;
   const baseEndpoint = String(baseEndpointRaw).replace(/\/$/, '');
   const distinctEndpoint = String(distinctEndpointRaw).replace(/\/$/, '');
+  const filterAware = Boolean(ssrmArgs.distinctFilterAware);
 
   const patchColumns = (cols) => {
     if (!Array.isArray(cols)) {
@@ -558,6 +1039,9 @@ const withSsrmFilterValues = (options, gridId, configArgs) => {
           (typeof params.values === 'object' && params.values !== null);
 
         if (!hasCustom) {
+          if (filterAware && params.refreshValuesOnOpen === undefined) {
+            params.refreshValuesOnOpen = true;
+          }
           params.values = async (paramsObj) => {
             const colId = paramsObj?.column?.getColId?.() || next.field;
             if (!colId) {
@@ -565,8 +1049,32 @@ const withSsrmFilterValues = (options, gridId, configArgs) => {
               return;
             }
             const url = `${distinctEndpoint}/${encodeURIComponent(gridId)}/${encodeURIComponent(colId)}`;
+            const query = {};
+            if (ssrmArgs.distinctLimit) {
+              query.limit = ssrmArgs.distinctLimit;
+            }
             try {
-              const response = await fetch(url, { credentials: 'same-origin' });
+              const search = await readMiniFilter(paramsObj?.api, colId);
+              if (search) {
+                query.search = search;
+              }
+              // GET keeps the browser's ETag revalidation; only a filter model needs a body
+              let request = { method: 'GET', credentials: 'same-origin' };
+              let target = url;
+              if (filterAware) {
+                const filterModel = { ...(paramsObj?.api?.getFilterModel?.() || {}) };
+                delete filterModel[colId];
+                query.filterModel = filterModel;
+                request = {
+                  method: 'POST',
+                  credentials: 'same-origin',
+                  headers: { 'Content-Type': 'application/json' },
+                  body: JSON.stringify(query),
+                };
+              } else if (Object.keys(query).length) {
+                target = `${url}?${new URLSearchParams(query)}`;
+              }
+              const response = await fetch(target, request);
               const ok =
                 response.ok &&
                 String(response.headers.get('content-type') || '').startsWith('application/json');
@@ -587,6 +1095,29 @@ const withSsrmFilterValues = (options, gridId, configArgs) => {
   };
 
   const patched = { ...options };
+  if (options.rowModelType === 'serverSide' && !options.serverSideDatasource) {
+    patched.serverSideDatasource = createSsrmDatasource({
+      endpoint: baseEndpoint,
+      gridId,
+      responseFormat: ssrmArgs.responseFormat,
+      batch: ssrmArgs.batch,
+      grandTotal: ssrmArgs.grandTotal,
+      prefetch: ssrmArgs.prefetch,
+    });
+    if (!options.getChildCount) {
+      // group rows carry their size as `childCount` (see the `child_count` option)
+      patched.getChildCount = (data) => data?.childCount;
+    }
+    if (ssrmArgs.columns) {
+      // the server projects leaf queries; fires on columnVisible changes as well as moves
+      patched.onDisplayedColumnsChanged = (event) => {
+        if (typeof options.onDisplayedColumnsChanged === 'function') {
+          options.onDisplayedColumnsChanged(event);
+        }
+        refreshOnShownSsrmColumns(gridId, event);
+      };
+    }
+  }
   if (Array.isArray(options.columnDefs)) {
     patched.columnDefs = patchColumns(options.columnDefs);
   }
@@ -599,6 +1130,7 @@ const withSsrmFilterValues = (options, gridId, configArgs) => {
 
   if (patched.serverSideDatasource && typeof patched.serverSideDatasource.getRows === 'function') {
     const originalGetRows = patched.serverSideDatasource.getRows;
+    const reuseRowCount = Boolean(ssrmArgs.reuseRowCount);
     patched.serverSideDatasource = {
       ...patched.serverSideDatasource,
       getRows: (params, ...rest) => {
@@ -606,7 +1138,30 @@ const withSsrmFilterValues = (options, gridId, configArgs) => {
         if (!requestPayload.gridId) {
           requestPayload.gridId = gridId;
         }
-        const nextParams = { ...params, request: requestPayload };
+        if (!requestPayload.ssrmClientId) {
+          requestPayload.ssrmClientId = ssrmClientIdFor(gridId);
+        }
+        if (!reuseRowCount || typeof params?.success !== 'function') {
+          const nextParams = { ...params, request: requestPayload };
+          return originalGetRows(nextParams, ...rest);
+        }
+
+        // Let the server skip its COUNT(*) once this store's size is known.
+        const storeKey = ssrmStoreKey(requestPayload);
+        const knownCounts = knownRowCountsFor(gridId);
+        if (knownCounts.has(storeKey) && typeof requestPayload.knownRowCount !== 'number') {
+          requestPayload.knownRowCount = knownCounts.get(storeKey);
+        }
+        const nextParams = {
+          ...params,
+          request: requestPayload,
+          success: (result, ...successRest) => {
+            if (typeof result?.rowCount === 'number') {
+              rememberRowCount(knownCounts, storeKey, result.rowCount);
+            }
+            return params.success(result, ...successRest);
+          },
+        };
         return originalGetRows(nextParams, ...rest);
       },
     };
@@ -749,6 +1304,11 @@ const AgGridJS = (props) => {
     setProps,
   }));
 
+  // a re-resolved config brings a new datasource whose stores start empty
+  useEffect(() => () => {
+    ssrmKnownRowCounts.delete(id);
+  }, [resolvedConfig, id]);
+
   useEffect(() => {
     awaitingRowDataConfigRef.current = !(Array.isArray(rowDataProp) && rowDataProp.length > 0);
     let cancelled = false;
@@ -918,6 +1478,9 @@ const AgGridJS = (props) => {
     if (apiRef.current && id) {
       setApiInstance(id, apiRef.current);
     }
+    if (apiRef.current && id && configArgs?.ssrm) {
+      forgetSsrmRowCountsOnRefresh(apiRef.current, id);
+    }
     if (!setProps || !apiRef.current) {
       return;
     }
@@ -0,0 +1,1299 @@
+import itertools
+import json
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+import flask
+import pytest
+
+duckdb = pytest.importorskip("duckdb")
+
+from dash_aggrid_js import ssrm  # noqa: E402
+
+_GRID_IDS = itertools.count()
+
+
+@pytest.fixture
+def duckdb_file(tmp_path):
+    path = tmp_path / "orders.duckdb"
+    with duckdb.connect(str(path)) as con:
+        con.execute(
+            """
+            CREATE TABLE orders AS
+            SELECT
+                i AS order_id,
+                ['North', 'South', 'East', 'West'][i % 4 + 1] AS region,
+                ['Widget', 'Gadget', 'Gizmo'][i % 3 + 1] AS product,
+                i % 7 AS units,
+                (i % 7) * 12.5 AS revenue
+            FROM range(100) AS r(i)
+            """
+        )
+    return path
+
+
+@pytest.fixture
+def ssrm_client(duckdb_file):
+    """Register a fresh SSRM grid against a bare Flask server and return a test client."""
+    app = SimpleNamespace(server=flask.Flask(__name__))
+    grid_id = f"orders-grid-{next(_GRID_IDS)}"
+
+    def register(**config):
+        config.setdefault("duckdb_path", str(duckdb_file))
+        config.setdefault("table", "orders")
+        endpoint = ssrm.register_duckdb_ssrm(grid_id, config)
+        base = ssrm._normalise_route_base(endpoint)
+        ssrm._attach_routes_to_app(app, base, ssrm._views_for_base(base))
+        return grid_id
+
+    yield app.server.test_client(), register
+    ssrm._SSRM_REGISTRY.pop(grid_id, None)
+    ssrm._APP_ROUTE_CACHE.pop(id(app), None)
+
+
+def test_ssrm_route_serves_leaf_block(ssrm_client):
+    """Leaf requests return the requested block plus the filtered row count."""
+    client, register = ssrm_client
+    grid_id = register()
+
+    response = client.post(
+        f"/_aggrid/ssrm/{grid_id}",
+        json={
+            "startRow": 0,
+            "endRow": 10,
+            "filterModel": {"region": {"filterType": "set", "values": ["North"]}},
+            "sortModel": [{"colId": "order_id", "sort": "asc"}],
+            "columnState": [{"colId": "order_id"}],
+        },
+    )
+
+    payload = response.get_json()
+    assert response.status_code == 200
+    assert payload["rowCount"] == 25
+    assert [row["order_id"] for row in payload["rows"]] == list(range(0, 40, 4))
+
+
+def test_connection_pool_reuses_cursors(duckdb_file):
+    """Sequential checkouts reuse the same cursor instead of reconnecting."""
+    pool = ssrm._ConnectionPool(duckdb_file, max_size=2)
+    with pool.connection() as first:
+        assert first.sql("SELECT COUNT(*) FROM orders").fetchone()[0] == 100
+    with pool.connection() as second:
+        assert second is first
+    pool.close()
+
+
+def test_connection_pool_reopens_replaced_file(duckdb_file):
+    """Replacing the DuckDB file is picked up by the next checkout, even under load."""
+    pool = ssrm._ConnectionPool(duckdb_file)
+    with pool.connection() as busy:
+        assert busy.sql("SELECT COUNT(*) FROM orders").fetchone()[0] == 100
+
+        replacement = duckdb_file.with_name("replacement.duckdb")
+        with duckdb.connect(str(replacement)) as con:
+            con.execute("CREATE TABLE orders AS SELECT * FROM range(5) AS r(order_id)")
+        replacement.replace(duckdb_file)
+
+        with pool.connection() as con:
+            assert con.sql("SELECT COUNT(*) FROM orders").fetchone()[0] == 5
+        # the cursor already running keeps reading the file it started on
+        assert busy.sql("SELECT COUNT(*) FROM orders").fetchone()[0] == 100
+    assert not pool._owners
+    pool.close()
+
+
+def test_connection_pool_times_out_and_releases_the_file(duckdb_file):
+    """A full pool fails after its timeout; an idle file-backed pool holds no lock."""
+    pool = ssrm._ConnectionPool(duckdb_file, max_size=1, idle_timeout=0, timeout=0.05)
+    with pool.connection():
+        with pytest.raises(ssrm._PoolTimeout):
+            with pool.connection():
+                pass
+    assert pool._parent is None
+    with duckdb.connect(str(duckdb_file)) as writer:
+        writer.execute("INSERT INTO orders (order_id) VALUES (1000)")
+    with pool.connection() as con:
+        assert con.sql("SELECT COUNT(*) FROM orders").fetchone()[0] == 101
+    pool.close()
+
+
+@pytest.mark.parametrize("file_name", ["my-data.duckdb", "2024.duckdb"])
+def test_grids_serve_files_whose_stem_is_not_an_identifier(ssrm_client, duckdb_file, file_name):
+    """Pooled files are attached under a fixed alias, not their file name."""
+    path = duckdb_file.rename(duckdb_file.with_name(file_name))
+    client, register = ssrm_client
+    grid_id = register(duckdb_path=str(path))
+    assert ssrm._SSRM_REGISTRY[grid_id]["schema"][1]["order_id"] == "BIGINT"
+
+    response = client.post(f"/_aggrid/ssrm/{grid_id}", json={"startRow": 0, "endRow": 5})
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()["rowCount"] == 100
+    assert client.get(f"/_aggrid/ssrm/distinct/{grid_id}/region").status_code == 200
+
+
+def test_sequential_requests_reuse_one_parent(ssrm_client, monkeypatch):
+    """By default the attached file stays warm between requests."""
+    opened = []
+    open_parent = ssrm._ConnectionPool._open_parent
+
+    def counting_open_parent(pool):
+        opened.append(pool)
+        return open_parent(pool)
+
+    monkeypatch.setattr(ssrm._ConnectionPool, "_open_parent", counting_open_parent)
+    client, register = ssrm_client
+    grid_id = register()
+    for start in range(0, 100, 5):
+        body = {"startRow": start, "endRow": start + 5, "sortModel": [{"colId": "order_id", "sort": "asc"}]}
+        assert client.post(f"/_aggrid/ssrm/{grid_id}", json=body).status_code == 200
+    assert len(opened) == 1
+
+
+@pytest.mark.parametrize("count_mode", ["window", "query"])
+def test_count_modes_agree_for_group_rows(ssrm_client, count_mode):
+    """Window and separate-query counting report the same number of groups."""
+    client, register = ssrm_client
+    grid_id = register(count=count_mode)
+
+    response = client.post(
+        f"/_aggrid/ssrm/{grid_id}",
+        json={
+            "startRow": 0,
+            "endRow": 2,
+            "rowGroupCols": [{"field": "region"}],
+            "valueCols": [{"field": "units", "aggFunc": "sum"}],
+            "groupKeys": [],
+            "sortModel": [{"colId": "region", "sort": "asc"}],
+        },
+    )
+
+    payload = response.get_json()
+    assert [row["region"] for row in payload["rows"]] == ["East", "North"]
+    assert set(payload["rows"][0]) == {"region", "units", "childCount"}
+    assert payload["rowCount"] == 4
+
+
+def test_row_count_skipped_when_known_or_inferable(ssrm_client):
+    """No count is needed for short pages or when the client already knows it."""
+    client, register = ssrm_client
+    grid_id = register(count="none", count_cache_ttl=0)
+
+    short_page = client.post(f"/_aggrid/ssrm/{grid_id}", json={"startRow": 90, "endRow": 120})
+    assert short_page.get_json()["rowCount"] == 100
+
+    full_page = client.post(f"/_aggrid/ssrm/{grid_id}", json={"startRow": 0, "endRow": 10})
+    assert full_page.get_json()["rowCount"] is None
+
+    known = client.post(
+        f"/_aggrid/ssrm/{grid_id}",
+        json={"startRow": 0, "endRow": 10, "knownRowCount": 100},
+    )
+    assert known.get_json()["rowCount"] == 100
+
+
+def test_row_count_cache_ignores_paging_and_sort(ssrm_client, monkeypatch):
+    """Scrolling or re-sorting the same slice reuses the cached total."""
+    client, register = ssrm_client
+    grid_id = register(count="query")
+    counts = []
+    original = ssrm._execute_count
+    monkeypatch.setattr(
+        ssrm,
+        "_execute_count",
+        lambda con, sql, params=None: counts.append(sql) or original(con, sql, params),
+    )
+
+    request = {"filterModel": {"units": {"filterType": "number", "type": "greaterThan", "filter": 2}}}
+    for start, sort in [(0, "asc"), (10, "asc"), (0, "desc")]:
+        response = client.post(
+            f"/_aggrid/ssrm/{grid_id}",
+            json={
+                **request,
+                "startRow": start,
+                "endRow": start + 10,
+                "sortModel": [{"colId": "units", "sort": sort}],
+            },
+        )
+        assert response.get_json()["rowCount"] == 56
+
+    assert len(counts) == 1
+
+
+def test_row_count_cache_invalidated_by_version_token(ssrm_client, monkeypatch):
+    """Changing the grid's version token forces a fresh count."""
+    client, register = ssrm_client
+    token = {"value": 1}
+    grid_id = register(count="query", version=lambda: token["value"])
+    counts = []
+    original = ssrm._execute_count
+    monkeypatch.setattr(
+        ssrm,
+        "_execute_count",
+        lambda con, sql, params=None: counts.append(sql) or original(con, sql, params),
+    )
+
+    client.post(f"/_aggrid/ssrm/{grid_id}", json={"startRow": 0, "endRow": 10})
+    client.post(f"/_aggrid/ssrm/{grid_id}", json={"startRow": 0, "endRow": 10})
+    token["value"] = 2
+    client.post(f"/_aggrid/ssrm/{grid_id}", json={"startRow": 0, "endRow": 10})
+
+    assert len(counts) == 2
+
+
+def test_columnar_response_format(ssrm_client):
+    """Columnar responses send column names once and one value array per column."""
+    client, register = ssrm_client
+    grid_id = register(response_format="columnar")
+
+    response = client.post(
+        f"/_aggrid/ssrm/{grid_id}",
+        json={
+            "startRow": 0,
+            "endRow": 3,
+            "sortModel": [{"colId": "order_id", "sort": "asc"}],
+            "columnState": [{"colId": "order_id"}],
+        },
+    )
+
+    payload = response.get_json()
+    assert payload["columns"] == ["order_id", "region", "product", "units", "revenue"]
+    assert payload["values"][0] == [0, 1, 2]
+    assert payload["rowCount"] == 100
+
+
+def test_arrow_response_format(ssrm_client):
+    """Arrow responses carry an IPC stream with the row count in a header."""
+    pyarrow = pytest.importorskip("pyarrow")
+    client, register = ssrm_client
+    grid_id = register()
+
+    response = client.post(
+        f"/_aggrid/ssrm/{grid_id}",
+        json={"startRow": 0, "endRow": 5, "responseFormat": "arrow"},
+    )
+
+    assert response.mimetype == "application/vnd.apache.arrow.stream"
+    assert response.headers["X-AgGrid-Row-Count"] == "100"
+    table = pyarrow.ipc.open_stream(response.data).read_all()
+    assert table.num_rows == 5
+    assert "__ssrm_row_count" not in table.column_names
+
+
+def test_sql_for_parameterized_binds_request_values():
+    """Parameterized SQL keeps values out of the statement text."""
+    request = {
+        "startRow": 0,
+        "endRow": 50,
+        "filterModel": {
+            "region": {"filterType": "set", "values": ["North", "O'Brien"]},
+            "units": {"filterType": "number", "type": "inRange", "filter": 1, "filterTo": 5},
+        },
+    }
+
+    sql, params = ssrm.sql_for(request, "orders", parameterized=True)
+
+    assert "O''Brien" not in sql
+    assert '"region" IN (SELECT UNNEST(?))' in sql
+    assert '"units" BETWEEN ? AND ?' in sql
+    assert "LIMIT ? OFFSET ?" in sql
+    assert params == [["North", "O'Brien"], 1, 5, 50, 0]
+
+    other_sql, _ = ssrm.sql_for(
+        {**request, "startRow": 50, "endRow": 100},
+        "orders",
+        parameterized=True,
+    )
+    assert other_sql == sql
+
+
+def test_sql_for_reuses_compiled_clauses_per_request_shape():
+    """Requests of the same shape share compiled clauses; values are bound per call."""
+    request = {
+        "rowGroupCols": [{"field": "region"}, {"field": "product"}],
+        "valueCols": [{"field": "revenue", "aggFunc": "sum"}],
+        "groupKeys": ["North"],
+        "sortModel": [{"colId": "revenue", "sort": "desc"}],
+        "columnState": [{"colId": "region"}, {"colId": "revenue", "width": 120}],
+    }
+    before = ssrm.ssrm_cache_stats()["sql_template"]
+
+    sql, params = ssrm.sql_for(request, "orders_shape", parameterized=True)
+    # widths and group key values do not change the shape
+    other_sql, other_params = ssrm.sql_for(
+        {**request, "groupKeys": ["South"], "columnState": [{"colId": "region"}, {"colId": "revenue"}]},
+        "orders_shape",
+        parameterized=True,
+    )
+    stats = ssrm.ssrm_cache_stats()["sql_template"]
+    assert other_sql == sql
+    assert (params, other_params) == (["North"], ["South"])
+    assert stats["misses"] - before["misses"] == 1
+    assert stats["hits"] - before["hits"] == 1
+
+    resorted = ssrm.sql_for(
+        {**request, "sortModel": [{"colId": "revenue", "sort": "asc"}]}, "orders_shape"
+    )
+    assert 'ORDER BY "revenue" ASC' in resorted
+    assert "\n\n" not in resorted
+    assert ssrm.quote_identifier("region") == '"region"'
+    assert ssrm.quote_identifier.cache_info().hits > 0
+
+
+def test_leaf_queries_project_visible_columns(ssrm_client):
+    """Leaf blocks select the visible columns plus row id, sort and group columns."""
+    client, register = ssrm_client
+    grid_id = register(columns=["order_id", "region", "product", "units"], row_id="order_id")
+    body = {
+        "startRow": 0,
+        "endRow": 5,
+        "rowGroupCols": [{"field": "region"}],
+        "groupKeys": ["North"],
+        "sortModel": [{"colId": "revenue", "sort": "desc"}],
+        "columnState": [{"colId": "revenue"}],
+        # revenue is not allowed but sorted on; the auto group column is skipped
+        "visibleColumns": ["product", "revenue", "ag-Grid-AutoColumn"],
+    }
+
+    rows = client.post(f"/_aggrid/ssrm/{grid_id}", json=body).get_json()["rows"]
+    assert set(rows[0]) == {"order_id", "product", "region", "revenue"}
+
+    # group levels keep their aggregate projection
+    groups = client.post(
+        f"/_aggrid/ssrm/{grid_id}", json={**body, "groupKeys": [], "sortModel": []}
+    ).get_json()["rows"]
+    assert set(groups[0]) == {"region", "childCount"}
+
+    request = {"columnState": [{"colId": "units"}, {"colId": "revenue", "hide": True}]}
+    columns = ssrm._leaf_columns("visible", None, request)
+    sql = ssrm.sql_for(request, "orders", columns=columns, keyset="order_id")
+    assert sql.startswith('SELECT "units", "order_id"\nFROM orders')
+
+
+def test_schema_aware_sql_binds_native_types(ssrm_client):
+    """The DESCRIBE-d schema drives casts, value coercion, leaf sorts and aggFunc checks."""
+    schema = {"order_id": "BIGINT", "region": "VARCHAR", "units": "INTEGER", "shipped": "DATE"}
+    grouped = {
+        "rowGroupCols": [{"field": "region"}],
+        "valueCols": [{"field": "units", "aggFunc": "sum"}],
+        "groupKeys": [],
+    }
+    assert 'SUM(try_cast("units" AS DOUBLE))' in ssrm.sql_for(grouped, "orders")
+    assert 'SUM("units") AS "units"' in ssrm.sql_for(grouped, "orders", schema=schema)
+    with pytest.raises(ValueError, match="cannot aggregate DATE"):
+        ssrm.sql_for(
+            {**grouped, "valueCols": [{"field": "shipped", "aggFunc": "avg"}]}, "orders", schema=schema
+        )
+    with pytest.raises(ValueError, match="Unknown value column"):
+        ssrm.sql_for({**grouped, "valueCols": [{"field": "margin"}]}, "orders", schema=schema)
+    with pytest.raises(ValueError, match="Unsupported aggFunc"):
+        ssrm.sql_for({**grouped, "valueCols": [{"field": "units", "aggFunc": "version() --"}]}, "orders")
+    assert 'AVG("units")' in ssrm.sql_for(
+        {**grouped, "valueCols": [{"field": "units", "aggFunc": "average"}]}, "orders", schema=schema
+    )
+
+    _, params = ssrm.sql_for(
+        {
+            "filterModel": {
+                "units": {"filterType": "set", "values": ["3", "5"]},
+                "order_id": {"filterType": "text", "type": "startsWith", "filter": "1"},
+            }
+        },
+        "orders",
+        parameterized=True,
+        schema=schema,
+    )
+    assert params[0] == [3, 5]
+
+    client, register = ssrm_client
+    grid_id = register(table="(SELECT *, DATE '2024-01-01' + CAST(units AS INTEGER) AS shipped FROM orders) AS o")
+    introspected = ssrm._SSRM_REGISTRY[grid_id]["schema"][1]
+    assert introspected["shipped"] == "DATE"
+    # template keys use the token computed at introspection, not the schema's items
+    dialect = ssrm.DuckDBDialect()
+    key = ssrm._sql_template_key(grouped, "orders", dialect, False, None, False, schema=introspected)
+    assert introspected.token in key
+    key = ssrm._sql_template_key(grouped, "orders", dialect, False, None, False, schema=schema)
+    assert tuple(schema.items()) in key
+    response = client.post(
+        f"/_aggrid/ssrm/{grid_id}",
+        json={
+            "startRow": 0,
+            "endRow": 3,
+            "filterModel": {
+                "units": {"filterType": "set", "values": ["6"]},
+                "order_id": {"filterType": "text", "type": "startsWith", "filter": "2"},
+            },
+            # no columnState: leaf sorts are validated against the schema
+            "sortModel": [{"colId": "order_id", "sort": "desc"}],
+        },
+    )
+    payload = response.get_json()
+    assert response.status_code == 200, payload
+    assert [row["order_id"] for row in payload["rows"]] == [27, 20]
+
+    failed = client.post(
+        f"/_aggrid/ssrm/{grid_id}",
+        json={**grouped, "valueCols": [{"field": "shipped", "aggFunc": "sum"}]},
+    )
+    assert failed.status_code == 500
+    assert "cannot aggregate DATE" in failed.get_json()["error"]
+
+
+def test_pivot_mode_returns_conditional_aggregates(ssrm_client):
+    """Pivot blocks aggregate per pivot key and report pivotResultFields; keys are cached."""
+    client, register = ssrm_client
+    grid_id = register(parameterized=True)
+    body = {
+        "startRow": 0,
+        "endRow": 10,
+        "pivotMode": True,
+        "pivotCols": [{"id": "product", "field": "product"}],
+        "rowGroupCols": [{"id": "region", "field": "region"}],
+        "valueCols": [{"id": "units", "field": "units", "aggFunc": "sum"}],
+        "groupKeys": [],
+        "sortModel": [{"colId": "Widget_units", "sort": "desc"}],
+        "filterModel": {"product": {"filterType": "set", "values": ["Gadget", "Widget"]}},
+    }
+    before = ssrm.ssrm_cache_stats()["pivot"]
+
+    response = client.post(f"/_aggrid/ssrm/{grid_id}", json=body)
+    payload = response.get_json()
+    assert response.status_code == 200, payload
+    assert payload["pivotResultFields"] == ["Gadget_units", "Widget_units"]
+    assert payload["rowCount"] == 4
+    con = duckdb.connect()
+    expected = dict(
+        con.execute(
+            "SELECT ['North','South','East','West'][i % 4 + 1], SUM(i % 7) FILTER (WHERE i % 3 = 0) "
+            "FROM range(100) t(i) GROUP BY 1"
+        ).fetchall()
+    )
+    assert {row["region"]: row["Widget_units"] for row in payload["rows"]} == expected
+    assert [row["Widget_units"] for row in payload["rows"]] == sorted(expected.values(), reverse=True)
+
+    totals = client.post(
+        f"/_aggrid/ssrm/batch/{grid_id}",
+        json={"requests": [{**body, "rowGroupCols": [], "responseFormat": "columnar"}]},
+    ).get_json()["results"][0]
+    assert totals["columns"] == ["Gadget_units", "Widget_units"]
+    assert totals["values"] == [[sum(i % 7 for i in range(100) if i % 3 == 1)], [sum(expected.values())]]
+    assert totals["pivotResultFields"] == ["Gadget_units", "Widget_units"]
+
+    stats = ssrm.ssrm_cache_stats()["pivot"]
+    assert stats["misses"] - before["misses"] == 1
+    assert stats["hits"] - before["hits"] == 1
+
+    pyarrow = pytest.importorskip("pyarrow")
+    arrow = client.post(f"/_aggrid/ssrm/{grid_id}", json={**body, "responseFormat": "arrow"})
+    table = pyarrow.ipc.open_stream(arrow.get_data()).read_all()
+    assert json.loads(table.schema.metadata[b"pivotResultFields"]) == ["Gadget_units", "Widget_units"]
+
+
+def test_pivot_batch_resolves_keys_on_the_held_connection(ssrm_client):
+    """A one-connection pool answers a pivot batch without a nested checkout."""
+    client, register = ssrm_client
+    grid_id = register(pool_size=1, pool_timeout=1, pivot_cache_ttl=0)
+    body = {
+        "startRow": 0,
+        "endRow": 10,
+        "pivotMode": True,
+        "pivotCols": [{"id": "product", "field": "product"}],
+        "rowGroupCols": [{"id": "region", "field": "region"}],
+        "valueCols": [{"id": "units", "field": "units", "aggFunc": "sum"}],
+        "groupKeys": [],
+    }
+
+    started = time.perf_counter()
+    response = client.post(f"/_aggrid/ssrm/batch/{grid_id}", json={"requests": [body]})
+    result = response.get_json()["results"][0]
+    assert "error" not in result, result
+    assert result["pivotResultFields"] == ["Gadget_units", "Gizmo_units", "Widget_units"]
+    assert time.perf_counter() - started < 1
+
+
+def test_group_child_counts_and_grand_total_share_one_scan(ssrm_client):
+    """Group rows carry childCount; the first root block also returns the grand total."""
+    client, register = ssrm_client
+    grid_id = register(parameterized=True)
+    body = {
+        "startRow": 0,
+        "endRow": 3,
+        "rowGroupCols": [{"field": "region"}],
+        "valueCols": [{"field": "units", "aggFunc": "sum"}],
+        "groupKeys": [],
+        "sortModel": [{"colId": "region", "sort": "asc"}],
+        "grandTotal": True,
+    }
+
+    first = client.post(f"/_aggrid/ssrm/{grid_id}", json=body).get_json()
+    assert [(row["region"], row["childCount"]) for row in first["rows"]] == [
+        ("East", 25),
+        ("North", 25),
+        ("South", 25),
+    ]
+    assert first["rowCount"] == 4
+    assert first["grandTotal"]["units"] == sum(i % 7 for i in range(100))
+    assert first["grandTotal"]["childCount"] == 100
+
+    rest = client.post(
+        f"/_aggrid/ssrm/{grid_id}", json={**body, "startRow": 3, "endRow": 6}
+    ).get_json()
+    assert [row["region"] for row in rest["rows"]] == ["West"]
+    assert "grandTotal" not in rest
+
+    columnar = client.post(
+        f"/_aggrid/ssrm/{grid_id}", json={**body, "responseFormat": "columnar"}
+    ).get_json()
+    assert columnar["values"][0] == ["East", "North", "South"]
+    assert columnar["grandTotal"] == first["grandTotal"]
+
+    nested = client.post(
+        f"/_aggrid/ssrm/{grid_id}", json={**body, "groupKeys": ["East"], "rowGroupCols": []}
+    ).get_json()
+    assert "grandTotal" not in nested
+
+
+def test_prefetch_answers_open_group_levels_in_one_query(ssrm_client):
+    """The prefetch route nests the blocks the block route returns for each open group."""
+    client, register = ssrm_client
+    grid_id = register(parameterized=True)
+    body = {
+        "startRow": 0,
+        "endRow": 2,
+        "rowGroupCols": [{"field": "region"}, {"field": "product"}, {"field": "units"}],
+        "valueCols": [{"field": "revenue", "aggFunc": "sum"}],
+        "filterModel": {"units": {"filterType": "number", "type": "greaterThan", "filter": 0}},
+        "sortModel": [{"colId": "revenue", "sort": "desc"}],
+    }
+    open_groups = [[], ["North"], ["North", "Widget"], ["South"]]
+
+    response = client.post(
+        f"/_aggrid/ssrm/prefetch/{grid_id}", json={**body, "openGroups": open_groups}
+    )
+    assert response.status_code == 200
+    tree = response.get_json()
+
+    for path in open_groups:
+        node = tree
+        for key in path:
+            node = node["children"][key]
+        single = client.post(
+            f"/_aggrid/ssrm/{grid_id}", json={**body, "groupKeys": path}
+        ).get_json()
+        assert node["rows"] == single["rows"]
+        assert node["rowCount"] == single["rowCount"]
+    assert set(tree["children"]) == {"North", "South"}
+
+    columnar = client.post(
+        f"/_aggrid/ssrm/prefetch/{grid_id}",
+        json={**body, "openGroups": [["East"]], "responseFormat": "columnar"},
+    ).get_json()
+    assert columnar["children"]["East"]["columns"] == ["product", "revenue", "childCount"]
+    assert "rows" not in columnar
+
+    past_end = client.post(
+        f"/_aggrid/ssrm/prefetch/{grid_id}",
+        json={**body, "startRow": 4, "endRow": 6, "openGroups": open_groups[:2]},
+    ).get_json()
+    assert (past_end["rows"], past_end["rowCount"]) == ([], 4)
+    assert past_end["children"]["North"]["rowCount"] == 3
+
+    # a prefetch does not supersede the sibling block requests it accompanies
+    fingerprint = ssrm._request_fingerprint
+    ignored = ssrm._GENERATION_IGNORED_KEYS
+    assert fingerprint({**body, "groupKeys": ["East"]}, ignored) == fingerprint(
+        {**body, "groupKeys": [], "openGroups": open_groups}, ignored
+    )
+
+    leaf = client.post(
+        f"/_aggrid/ssrm/prefetch/{grid_id}",
+        json={**body, "openGroups": [["North", "Widget", 3]]},
+    )
+    assert leaf.status_code == 500
+    missing = client.post(f"/_aggrid/ssrm/prefetch/{grid_id}", json=body)
+    assert missing.status_code == 400
+
+
+def test_parameterized_route_matches_inline_results(ssrm_client):
+    """The serving path executes bound statements with the same results."""
+    client, register = ssrm_client
+    grid_id = register(parameterized=True)
+
+    response = client.post(
+        f"/_aggrid/ssrm/{grid_id}",
+        json={
+            "startRow": 0,
+            "endRow": 5,
+            "filterModel": {"product": {"filterType": "text", "type": "startsWith", "filter": "gad"}},
+            "sortModel": [{"colId": "order_id", "sort": "desc"}],
+            "columnState": [{"colId": "order_id"}],
+        },
+    )
+
+    payload = response.get_json()
+    assert [row["order_id"] for row in payload["rows"]] == [97, 94, 91, 88, 85]
+    assert payload["rowCount"] == 33
+
+
+def test_sql_for_keyset_seek_replaces_offset():
+    """Seeking past the previous block's last sort key drops OFFSET entirely."""
+    request = {
+        "startRow": 100,
+        "endRow": 200,
+        "sortModel": [{"colId": "region", "sort": "desc"}],
+        "columnState": [{"colId": "region"}],
+    }
+
+    sql = ssrm.sql_for(request, "orders", keyset="order_id", seek=["North", 42])
+
+    assert 'ORDER BY "region" DESC NULLS LAST, "order_id" ASC NULLS LAST' in sql
+    assert "OFFSET" not in sql
+    assert "LIMIT 100" in sql
+    assert '("region" < \'North\' OR "region" IS NULL)' in sql
+    assert '"region" IS NOT DISTINCT FROM \'North\' AND ("order_id" > 42 OR "order_id" IS NULL)' in sql
+
+
+def test_keyset_pagination_matches_offset_pages(ssrm_client):
+    """Sequential keyset blocks return the same rows as OFFSET paging."""
+    client, register = ssrm_client
+    grid_id = register(pagination="keyset", row_id="order_id")
+    request = {
+        "sortModel": [{"colId": "units", "sort": "desc"}],
+        "columnState": [{"colId": "units"}],
+    }
+
+    served = []
+    for start in range(0, 100, 30):
+        response = client.post(
+            f"/_aggrid/ssrm/{grid_id}",
+            json={**request, "startRow": start, "endRow": start + 30},
+        )
+        payload = response.get_json()
+        assert payload["rowCount"] == 100
+        served.extend((row["units"], row["order_id"]) for row in payload["rows"])
+
+    assert served == sorted(served, key=lambda pair: (-pair[0], pair[1]))
+    assert len(set(served)) == 100
+
+
+def test_executor_interrupts_superseded_client_queries(duckdb_file):
+    """A newer request state from the same client interrupts the older query."""
+    entry = {
+        "grid_id": "executor-grid",
+        "max_concurrency": 2,
+        "backend": ssrm.DuckDBBackend(duckdb_file),
+    }
+    executor = ssrm._QueryExecutor(max_workers=2)
+    started = threading.Event()
+    outcome = {}
+
+    def slow_query(con):
+        started.set()
+        return con.sql("SELECT COUNT(*) FROM range(10000000000)").fetchall()
+
+    def run_old():
+        try:
+            executor.run(entry, {"ssrmClientId": "tab-1", "filterModel": {}}, slow_query)
+        except ssrm._SupersededQuery as err:
+            outcome["old"] = err
+
+    old = threading.Thread(target=run_old)
+    old.start()
+    assert started.wait(5)
+    time.sleep(0.2)
+
+    newer = {"ssrmClientId": "tab-1", "filterModel": {"units": {"filterType": "number", "filter": 1}}}
+    assert executor.run(entry, newer, lambda con: con.sql("SELECT 42").fetchone()[0]) == 42
+    old.join(10)
+
+    assert isinstance(outcome.get("old"), ssrm._SupersededQuery)
+    stats = executor.stats()
+    assert stats["superseded"] == 1
+    assert stats["completed"] == 1
+    assert stats["queued"] == stats["running"] == 0
+    entry["backend"].close()
+
+
+def test_executor_is_sized_by_the_first_grid(monkeypatch, capsys):
+    """The executor is process-wide; a later, different max_workers is reported."""
+    monkeypatch.setattr(ssrm, "_EXECUTOR", None)
+    executor = ssrm._executor_for_config({"max_workers": 2})
+    assert ssrm._executor_for_config(True) is executor
+    assert ssrm._executor_for_config({"max_workers": 2}) is executor
+    assert "ignored" not in capsys.readouterr().out
+    assert ssrm._executor_for_config({"max_workers": 6}) is executor
+    assert executor.max_workers == 2
+    assert "max_workers=6 of later grids is ignored" in capsys.readouterr().out
+
+
+def test_batch_route_answers_each_request_in_order(ssrm_client):
+    """Batch responses line up with the submitted requests, errors included."""
+    client, register = ssrm_client
+    grid_id = register()
+    group_request = {
+        "rowGroupCols": [{"field": "region"}, {"field": "product"}],
+        "valueCols": [{"field": "units", "aggFunc": "sum"}],
+        "startRow": 0,
+        "endRow": 10,
+    }
+
+    response = client.post(
+        f"/_aggrid/ssrm/batch/{grid_id}",
+        json={
+            "requests": [
+                {**group_request, "groupKeys": ["North"]},
+                {**group_request, "groupKeys": ["South"]},
+                {"filterModel": {"units": {"filterType": "bogus"}}},
+            ]
+        },
+    )
+
+    results = response.get_json()["results"]
+    assert response.status_code == 200
+    assert [len(result["rows"]) for result in results[:2]] == [3, 3]
+    assert all(result["rowCount"] == 3 for result in results[:2])
+    assert "Unsupported filterType" in results[2]["error"]
+
+
+def test_distinct_values_cached_with_etag(ssrm_client, monkeypatch):
+    """Set-filter values are served from cache and revalidate via ETag."""
+    client, register = ssrm_client
+    grid_id = register(distinct_max_age=60)
+    queries = []
+    original = ssrm.distinct_sql
+    monkeypatch.setattr(
+        ssrm,
+        "distinct_sql",
+        lambda *args, **kwargs: queries.append(args) or original(*args, **kwargs),
+    )
+
+    first = client.get(f"/_aggrid/ssrm/distinct/{grid_id}/region")
+    assert first.get_json() == ["East", "North", "South", "West"]
+    assert first.headers["Cache-Control"] == "private, max-age=60"
+
+    second = client.get(
+        f"/_aggrid/ssrm/distinct/{grid_id}/region",
+        headers={"If-None-Match": first.headers["ETag"]},
+    )
+    assert second.status_code == 304
+    assert len(queries) == 1
+
+
+def test_distinct_sql_filter_search_limit_counts():
+    """distinct_sql applies other columns' filters, search prefix, limit and counts."""
+    sql, params = ssrm.distinct_sql(
+        "orders",
+        "region",
+        filter_model={
+            "region": {"filterType": "set", "values": ["East"]},
+            "units": {"filterType": "number", "type": "greaterThan", "filter": 3},
+        },
+        search="No",
+        limit=10,
+        counts=True,
+        parameterized=True,
+    )
+    assert '"region" IN' not in sql
+    assert 'GROUP BY 1' in sql
+    assert params == [3, "no", 10]
+
+
+def test_distinct_route_filter_aware_and_paged(ssrm_client):
+    """The distinct route narrows values to the filtered slice and flags truncation."""
+    client, register = ssrm_client
+    grid_id = register()
+
+    filtered = client.post(
+        f"/_aggrid/ssrm/distinct/{grid_id}/region",
+        json={
+            "filterModel": {"product": {"filterType": "set", "values": ["Widget"]}},
+            "counts": True,
+        },
+    )
+    payload = filtered.get_json()
+    assert sum(item["count"] for item in payload) == 34
+    assert {item["value"] for item in payload} == {"East", "North", "South", "West"}
+
+    searched = client.get(f"/_aggrid/ssrm/distinct/{grid_id}/region?search=s")
+    assert searched.get_json() == ["South"]
+
+    limited = client.get(f"/_aggrid/ssrm/distinct/{grid_id}/region?limit=2")
+    assert limited.get_json() == ["East", "North"]
+    assert limited.headers["X-AgGrid-Distinct-Truncated"] == "true"
+
+    bad = client.get(f"/_aggrid/ssrm/distinct/{grid_id}/region?limit=zero")
+    assert bad.status_code == 400
+
+
+def test_group_blocks_served_from_aggregate_cache(ssrm_client, monkeypatch):
+    """Repeated group-level blocks skip DuckDB; leaf blocks are not cached."""
+    client, register = ssrm_client
+    grid_id = register()
+    calls = []
+    original = ssrm._fetch_block
+    monkeypatch.setattr(
+        ssrm,
+        "_fetch_block",
+        lambda *args, **kwargs: calls.append(args[1]) or original(*args, **kwargs),
+    )
+    group_request = {
+        "startRow": 0,
+        "endRow": 50,
+        "rowGroupCols": [{"field": "region"}],
+        "valueCols": [{"field": "revenue", "aggFunc": "sum"}],
+        "groupKeys": [],
+        "gridId": grid_id,
+    }
+
+    first = client.post(f"/_aggrid/ssrm/{grid_id}", json=group_request).get_json()
+    second = client.post(
+        f"/_aggrid/ssrm/{grid_id}", json={**group_request, "ssrmClientId": "other"}
+    ).get_json()
+    assert first == second
+    assert len(calls) == 1
+
+    client.post(f"/_aggrid/ssrm/{grid_id}", json={**group_request, "groupKeys": ["East"]})
+    client.post(f"/_aggrid/ssrm/{grid_id}", json={**group_request, "groupKeys": ["East"]})
+    assert len(calls) == 3
+
+
+def test_rollup_serves_group_levels(ssrm_client, duckdb_file):
+    """Unfiltered group levels come from the rollup table with matching aggregates."""
+    client, register = ssrm_client
+    grid_id = register(
+        aggregate_cache_ttl=0,
+        rollup=["region", "product"],
+        rollup_values=["revenue", "units"],
+    )
+    entry = ssrm._SSRM_REGISTRY[grid_id]
+    deadline = time.monotonic() + 10
+    while entry["rollup"]._connection is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    request_body = {
+        "startRow": 0,
+        "endRow": 50,
+        "rowGroupCols": [{"field": "region"}, {"field": "product"}],
+        "valueCols": [
+            {"field": "revenue", "aggFunc": "sum"},
+            {"field": "units", "aggFunc": "avg"},
+        ],
+        "groupKeys": ["East"],
+        "sortModel": [{"colId": "product", "sort": "asc"}],
+    }
+    assert "__ssrm_rollup" in ssrm._plan_block(entry, request_body)["sql"]
+
+    with duckdb.connect(str(duckdb_file), read_only=True) as con:
+        expected = con.sql(ssrm.sql_for(request_body, "orders")).fetchall()
+    rows = client.post(f"/_aggrid/ssrm/{grid_id}", json=request_body).get_json()["rows"]
+    assert [(row["product"], row["revenue"], pytest.approx(row["units"])) for row in rows] == expected
+
+    filtered = {
+        **request_body,
+        "filterModel": {"units": {"filterType": "number", "type": "equals", "filter": 1}},
+    }
+    assert "__ssrm_rollup" not in ssrm._plan_block(entry, filtered)["sql"]
+
+    # a rebuild finishing mid-query leaves the old table open until the cursor is done
+    rollup = entry["rollup"]
+    with rollup.cursor() as cursor:
+        rollup._build(entry)
+        assert cursor.sql("SELECT COUNT(*) FROM memory.main.__ssrm_rollup").fetchone()[0] > 0
+    assert not rollup._leases
+
+
+@pytest.fixture
+def sqlite_file(tmp_path, duckdb_file):
+    """The ``orders`` table copied into a SQLite database."""
+    path = tmp_path / "orders.sqlite"
+    with duckdb.connect(str(duckdb_file), read_only=True) as con:
+        rows = con.sql("SELECT * EXCLUDE (revenue), revenue::DOUBLE FROM orders").fetchall()
+    with sqlite3.connect(path) as con:
+        con.execute(
+            "CREATE TABLE orders (order_id INTEGER, region TEXT, product TEXT, units INTEGER, revenue REAL)"
+        )
+        con.executemany("INSERT INTO orders VALUES (?, ?, ?, ?, ?)", rows)
+    return path
+
+
+_BACKEND_REQUESTS = [
+    {
+        "startRow": 0,
+        "endRow": 10,
+        "rowGroupCols": [{"field": "region"}],
+        "valueCols": [{"field": "revenue", "aggFunc": "sum"}],
+        "groupKeys": [],
+        "filterModel": {"product": {"filterType": "text", "type": "contains", "filter": "DG"}},
+        "sortModel": [{"colId": "region", "sort": "asc"}],
+    },
+    {
+        "startRow": 5,
+        "endRow": 15,
+        "filterModel": {
+            "region": {"filterType": "set", "values": ["East", "West"]},
+            "units": {"filterType": "number", "type": "greaterThan", "filter": 2},
+        },
+        "sortModel": [{"colId": "order_id", "sort": "desc"}],
+        "columnState": [{"colId": "order_id"}],
+    },
+]
+
+
+@pytest.mark.parametrize("kind", ["sqlite", "dbapi", "parquet"])
+def test_backends_match_duckdb_file(ssrm_client, duckdb_file, sqlite_file, tmp_path, kind):
+    """SQLite, generic DB-API and in-memory Parquet backends serve the same blocks."""
+    client, register = ssrm_client
+    if kind == "sqlite":
+        grid_id = register(backend="sqlite", duckdb_path=None, path=str(sqlite_file))
+    elif kind == "dbapi":
+        # custom backends must implement connection()
+        with pytest.raises(TypeError, match="abstract"):
+            ssrm.SsrmBackend()
+        backend = ssrm.DBAPIBackend(lambda: sqlite3.connect(sqlite_file, check_same_thread=False))
+        grid_id = register(backend=backend)
+    else:
+        parquet = tmp_path / "orders.parquet"
+        with duckdb.connect(str(duckdb_file), read_only=True) as con:
+            con.execute(f"COPY orders TO '{parquet}' (FORMAT parquet)")
+        grid_id = register(
+            backend="duckdb", duckdb_path=None, table=f"read_parquet('{parquet}')"
+        )
+
+    with duckdb.connect(str(duckdb_file), read_only=True) as con:
+        for body in _BACKEND_REQUESTS:
+            relation = con.sql(ssrm.sql_for(body, "orders", child_count=True))
+            expected = [dict(zip(relation.columns, row)) for row in relation.fetchall()]
+            rows = client.post(f"/_aggrid/ssrm/{grid_id}", json=body).get_json()["rows"]
+            assert len(rows) == len(expected)
+            for row, want in zip(rows, expected):
+                assert float(row.pop("revenue")) == pytest.approx(float(want.pop("revenue")))
+                assert row == want
+
+
+def test_format_paramstyle_dialect_binds_everything():
+    """A ``%s`` dialect always binds values and escapes literal wildcards."""
+
+    class FormatDialect(ssrm.SqlDialect):
+        paramstyle = "format"
+
+    sql, params = ssrm.sql_for(
+        {
+            "filterModel": {
+                "product": {"filterType": "text", "type": "contains", "filter": "dg"},
+                "region": {"filterType": "set", "values": ["East", "West"]},
+            },
+            "startRow": 0,
+            "endRow": 10,
+        },
+        "orders",
+        dialect=FormatDialect(),
+    )
+    assert "LOWER(\"product\") LIKE LOWER('%%' || %s || '%%')" in sql
+    assert '"region" IN (%s, %s)' in sql
+    assert "?" not in sql
+    assert params == ["dg", "East", "West", 10, 0]
+
+
+def test_in_memory_data_source_swaps_atomically(ssrm_client, duckdb_file):
+    """Arrow data is served in place and swap_ssrm_data replaces it for new requests."""
+    compute = pytest.importorskip("pyarrow.compute")
+    with duckdb.connect(str(duckdb_file), read_only=True) as con:
+        table = con.sql("SELECT * FROM orders").to_arrow_table()
+    client, register = ssrm_client
+    grid_id = register(duckdb_path=None, table=None, data=table)
+    body = {
+        "startRow": 0,
+        "endRow": 10,
+        "rowGroupCols": [{"field": "region"}],
+        "valueCols": [{"field": "units", "aggFunc": "sum"}],
+        "groupKeys": [],
+        "sortModel": [{"colId": "region", "sort": "asc"}],
+    }
+
+    first = client.post(f"/_aggrid/ssrm/{grid_id}", json=body).get_json()
+    assert first["rowCount"] == 4
+
+    ssrm.swap_ssrm_data(grid_id, table.filter(compute.equal(table["region"], "East")))
+    second = client.post(f"/_aggrid/ssrm/{grid_id}", json=body).get_json()
+    assert second["rowCount"] == 1
+    assert second["rows"][0]["units"] == next(
+        row["units"] for row in first["rows"] if row["region"] == "East"
+    )
+    assert client.get(f"/_aggrid/ssrm/distinct/{grid_id}/region").get_json() == ["East"]
+
+
+def test_in_memory_backend_reads_parquet_glob(duckdb_file, tmp_path):
+    """Parquet globs become views on every pooled cursor."""
+    with duckdb.connect(str(duckdb_file), read_only=True) as con:
+        for part in range(2):
+            con.execute(
+                f"COPY (SELECT * FROM orders WHERE order_id % 2 = {part}) "
+                f"TO '{tmp_path / f'part-{part}.parquet'}' (FORMAT parquet)"
+            )
+    backend = ssrm.InMemoryBackend({"orders": str(tmp_path / "part-*.parquet")}, pool_size=2)
+    with backend.connection() as first, backend.connection() as second:
+        assert first.sql("SELECT COUNT(*) FROM orders").fetchone()[0] == 100
+        assert second.sql("SELECT COUNT(*) FROM orders").fetchone()[0] == 100
+    backend.close()
+
+
+def test_result_cache_serves_identical_blocks_as_bytes(ssrm_client, monkeypatch):
+    """Identical requests reuse the serialized response until invalidated."""
+    client, register = ssrm_client
+    grid_id = register(result_cache_ttl=60)
+    planned = []
+    original = ssrm._plan_block
+    monkeypatch.setattr(
+        ssrm, "_plan_block", lambda *args: planned.append(args[1]) or original(*args)
+    )
+    body = {
+        "startRow": 0,
+        "endRow": 10,
+        "sortModel": [{"colId": "order_id", "sort": "asc"}],
+        "columnState": [{"colId": "order_id"}],
+    }
+    before = ssrm.ssrm_cache_stats()["result"]
+
+    first = client.post(f"/_aggrid/ssrm/{grid_id}", json={**body, "ssrmClientId": "a"})
+    second = client.post(f"/_aggrid/ssrm/{grid_id}", json={**body, "ssrmClientId": "b"})
+    batch = client.post(f"/_aggrid/ssrm/batch/{grid_id}", json={"requests": [body]})
+    assert second.get_data() == first.get_data()
+    assert batch.get_json()["results"][0] == first.get_json()
+    assert len(planned) == 1
+
+    stats = ssrm.ssrm_cache_stats()["result"]
+    assert stats["hits"] - before["hits"] == 2
+    assert stats["bytes"] >= len(first.get_data())
+
+    assert ssrm.invalidate_ssrm_cache(grid_id) >= 1
+    client.post(f"/_aggrid/ssrm/{grid_id}", json=body)
+    assert len(planned) == 2
+
+    # a client-supplied knownRowCount is answered but never shared
+    filtered = {
+        **body,
+        "filterModel": {"product": {"filterType": "text", "type": "equals", "filter": "Gadget"}},
+    }
+    hinted = client.post(f"/_aggrid/ssrm/{grid_id}", json={**filtered, "knownRowCount": 7})
+    assert hinted.get_json()["rowCount"] == 7
+    assert client.post(f"/_aggrid/ssrm/{grid_id}", json=filtered).get_json()["rowCount"] == 33
+
+    limit = ssrm._RESULT_CACHE.max_bytes
+    try:
+        ssrm.set_ssrm_result_cache_limit(10)
+        assert ssrm.ssrm_cache_stats()["result"]["bytes"] == 0
+    finally:
+        ssrm.set_ssrm_result_cache_limit(limit)
+
+
+def test_large_blocks_stream_in_chunks(ssrm_client):
+    """Blocks above stream_chunk_rows arrive as NDJSON chunks or Arrow batches."""
+    pyarrow = pytest.importorskip("pyarrow")
+    client, register = ssrm_client
+    grid_id = register(stream_chunk_rows=16)
+    body = {
+        "startRow": 0,
+        "endRow": 40,
+        "filterModel": {"region": {"filterType": "set", "values": ["North", "South"]}},
+        "sortModel": [{"colId": "order_id", "sort": "asc"}],
+        "columnState": [{"colId": "order_id"}, {"colId": "region"}],
+    }
+    expected = [i for i in range(100) if i % 4 < 2][:40]
+
+    response = client.post(f"/_aggrid/ssrm/{grid_id}", json=body)
+    lines = [json.loads(line) for line in response.get_data().splitlines()]
+    response.close()
+    assert response.mimetype == "application/x-ndjson"
+    assert [len(line["rows"]) for line in lines[:-1]] == [16, 16, 8]
+    assert [row["order_id"] for line in lines[:-1] for row in line["rows"]] == expected
+    assert lines[-1] == {"rowCount": 50}
+
+    response = client.post(f"/_aggrid/ssrm/{grid_id}", json={**body, "responseFormat": "arrow"})
+    table = pyarrow.ipc.open_stream(response.get_data()).read_all()
+    response.close()
+    assert response.headers["X-AgGrid-Row-Count"] == "50"
+    assert table.column("order_id").to_pylist() == expected
+    assert ssrm._ROW_COUNT_COLUMN not in table.schema.names
+
+    # blocks at or below the chunk size are answered as a single document
+    small = client.post(f"/_aggrid/ssrm/{grid_id}", json={**body, "endRow": 16})
+    assert small.get_json()["rowCount"] == 50
+    assert not ssrm._SSRM_REGISTRY[grid_id]["backend"]._pool._owners
+
+
+def test_streams_hold_a_query_slot_for_at_most_stream_timeout(ssrm_client):
+    """Streams count against max_concurrency, expire, and end with an error record."""
+    pyarrow = pytest.importorskip("pyarrow")
+    client, register = ssrm_client
+    grid_id = register(stream_chunk_rows=16, max_concurrency=1, pool_timeout=0.2, stream_timeout=0.5)
+    body = {"startRow": 0, "endRow": 40, "sortModel": [{"colId": "order_id", "sort": "asc"}]}
+    entry = ssrm._SSRM_REGISTRY[grid_id]
+
+    held = client.post(f"/_aggrid/ssrm/{grid_id}", json=body)
+    assert client.post(f"/_aggrid/ssrm/{grid_id}", json=body).status_code == 503
+    held.close()
+
+    stalled = client.post(f"/_aggrid/ssrm/{grid_id}", json=body)
+    time.sleep(0.8)
+    # the expired lease already returned its connection and slot
+    assert not entry["backend"]._pool._owners
+    lines = [json.loads(line) for line in stalled.get_data().splitlines()]
+    stalled.close()
+    assert "stream_timeout" in lines[-1]["error"]
+
+    stalled = client.post(f"/_aggrid/ssrm/{grid_id}", json={**body, "responseFormat": "arrow"})
+    time.sleep(0.8)
+    reader = pyarrow.ipc.open_stream(stalled.get_data())
+    stalled.close()
+    metadata = None
+    while True:
+        try:
+            batch, metadata = reader.read_next_batch_with_custom_metadata()
+        except StopIteration:
+            break
+    assert batch.num_rows == 0
+    assert b"stream_timeout" in metadata[b"error"]
+
+
+def test_streams_run_under_the_executor_and_are_superseded(ssrm_client):
+    """A newer request from the same client stops a stream still being read."""
+    client, register = ssrm_client
+    grid_id = register(stream_chunk_rows=16, executor=True)
+    body = {"startRow": 0, "endRow": 40, "sortModel": [{"colId": "order_id", "sort": "asc"}]}
+    held = client.post(f"/_aggrid/ssrm/{grid_id}", json={**body, "ssrmClientId": "c1"})
+    newer = {**body, "endRow": 10, "ssrmClientId": "c1", "sortModel": []}
+    assert client.post(f"/_aggrid/ssrm/{grid_id}", json=newer).status_code == 200
+    lines = [json.loads(line) for line in held.get_data().splitlines()]
+    held.close()
+    assert "superseded" in lines[-1]["error"]
+    assert ssrm.ssrm_executor_stats()["grids"][grid_id]["superseded"] >= 1
+
+
+def test_export_route_copies_full_result(ssrm_client):
+    """Exports reuse the grid state without paging, capped and concurrency-limited."""
+    pyarrow = pytest.importorskip("pyarrow")
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    client, register = ssrm_client
+    grid_id = register(export_max_rows=30, export_concurrency=1)
+    state = {
+        "startRow": 0,
+        "endRow": 5,
+        "filterModel": {"region": {"filterType": "set", "values": ["North"]}},
+        "sortModel": [{"colId": "order_id", "sort": "desc"}],
+        "columnState": [{"colId": "order_id"}],
+    }
+
+    response = client.post(f"/_aggrid/ssrm/export/{grid_id}", json={**state, "fileName": "north"})
+    lines = response.get_data().decode("utf-8").splitlines()
+    response.close()
+    assert response.status_code == 200
+    assert response.headers["Content-Disposition"] == 'attachment; filename="north.csv"'
+    assert response.headers["X-AgGrid-Export-Rows"] == "25"
+    assert lines[0].startswith("order_id,region")
+    assert [int(line.split(",")[0]) for line in lines[1:]] == list(range(96, -1, -4))
+
+    response = client.get(
+        f"/_aggrid/ssrm/export/{grid_id}",
+        query_string={"format": "parquet", "request": json.dumps({"columnState": []})},
+    )
+    table = pyarrow_parquet.read_table(pyarrow.BufferReader(response.get_data()))
+    response.close()
+    assert table.num_rows == 30
+    assert response.headers["X-AgGrid-Export-Capped"] == "true"
+
+    excel = client.post(
+        f"/_aggrid/ssrm/export/{grid_id}", data={"format": "excel", "request": json.dumps(state)}
+    )
+    assert excel.get_data().startswith(b"\xef\xbb\xbforder_id")
+    # the open response still holds the grid's only export slot
+    assert client.post(f"/_aggrid/ssrm/export/{grid_id}", json=state).status_code == 429
+    excel.close()
+    assert client.post(f"/_aggrid/ssrm/export/{grid_id}", json={"format": "xml"}).status_code == 400
+
+
+def test_server_timing_metrics_hook_and_slow_query_log(ssrm_client):
+    """Routes report phase timings; hooks and the slow-query log see each request."""
+    client, register = ssrm_client
+    grid_id = register(slow_query_ms=0.001, count="query", distinct_cache_ttl=0)
+    metrics = ssrm.SsrmMetrics()
+    ssrm.set_ssrm_metrics_hook(metrics)
+    try:
+        block = client.post(
+            f"/_aggrid/ssrm/{grid_id}",
+            json={"startRow": 0, "endRow": 10, "columnState": [{"colId": "order_id"}]},
+        )
+        distinct = client.get(f"/_aggrid/ssrm/distinct/{grid_id}/region")
+    finally:
+        ssrm.set_ssrm_metrics_hook(None)
+
+    phases = {part.split(";")[0] for part in block.headers["Server-Timing"].split(", ")}
+    assert {"cache", "build", "connect", "query", "count", "encode", "total"} <= phases
+    assert "query;dur=" in distinct.headers["Server-Timing"]
+
+    rendered = metrics.render()
+    labels = f'grid="{grid_id}",route="block"'
+    assert f'aggrid_ssrm_requests_total{{{labels},status="200"}} 1' in rendered
+    assert f"aggrid_ssrm_rows_total{{{labels}}} 10" in rendered
+    assert f'aggrid_ssrm_phase_duration_seconds_count{{{labels},phase="count"}} 1' in rendered
+    assert f'grid="{grid_id}",route="distinct",status="200"' in rendered
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        logged = [entry for entry in ssrm.ssrm_slow_queries() if entry["grid_id"] == grid_id]
+        if len(logged) == 2:
+            break
+        time.sleep(0.02)
+    assert sorted(entry["route"] for entry in logged) == ["block", "distinct"]
+    assert all(entry["sql"].startswith("SELECT") and entry["plan"] for entry in logged)
+    assert not any(entry["plan"].startswith("EXPLAIN failed") for entry in logged)
+
+    # the same SQL is not explained again: its recorded plan is reused
+    client.post(
+        f"/_aggrid/ssrm/{grid_id}",
+        json={"startRow": 0, "endRow": 10, "columnState": [{"colId": "order_id"}]},
+    )
+    repeated = [entry for entry in ssrm.ssrm_slow_queries() if entry["grid_id"] == grid_id]
+    block_plan = next(entry["plan"] for entry in logged if entry["route"] == "block")
+    assert repeated[-1]["plan"] == block_plan
+
+
+_TYPED_TABLE = """(
+    SELECT
+        order_id,
+        revenue,
+        DATE '2024-01-01' + order_id::INTEGER AS day,
+        TIMESTAMP '2024-01-01 08:30:00' + to_hours(order_id) AS placed_at,
+        md5(order_id::VARCHAR)::UUID AS token,
+        COUNT(*) OVER () AS "__ssrm_row_count_shadow"
+    FROM orders
+)"""
+
+
+@pytest.mark.parametrize("json_encoder", ["auto", "python"])
+def test_json_encoders_handle_duckdb_types(ssrm_client, json_encoder):
+    """Decimals, dates, timestamps and UUIDs encode identically on both paths."""
+    client, register = ssrm_client
+    grid_id = register(table=_TYPED_TABLE, json_encoder=json_encoder)
+
+    response = client.post(
+        f"/_aggrid/ssrm/{grid_id}",
+        json={
+            "startRow": 0,
+            "endRow": 2,
+            "sortModel": [{"colId": "order_id", "sort": "asc"}],
+            "columnState": [{"colId": "order_id"}],
+        },
+    )
+
+    payload = response.get_json()
+    assert payload["rowCount"] == 100
+    assert payload["rows"][1] == {
+        "order_id": 1,
+        "revenue": 12.5,
+        "day": "2024-01-02",
+        "placed_at": "2024-01-01 09:30:00",
+        "token": "c4ca4238-a0b9-2382-0dcc-509a6f75849b",
+        "__ssrm_row_count_shadow": 100,
+    }